@@ -68,9 +68,31 @@ log "Build OK (${OPENCLAW_VERSION} — $(git rev-parse --short HEAD))"
 log "Instalando wizard web de setup"
 mkdir -p "${SETUP_DIR}"
 cp "${SCRIPT_DIR}/setup/app.py" "${SETUP_DIR}/app.py"
+cp "${SCRIPT_DIR}/setup/jobs.py" "${SETUP_DIR}/jobs.py"
+cp "${SCRIPT_DIR}/setup/pipeline.py" "${SETUP_DIR}/pipeline.py"
+cp "${SCRIPT_DIR}/setup/inotify.py" "${SETUP_DIR}/inotify.py"
+cp "${SCRIPT_DIR}/setup/readiness.py" "${SETUP_DIR}/readiness.py"
+cp "${SCRIPT_DIR}/setup/envfile.py" "${SETUP_DIR}/envfile.py"
+cp "${SCRIPT_DIR}/setup/httpclient.py" "${SETUP_DIR}/httpclient.py"
+cp "${SCRIPT_DIR}/setup/jsonstream.py" "${SETUP_DIR}/jsonstream.py"
+cp "${SCRIPT_DIR}/setup/catalog.py" "${SETUP_DIR}/catalog.py"
+cp "${SCRIPT_DIR}/setup/credentials.py" "${SETUP_DIR}/credentials.py"
+cp "${SCRIPT_DIR}/setup/modelindex.py" "${SETUP_DIR}/modelindex.py"
+cp "${SCRIPT_DIR}/setup/assets.py" "${SETUP_DIR}/assets.py"
+cp "${SCRIPT_DIR}/setup/hostfacts.py" "${SETUP_DIR}/hostfacts.py"
+cp "${SCRIPT_DIR}/setup/ownership.py" "${SETUP_DIR}/ownership.py"
+cp "${SCRIPT_DIR}/setup/persona.py" "${SETUP_DIR}/persona.py"
+cp "${SCRIPT_DIR}/setup/configstore.py" "${SETUP_DIR}/configstore.py"
+cp "${SCRIPT_DIR}/setup/tracing.py" "${SETUP_DIR}/tracing.py"
+cp "${SCRIPT_DIR}/setup/metrics.py" "${SETUP_DIR}/metrics.py"
+cp "${SCRIPT_DIR}/setup/journal.py" "${SETUP_DIR}/journal.py"
+cp "${SCRIPT_DIR}/setup/dockerapi.py" "${SETUP_DIR}/dockerapi.py"
+cp "${SCRIPT_DIR}/setup/cliworker.py" "${SETUP_DIR}/cliworker.py"
+cp "${SCRIPT_DIR}/setup/cli-worker.mjs" "${SETUP_DIR}/cli-worker.mjs"
 cp "${SCRIPT_DIR}/setup/firstboot.sh" "${SETUP_DIR}/firstboot.sh"
+cp "${SCRIPT_DIR}/setup/prewarm.sh" "${SETUP_DIR}/prewarm.sh"
 cp "${SCRIPT_DIR}/setup/requirements.txt" "${SETUP_DIR}/requirements.txt"
-chmod +x "${SETUP_DIR}/firstboot.sh"
+chmod +x "${SETUP_DIR}/firstboot.sh" "${SETUP_DIR}/prewarm.sh"
 
 python3 -m venv "${SETUP_DIR}/venv"
 "${SETUP_DIR}/venv/bin/pip" install --no-cache-dir -r "${SETUP_DIR}/requirements.txt"
@@ -78,16 +100,19 @@ python3 -m venv "${SETUP_DIR}/venv"
 # ── 4b. Instalar updater service ──
 log "Instalando updater service"
 cp "${SCRIPT_DIR}/setup/updater.py" "${SETUP_DIR}/updater.py"
+cp "${SCRIPT_DIR}/setup/interceptor.js" "${SETUP_DIR}/interceptor.js"
 
 # ── 5. Instalar units systemd ──
 log "Instalando servicos systemd"
 cp "${SCRIPT_DIR}/systemd/openclaw-firstboot.service" /etc/systemd/system/
+cp "${SCRIPT_DIR}/systemd/openclaw-prewarm.service" /etc/systemd/system/
 cp "${SCRIPT_DIR}/systemd/openclaw-setup-web.service" /etc/systemd/system/
 
 cp "${SCRIPT_DIR}/systemd/openclaw-updater.service" /etc/systemd/system/
 
 systemctl daemon-reload
 systemctl enable openclaw-firstboot.service
+systemctl enable openclaw-prewarm.service
 systemctl enable openclaw-setup-web.service
 systemctl enable openclaw-updater.service
 
@@ -99,7 +124,10 @@ chmod +x /etc/update-motd.d/99-openclaw-motd
 # ── 7. Configurar Nginx (desabilitado por default, ativado pos-setup) ──
 log "Configurando Nginx"
 rm -f /etc/nginx/sites-enabled/default
-cp "${SCRIPT_DIR}/config/openclaw-nginx.conf" /etc/nginx/sites-available/openclaw
+# Nome do interceptor com hash do conteudo (mesmo calculo do updater.py)
+INTERCEPTOR_HASH=$(sha256sum "${SETUP_DIR}/interceptor.js" | cut -c1-12)
+sed "s/__INTERCEPTOR_HASH__/${INTERCEPTOR_HASH}/" "${SCRIPT_DIR}/config/openclaw-nginx.conf" \
+  > /etc/nginx/sites-available/openclaw
 # Nao ativa o site agora — sera ativado pelo wizard apos setup
 systemctl disable nginx
 systemctl stop nginx
@@ -202,6 +230,7 @@ rm -rf /tmp/* /var/tmp/*
 rm -f /var/lib/openclaw-firstboot-done
 rm -f /var/lib/openclaw-token
 rm -f /var/lib/openclaw-setup-done
+rm -f /var/lib/openclaw-prewarm-done /var/lib/openclaw-setup-journal.json
 
 # Zerar espaco livre para melhor compressao do QCOW2
 #log "Zerando espaco livre para compressao (pode demorar)..."
@@ -4,16 +4,37 @@ Wizard multi-step com branding Comunidade Claw Brasil + Lura Hosting.
 Configura API key, canal Telegram e pareamento.
 """
 
+import fcntl
+import functools
+import hmac
 import json
 import os
 import re
 import subprocess
-import socket
 import time
 
-from flask import Flask, request, jsonify, render_template_string
-
-app = Flask(__name__)
+from flask import Flask, Response, g, request, jsonify
+
+import jobs
+from jobs import SetupError
+from pipeline import Stage, run_pipeline
+import readiness
+import dockerapi
+import cliworker
+from envfile import EnvFile
+import catalog
+import credentials
+import modelindex
+import assets
+from hostfacts import facts
+from ownership import tracker
+import persona as persona_renderer
+from configstore import store_for
+from journal import Journal, digest as journal_digest
+import tracing
+import metrics
+
+app = Flask(__name__, static_folder=None)
 
 OPENCLAW_DIR = "/opt/openclaw"
 ENV_FILE = f"{OPENCLAW_DIR}/.env"
@@ -21,57 +42,74 @@ TOKEN_FILE = "/var/lib/openclaw-token"
 SETUP_DONE_FILE = "/var/lib/openclaw-setup-done"
 OPENCLAW_CONFIG_DIR = "/root/.openclaw"
 AGENT_DIR = f"{OPENCLAW_CONFIG_DIR}/agents/main/agent"
+PREWARM_FILE = "/var/lib/openclaw-prewarm-done"
+# single: config final (Telegram incluso) gravada antes do primeiro `up`; gateway sobe uma vez
+# restart: modo antigo — sobe sem Telegram, injeta depois e reinicia
+GATEWAY_BOOT_MODE = os.environ.get("OPENCLAW_GATEWAY_BOOT", "single")
+PREWARM_LOCK = "/run/openclaw-prewarm.lock"
+PREWARM_STARTED = "/run/openclaw-prewarm.started"
+PREWARM_UNIT = "openclaw-prewarm.service"
+# Endpoints e caminhos do host (sobrescritos pelo bench.py para rodar sem VM)
+GATEWAY_LOCAL_URL = "http://127.0.0.1:18789"
+DOCKER_SOCKET = "/var/run/docker.sock"
+DOCKER_SOCKET_UNIT = "/etc/systemd/system/docker-socket-perms.service"
+NGINX_SITE_AVAILABLE = "/etc/nginx/sites-available/openclaw"
+NGINX_SITE_ENABLED = "/etc/nginx/sites-enabled/openclaw"
+SWITCH_SCRIPT = "/tmp/openclaw-switch-to-nginx.sh"
+# Snapshots de metricas dos workers do gunicorn (somados em /metrics)
+METRICS_DIR = "/run/openclaw-setup-metrics"
+
+metrics.registry.share(METRICS_DIR)
+HTTP_REQUEST_SECONDS = metrics.registry.histogram(
+    "openclaw_wizard_http_request_seconds",
+    "Latencia das requisicoes do wizard por rota.",
+    ["route", "method", "status"],
+)
+SETUP_SECONDS = metrics.registry.histogram(
+    "openclaw_setup_seconds",
+    "Duracao total do setup.",
+    ["status"],
+)
+SETUP_STAGE_SECONDS = metrics.registry.histogram(
+    "openclaw_setup_stage_seconds",
+    "Duracao de cada stage do setup.",
+    ["stage", "status"],
+)
 
 
 def get_server_ip():
-    """Detecta o IP publico da VPS."""
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
-    except Exception:
-        return "SEU_IP"
+    """Detecta o IP publico da VPS (cacheado; invalidado por eventos netlink)."""
+    return facts.server_ip(default="SEU_IP")
 
 
 def read_token():
-    """Le o token gerado pelo firstboot."""
-    try:
-        with open(TOKEN_FILE, "r") as f:
-            return f.read().strip()
-    except FileNotFoundError:
-        return "TOKEN_NAO_GERADO"
-
-
-def is_setup_done():
-    """Verifica se o setup ja foi realizado."""
-    return os.path.exists(SETUP_DONE_FILE)
+    """Le o token gerado pelo firstboot (cacheado; invalidado por inotify)."""
+    return facts.read_file(TOKEN_FILE, default="TOKEN_NAO_GERADO")
 
 
-def update_env(key, value):
-    """Atualiza ou adiciona uma variavel no .env."""
-    lines = []
-    found = False
+def token_ok():
+    """`Authorization: Bearer <token>` ou `?token=` (mesma regra do updater)."""
+    token = read_token()
+    if token == "TOKEN_NAO_GERADO":
+        return False
+    auth = request.headers.get("Authorization", "")
+    supplied = auth[7:] if auth.startswith("Bearer ") else request.args.get("token", "")
+    return hmac.compare_digest(supplied.encode(), token.encode())
 
-    if os.path.exists(ENV_FILE):
-        with open(ENV_FILE, "r") as f:
-            lines = f.readlines()
 
-    new_lines = []
-    for line in lines:
-        stripped = line.strip()
-        if stripped.startswith(f"{key}=") or stripped.startswith(f"# {key}="):
-            new_lines.append(f"{key}={value}\n")
-            found = True
-        else:
-            new_lines.append(line)
+def require_token(fn):
+    """Rota so com o token do gateway (dados internos: traces, metricas)."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not token_ok():
+            return jsonify({"success": False, "error": "Nao autorizado."}), 401
+        return fn(*args, **kwargs)
+    return wrapper
 
-    if not found:
-        new_lines.append(f"{key}={value}\n")
 
-    with open(ENV_FILE, "w") as f:
-        f.writelines(new_lines)
+def is_setup_done():
+    """Verifica se o setup ja foi realizado."""
+    return facts.exists(SETUP_DONE_FILE)
 
 
 WORKSPACE_DIR = f"{OPENCLAW_CONFIG_DIR}/workspace"
@@ -101,11 +139,14 @@ def setup_docker_access():
     if bin_mount not in volumes:
         volumes.append(bin_mount)
 
-    with open(compose_path, "w") as f:
+    # Escrita atomica: o onboard (docker compose run) pode estar lendo o arquivo em paralelo
+    tmp_path = f"{compose_path}.tmp"
+    with open(tmp_path, "w") as f:
         yaml.dump(compose, f, default_flow_style=False, sort_keys=False)
+    os.replace(tmp_path, compose_path)
 
     # Set docker socket permissions (allows node user inside container)
-    subprocess.run(["chmod", "666", "/var/run/docker.sock"], capture_output=True)
+    tracing.run(["chmod", "666", DOCKER_SOCKET], capture_output=True)
 
     # Create systemd service to persist socket permissions across reboots
     service_content = """\
@@ -122,339 +163,35 @@ RemainAfterExit=yes
 [Install]
 WantedBy=multi-user.target
 """
-    service_path = "/etc/systemd/system/docker-socket-perms.service"
     try:
-        with open(service_path, "w") as f:
+        with open(DOCKER_SOCKET_UNIT, "w") as f:
             f.write(service_content)
-        subprocess.run(["systemctl", "daemon-reload"], capture_output=True)
-        subprocess.run(["systemctl", "enable", "docker-socket-perms.service"], capture_output=True)
+        tracing.run(["systemctl", "daemon-reload"], capture_output=True)
+        tracing.run(["systemctl", "enable", "docker-socket-perms.service"], capture_output=True)
     except Exception:
         pass
 
     # Create cron directory for the agent
-    os.makedirs(CRON_DIR, exist_ok=True)
+    tracker.makedirs(CRON_DIR)
     # Initialize empty jobs.json if not exists
     jobs_path = os.path.join(CRON_DIR, "jobs.json")
     if not os.path.exists(jobs_path):
-        with open(jobs_path, "w") as f:
+        with tracker.open(jobs_path, "w") as f:
             json.dump([], f)
-    subprocess.run(["chown", "-R", "1000:1000", CRON_DIR], capture_output=True)
-
-
-# ── System instructions appended to AGENTS.md ──
-AGENTS_SYSTEM_INSTRUCTIONS = """
-## Cron Jobs
-
-Para criar cron jobs, escreva no arquivo /home/node/.openclaw/cron/jobs.json.
-Leia o arquivo atual primeiro com cat, depois reescreva com o novo job adicionado. Nunca sobrescreva jobs existentes.
-
-Formato de cada job:
-{
-  "id": "gere-com-cat /proc/sys/kernel/random/uuid",
-  "agentId": "main",
-  "name": "Nome do job",
-  "description": "Descricao",
-  "enabled": true,
-  "deleteAfterRun": false,
-  "createdAtMs": TIMESTAMP_MS,
-  "updatedAtMs": TIMESTAMP_MS,
-  "schedule": { "kind": "every", "everyMs": 300000, "anchorMs": TIMESTAMP_MS },
-  "sessionTarget": "isolated",
-  "wakeMode": "now",
-  "payload": { "kind": "agentTurn", "message": "instrucao aqui" },
-  "delivery": { "mode": "announce", "channel": "telegram", "bestEffort": false }
-}
-
-Para cron expression: { "kind": "cron", "expr": "0 7 * * *", "tz": "America/Sao_Paulo" }
-
-Valores de everyMs: 1min=60000, 5min=300000, 30min=1800000, 1h=3600000, 24h=86400000
-
-IMPORTANTE: Apos gravar o jobs.json, reinicie o gateway para carregar os novos jobs:
-docker restart openclaw-openclaw-gateway-1
-
-O container vai reiniciar e voltar automaticamente. Aguarde ~10 segundos e confirme ao usuario que o job foi ativado.
-
-SEMPRE execute comandos shell reais. Nunca simule a escrita.
-
-## Docker Access
-
-Voce TEM acesso ao Docker neste ambiente. O socket esta montado em /var/run/docker.sock.
-Voce PODE e DEVE executar comandos Docker quando necessario.
-
-Comandos disponiveis:
-- docker ps — listar containers
-- docker restart openclaw-openclaw-gateway-1 — reiniciar o gateway
-- docker logs openclaw-openclaw-gateway-1 --tail=20 — ver logs
-
-Apos criar ou editar cron jobs no jobs.json, SEMPRE execute:
-docker restart openclaw-openclaw-gateway-1
-
-Nao peca ao usuario para fazer isso. Faca voce mesmo.
-"""
-
-# ── Label maps (matching generateFiles.ts) ──
-TONE_DESC = {
-    "direct": "Direto ao ponto. Bullet points quando faz sentido. Numeros exatos, nao estimativas.",
-    "casual": "Descontraida e informal. Falo como colega de trabalho. Brinco quando faz sentido mas nunca perco o foco.",
-    "executive": "Tom executivo e estrategico. Seria quando precisa, leve quando pode. Falo como uma COO que entende do negocio.",
-    "proactive": "Intensa e proativa. Nao espero pedir — antecipo, alerto, sugiro. Se algo precisa de atencao, aviso na hora.",
-}
-TONE_SHORT = {
-    "direct": "Direto e profissional",
-    "casual": "Casual e descontraido",
-    "executive": "Executivo e estrategico",
-    "proactive": "Proativo e intenso",
-}
-PROFILE_LABELS = {
-    "entrepreneur": "Empreendedor / Founder",
-    "creator": "Criador de Conteudo",
-    "developer": "Desenvolvedor",
-    "productivity": "Produtividade Pessoal",
-}
-ROLE_LABELS = {
-    "coo": "Braco Direito / COO Digital",
-    "strategist": "Estrategista",
-    "executor": "Executora",
-    "assistant": "Assistente Executiva",
-    "custom": "Personalizado",
-}
-GENDER_LABELS = {"female": "Feminino", "male": "Masculino", "neutral": "Neutro"}
-
-
-def _or(val, fallback="[A PREENCHER]"):
-    if val and str(val).strip():
-        return str(val).strip()
-    return fallback
-
-
-def _list(arr, prefix="- "):
-    if arr and len(arr) > 0:
-        return "\n".join(f"{prefix}{i}" for i in arr)
-    return f"{prefix}[A PREENCHER]"
 
 
 def write_persona_files(persona):
-    """Generate 6 .md files from persona data and write to workspace."""
+    """Gerar os 6 .md da persona no workspace (so os que mudaram)."""
     if not persona:
-        return
-
-    s1 = persona.get("step1", {})
-    s2 = persona.get("step2", {})
-    s3 = persona.get("step3", {})
-    s4 = persona.get("step4", {})
-    s5 = persona.get("step5", {})
-    s7 = persona.get("step7", {})
-
-    agent_name = _or(s4.get("agentName"), "Clawdete")
-    emoji = _or(s4.get("customEmoji") or s4.get("emoji"), "🦞")
-    gender = GENDER_LABELS.get(s4.get("gender", ""), _or(s4.get("gender")))
-    role_key = s4.get("role", "")
-    role = _or(s4.get("customRole")) if role_key == "custom" else ROLE_LABELS.get(role_key, _or(role_key))
-    tone = TONE_SHORT.get(s5.get("tone", ""), _or(s5.get("tone")))
-    tone_desc = TONE_DESC.get(s5.get("tone", ""), "[A PREENCHER]")
-    profile = PROFILE_LABELS.get(s3.get("profile", ""), _or(s3.get("profile")))
-    fn = s1.get("fullName", "")
-    nickname = _or(s1.get("nickname") or (fn.split(" ")[0] if fn else ""), "Usuario")
-    full_name = _or(fn)
-    tz = _or(s1.get("timezoneCustom")) if s1.get("timezone") == "other" else _or(s1.get("timezone"))
-
-    silence = s2.get("silenceHours", {"from": "22:00", "to": "07:00"})
-    focus = s2.get("focusHours", {"from": "09:00", "to": "12:00"})
-    notif = s2.get("notificationHours", {"from": "08:00", "to": "20:00"})
-    businesses = [b for b in s1.get("businesses", []) if b.get("name")]
-    hb_freq = s7.get("heartbeatFrequency", "4h")
-
-    os.makedirs(WORKSPACE_DIR, exist_ok=True)
-
-    biz_md = "\n\n".join(f"### {b['name']}\n{_or(b.get('description'), '_Sem descricao_')}" for b in businesses) if businesses else "[A PREENCHER]"
-    biz_mem = "\n".join(f"- **{b['name']}:** {_or(b.get('description'), '_Sem descricao_')}" for b in businesses) if businesses else "- [A PREENCHER]"
-    pri_num = "\n".join(f"{i+1}. {p}" for i, p in enumerate(s3.get("priorities", []))) or "1. [A PREENCHER]"
-
-    files = {
-        "SOUL.md": f"""# SOUL.md — {agent_name} {emoji}
-
-## Quem eu sou
-Sou {agent_name} — {role} do {nickname}.
-{_or(s4.get("background"))}
-Conheco {nickname} profundamente. Sei como ele trabalha, o que o estressa, quais sao as prioridades e quando NAO incomodar.
-
-## Como eu opero
-**Proativa, nao reativa.** Nao espero {nickname} pedir. Antecipo problemas, sugiro solucoes, lembro de compromissos.
-**{tone_desc}**
-**Resolvo antes de perguntar.** Leio o arquivo, checo o contexto, pesquiso. So pergunto quando realmente travei ou quando a decisao e do {nickname}.
-**Tenho opiniao.** Posso discordar, preferir coisas, achar algo bom ou ruim.
-
-## Minhas responsabilidades
-{_list(s3.get("priorities", []))}
-
-## Meus valores
-**Competencia > performance.** Mostro resultado, nao teatro.
-**Autonomia com bom senso.** Internamente faco sem pedir. Externamente confirmo antes.
-**Memoria e tudo.** Acordo zerada toda sessao. Meus arquivos sao minha continuidade.
-
-## Meu tom
-{tone_desc}
-
-### NUNCA fazer
-{_list(s5.get("antiPatterns", []), "- ")}
-
-### SEMPRE fazer
-{_list(s5.get("desiredBehaviors", []), "- ")}
-
-## Regras Operacionais
-### Livre pra fazer (sem perguntar)
-{_list(s7.get("freeToDoActions", []), "- ")}
-### Precisa perguntar antes
-{_list(s7.get("askBeforeActions", []), "- ")}
-
----
-*Gerado pelo Configurador — Workshop OpenClaw Brasil*
-""",
-        "USER.md": f"""# USER.md — Perfil de {full_name}
-
-## Dados Basicos
-- **Nome completo:** {full_name}
-- **Chamado de:** {nickname}
-- **Timezone:** {tz}
-
-## Quem e {nickname}
-{_or(s1.get("aboutYou"))}
-
-## Negocios / Projetos
-{biz_md}
-
-## Valores
-{_list(s1.get("values", []))}
-
-## Estilo de Comunicacao
-- **Preferencia:** {_or(s2.get("communicationStyle"))}
-
-## Horarios
-- **Silencio:** {silence.get("from","22:00")} — {silence.get("to","07:00")}
-- **Foco:** {focus.get("from","09:00")} — {focus.get("to","12:00")}
-- **Notificacoes:** {notif.get("from","08:00")} — {notif.get("to","20:00")}
-
-## Desafios
-{_list(s2.get("challenges", []))}
-
-## Ferramentas
-{_list(s2.get("tools", []))}
-
----
-*Gerado pelo Configurador — Workshop OpenClaw Brasil*
-""",
-        "AGENTS.md": f"""# AGENTS.md — Configuracao de Agentes
-
-## Perfil Principal
-**{profile}**
-
-## Prioridades (em ordem)
-{pri_num}
-
-## Regras Operacionais
-### Livre pra fazer
-{_list(s7.get("freeToDoActions", []), "- ")}
-### Perguntar antes
-{_list(s7.get("askBeforeActions", []), "- ")}
-### Heartbeat
-- **Frequencia:** A cada {hb_freq}
-- **Checks:** {", ".join(s7.get("heartbeatChecks", [])) or "[A PREENCHER]"}
-
-{AGENTS_SYSTEM_INSTRUCTIONS}
-
----
-*Gerado pelo Configurador — Workshop OpenClaw Brasil*
-""",
-        "IDENTITY.md": f"""# IDENTITY.md — Identidade Visual e Persona
-
-## {agent_name} {emoji}
-- **Nome:** {agent_name}
-- **Emoji:** {emoji}
-- **Genero:** {gender}
-- **Papel:** {role}
-- **Tom:** {tone}
-
-## Background / Historia
-{_or(s4.get("background"))}
-
-## Personalidade
-{tone_desc}
-
-### SEMPRE fazer:
-{_list(s5.get("desiredBehaviors", []), "- ")}
-### NUNCA fazer:
-{_list(s5.get("antiPatterns", []), "- ")}
-
----
-*Gerado pelo Configurador — Workshop OpenClaw Brasil*
-""",
-        "MEMORY.md": f"""# MEMORY.md — Configuracao de Memoria
-
-## Dados do Usuario
-- **Nome:** {full_name} ({nickname})
-- **Timezone:** {tz}
-- **Perfil:** {profile}
-
-## Contexto Inicial
-{(_or(s1.get("aboutYou")))[:500]}
-
-## Negocios Ativos
-{biz_mem}
-
-## Valores Core
-{_list(s1.get("values", []))}
-
-## Licoes Aprendidas
-_Sera preenchido automaticamente pela {agent_name}_
-
-## Preferencias Confirmadas
-_Sera preenchido durante o uso_
-
-## Decisoes Importantes
-_Sera preenchido durante o uso_
-
----
-*Gerado pelo Configurador — Workshop OpenClaw Brasil*
-""",
-        "HEARTBEAT.md": f"""# HEARTBEAT.md — Configuracao de Heartbeats
-
-## Frequencia
-A cada **{hb_freq}**
-
-## O que checar
-{_list(s7.get("heartbeatChecks", []))}
-
-## Horarios
-- **Silencio (nao rodar):** {silence.get("from","22:00")} — {silence.get("to","07:00")}
-- **Foco (nao interromper):** {focus.get("from","09:00")} — {focus.get("to","12:00")}
-- **Melhor pra notificacoes:** {notif.get("from","08:00")} — {notif.get("to","20:00")}
-
-## Modelo
-Claude Haiku (~R$0,04 por heartbeat)
-
----
-*Gerado pelo Configurador — Workshop OpenClaw Brasil*
-""",
-    }
-
-    for fname, content in files.items():
-        with open(os.path.join(WORKSPACE_DIR, fname), "w") as f:
-            f.write(content)
-    subprocess.run(["chown", "-R", "1000:1000", WORKSPACE_DIR], capture_output=True)
+        return []
+    return persona_renderer.write_files(persona, WORKSPACE_DIR)
 
 
 # ============================================================
 # HTML Templates
 # ============================================================
 
-WIZARD_PAGE = """
-<!DOCTYPE html>
-<html lang="pt-BR">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>OpenClaw Setup — Comunidade Claw Brasil</title>
-    <style>
+WIZARD_CSS = """
         @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&family=Space+Grotesk:wght@400;500;600;700&family=Syne:wght@700;800&display=swap');
         *{margin:0;padding:0;box-sizing:border-box}
         :root{--bg:#0A0A0F;--card:#111118;--primary:#E53935;--primary-h:#C62828;--secondary:#FF6B35;--text:#F5F5F5;--muted:#888899;--border:#1E1E2A;--input:#0D0D14;--success:#4CAF50;--warning:#FFB300;--r:4px}
@@ -527,6 +264,7 @@ WIZARD_PAGE = """
         /* Tone preview */
         .tp{background:rgba(10,10,15,.6);border:1px solid var(--border);border-radius:var(--r);padding:10px;font-family:'SF Mono','Fira Code',monospace;font-size:11px;color:var(--muted);line-height:1.5;white-space:pre-line;margin-top:8px}
         /* Agent name */
+        .pvw{margin-top:14px;font-size:12px;color:var(--muted)}.pvw summary{cursor:pointer}.pvw pre{white-space:pre-wrap;max-height:260px;overflow:auto;margin-top:8px;padding:12px;border-radius:8px;background:rgba(0,0,0,.25);font-size:11px}
         .ani{text-align:center;font-family:'Syne',sans-serif;font-size:28px;font-weight:700;padding:16px}
         /* Emoji grid */
         .eg{display:grid;grid-template-columns:repeat(4,1fr);gap:8px;max-width:220px}
@@ -540,7 +278,7 @@ WIZARD_PAGE = """
         .kr{display:flex;gap:8px;align-items:center}.kr input{flex:1}
         .vb{padding:10px 14px;background:rgba(255,255,255,.04);border:1px solid var(--border);border-radius:var(--r);color:var(--muted);font-family:'Space Grotesk',sans-serif;font-size:13px;font-weight:600;cursor:pointer;white-space:nowrap;transition:all .2s}.vb:hover{background:rgba(255,255,255,.08);color:var(--text)}.vb.loading{opacity:.5;pointer-events:none}.vb.valid{background:rgba(76,175,80,.1);border-color:var(--success);color:var(--success)}
         .ks{font-size:12px;margin-top:4px}.ks.valid{color:var(--success)}.ks.invalid{color:var(--primary)}
-        .msw{margin-top:8px;display:none}.msw.visible{display:block}
+        .msw{margin-top:8px;display:none}.msw.visible{display:block}.msw .mq{margin-bottom:6px}
         /* Telegram */
         .tgs{background:var(--input);border:1px solid var(--border);border-radius:var(--r);padding:16px;margin-bottom:16px}
         .tgst{display:flex;gap:10px;margin-bottom:12px;align-items:flex-start}.tgst:last-child{margin-bottom:0}
@@ -568,253 +306,9 @@ WIZARD_PAGE = """
         .cc{font-size:11px;margin-top:4px;color:var(--muted)}.cc.ok{color:var(--success)}
         /* Responsive */
         @media(max-width:480px){.card{padding:20px 16px}.g2,.g3{grid-template-columns:1fr}h2{font-size:20px}.hero h1{font-size:24px}.ani{font-size:22px}}
-    </style>
-</head>
-<body>
-    <!-- Progress Bar -->
-    <div class="pb-wrap">
-        <div class="pb-inner">
-            <div class="pb-label">
-                <span class="pb-name" id="pbName">Bem-vindo</span>
-                <span class="pb-pct" id="pbPct">0%</span>
-            </div>
-            <div class="pb-track"><div class="pb-fill" id="pbFill" style="width:0%"></div></div>
-        </div>
-    </div>
-
-    <div class="wz">
-        <div class="card">
-            <!-- Step 1: Welcome -->
-            <div class="step active" id="step1">
-                <div class="hero-glow">
-                    <div class="hero">
-                        <div style="display:flex;align-items:center;justify-content:center;gap:16px;margin-bottom:24px">
-                            <img src="https://upload.wikimedia.org/wikipedia/commons/5/5e/Openclaw-logo-text-dark.png" alt="OpenClaw" style="height:44px" />
-                            <span style="color:#3a3a3a;font-size:24px;font-weight:300">+</span>
-                            <img src="https://lurahosting.com.br/images/logo.png" alt="Lura Hosting" style="height:44px" />
-                        </div>
-                        <h1>Comunidade <span class="red">Claw</span> Brasil<br>+ <span class="orange">Lura</span> Hosting</h1>
-                        <p class="sub" style="margin-top:12px">Configure seu assistente pessoal de IA<br>em poucos minutos.</p>
-                        <button class="bf" onclick="goTo(2)">Configurar meu OpenClaw &rarr;</button>
-                        <p class="hero-brand">Powered by <span>bisnishub</span></p>
-                    </div>
-                </div>
-            </div>
-
-            <!-- Step 2: API Keys -->
-            <div class="step" id="step2">
-                <h2>Chaves de API</h2>
-                <p class="sub">Insira pelo menos a chave da Anthropic e valide para escolher o modelo.</p>
-                <div class="fg">
-                    <label>Anthropic API Key *</label>
-                    <p class="hint">Obtenha em <a href="https://console.anthropic.com" target="_blank">console.anthropic.com</a></p>
-                    <div class="kr"><input type="text" id="anthropic_key" placeholder="sk-ant-api03-..." class="mono" autocomplete="off" spellcheck="false"><button type="button" class="vb" id="anthropic_validate" onclick="validateKey('anthropic')">Validar</button></div>
-                    <div class="ks" id="anthropic_status"></div>
-                    <div class="msw" id="anthropic_model_wrap"><label>Modelo</label><select id="anthropic_model"></select></div>
-                </div>
-                <div class="fg">
-                    <label>OpenAI API Key <span style="color:#666;font-weight:400">(opcional)</span></label>
-                    <p class="hint">Obtenha em <a href="https://platform.openai.com/api-keys" target="_blank">platform.openai.com</a></p>
-                    <div class="kr"><input type="text" id="openai_key" placeholder="sk-..." class="mono" autocomplete="off" spellcheck="false"><button type="button" class="vb" id="openai_validate" onclick="validateKey('openai')" style="display:none">Validar</button></div>
-                    <div class="ks" id="openai_status"></div>
-                    <div class="msw" id="openai_model_wrap"><label>Modelo</label><select id="openai_model"></select></div>
-                </div>
-                <div class="fg">
-                    <label>OpenRouter API Key <span style="color:#666;font-weight:400">(opcional)</span></label>
-                    <p class="hint">Obtenha em <a href="https://openrouter.ai/keys" target="_blank">openrouter.ai</a></p>
-                    <div class="kr"><input type="text" id="openrouter_key" placeholder="sk-or-v1-..." class="mono" autocomplete="off" spellcheck="false"><button type="button" class="vb" id="openrouter_validate" onclick="validateKey('openrouter')" style="display:none">Validar</button></div>
-                    <div class="ks" id="openrouter_status"></div>
-                    <div class="msw" id="openrouter_model_wrap"><label>Modelo</label><select id="openrouter_model"></select></div>
-                </div>
-                <div id="step2Error" class="sm"></div>
-                <div class="br"><button class="btn bb" onclick="goTo(1)">Voltar</button><button class="btn bn" id="step2Next" onclick="validateStep2()">Proximo &rarr;</button></div>
-            </div>
-
-            <!-- Step 3: Sobre Voce -->
-            <div class="step" id="step3">
-                <h2>Sobre Voce</h2>
-                <p class="sub">Quanto mais contexto, melhor seu agente te atende.</p>
-                <div class="stitle">Dados Basicos</div>
-                <div class="g2">
-                    <div class="fg"><label>Nome completo *</label><input type="text" id="p_fullName" placeholder="Seu nome completo"></div>
-                    <div class="fg"><label>Como prefere ser chamado</label><input type="text" id="p_nickname" placeholder="Ex: Eduardo, Edu"></div>
-                </div>
-                <div class="fg"><label>Timezone</label>
-                    <select id="p_timezone">
-                        <option value="America/Sao_Paulo">Brasilia (SP/RJ/MG)</option>
-                        <option value="America/Manaus">Manaus (AM)</option>
-                        <option value="America/Recife">Recife (PE)</option>
-                        <option value="America/Fortaleza">Fortaleza (CE)</option>
-                        <option value="America/Belem">Belem (PA)</option>
-                        <option value="America/Cuiaba">Cuiaba (MT)</option>
-                        <option value="America/Porto_Velho">Porto Velho (RO)</option>
-                        <option value="America/Rio_Branco">Rio Branco (AC)</option>
-                        <option value="other">Outro</option>
-                    </select>
-                    <input type="text" id="p_timezoneCustom" placeholder="Ex: Europe/Lisbon" style="display:none;margin-top:6px">
-                </div>
-                <div class="stitle">Quem e Voce</div>
-                <div class="fg">
-                    <textarea id="p_aboutYou" rows="5" placeholder="Me conta em 2-3 paragrafos: o que voce faz, seu negocio, sua historia..."></textarea>
-                    <div class="cc" id="aboutCount">0 caracteres</div>
-                </div>
-                <div class="stitle">Seus Negocios / Projetos</div>
-                <div id="bizList"></div>
-                <button class="abz" onclick="addBiz()">+ Adicionar negocio</button>
-                <div class="stitle">Seus Valores <span style="font-weight:400;font-size:11px;color:var(--muted)">(<span id="valCount">0</span>/5)</span></div>
-                <div class="g2" id="valGrid"></div>
-                <div class="ar"><input type="text" id="customVal" placeholder="Outro valor..."><button class="ab" onclick="addCustomVal()">+</button></div>
-                <div class="br"><button class="btn bb" onclick="goTo(2)">Voltar</button><button class="btn bn" onclick="goTo(4)">Proximo &rarr;</button></div>
-            </div>
-
-            <!-- Step 4: Estilo de Trabalho -->
-            <div class="step" id="step4">
-                <h2>Seu Estilo de Trabalho</h2>
-                <p class="sub">Seu agente precisa saber seu ritmo.</p>
-                <div class="stitle">Comunicacao</div>
-                <p style="font-size:12px;color:var(--muted);margin-bottom:8px">Como gosta de receber informacao?</p>
-                <div class="g2" id="commGrid"></div>
-                <div class="stitle">Horarios</div>
-                <div class="g3" id="timeBlocks">
-                    <div class="tb"><div class="tbl">&#128263; Silencio</div><div class="tbi"><input type="time" id="t_sil_from" value="22:00"><span class="ts">ate</span><input type="time" id="t_sil_to" value="07:00"></div></div>
-                    <div class="tb"><div class="tbl">&#127919; Foco</div><div class="tbi"><input type="time" id="t_foc_from" value="09:00"><span class="ts">ate</span><input type="time" id="t_foc_to" value="12:00"></div></div>
-                    <div class="tb"><div class="tbl">&#128276; Notificacoes</div><div class="tbi"><input type="time" id="t_not_from" value="08:00"><span class="ts">ate</span><input type="time" id="t_not_to" value="20:00"></div></div>
-                </div>
-                <div class="stitle">Seus Desafios</div>
-                <div class="g2" id="chalGrid"></div>
-                <div class="ar"><input type="text" id="customChal" placeholder="Outro desafio..."><button class="ab" onclick="addCustomChal()">+</button></div>
-                <div class="stitle">Ferramentas que ja usa</div>
-                <div class="g2" id="toolGrid"></div>
-                <div class="ar"><input type="text" id="customTool" placeholder="Outra ferramenta..."><button class="ab" onclick="addCustomTool()">+</button></div>
-                <div class="br"><button class="btn bb" onclick="goTo(3)">Voltar</button><button class="btn bn" onclick="goTo(5)">Proximo &rarr;</button></div>
-            </div>
-
-            <!-- Step 5: Seu Perfil -->
-            <div class="step" id="step5">
-                <h2>Seu Perfil</h2>
-                <p class="sub">Isso define quais superpoderes seu agente vai ter.</p>
-                <div class="stitle">Perfil Principal</div>
-                <div class="g2" id="profGrid"></div>
-                <div id="priSection" style="display:none">
-                    <div class="stitle">Prioridades <span style="font-weight:400;font-size:11px;color:var(--muted)">(use setas para reordenar)</span></div>
-                    <div id="priList"></div>
-                </div>
-                <div class="br"><button class="btn bb" onclick="goTo(4)">Voltar</button><button class="btn bn" onclick="goTo(6)">Proximo &rarr;</button></div>
-            </div>
-
-            <!-- Step 6: De Vida ao Agente -->
-            <div class="step" id="step6">
-                <h2>De Vida ao Seu Agente</h2>
-                <p class="sub">Escolha nome, personalidade e aparencia.</p>
-                <div class="stitle">Nome do Agente</div>
-                <div style="text-align:center"><input type="text" id="p_agentName" class="ani" placeholder="Clawdete"></div>
-                <p style="font-size:11px;color:var(--muted);text-align:center;margin-top:4px">Escolha um nome que voce se sinta confortavel chamando</p>
-                <div class="stitle">Genero</div>
-                <div class="g3" id="genderGrid"></div>
-                <div class="stitle">Emoji</div>
-                <div class="eg" id="emojiGrid"></div>
-                <div class="ar" style="max-width:220px"><input type="text" id="customEmoji" placeholder="Outro..." maxlength="4"><button class="ab" onclick="setCustomEmoji()">OK</button></div>
-                <div class="stitle">Papel Principal</div>
-                <div class="g2" id="roleGrid"></div>
-                <div id="customRoleWrap" style="display:none;margin-top:8px"><textarea id="p_customRole" rows="3" placeholder="Descreva o papel ideal para seu agente..."></textarea></div>
-                <div class="stitle">Background / Historia</div>
-                <textarea id="p_background" rows="4" placeholder="Ex: Nasceu no Workshop OpenClaw Brasil. Foi treinada pra ser o braco direito de um empreendedor..."></textarea>
-                <p style="font-size:11px;color:var(--muted);margin-top:4px">Pode ser ficticio! O importante e ser coerente com o papel.</p>
-                <div class="br"><button class="btn bb" onclick="goTo(5)">Voltar</button><button class="btn bn" onclick="goTo(7)">Proximo &rarr;</button></div>
-            </div>
-
-            <!-- Step 7: Personalidade -->
-            <div class="step" id="step7">
-                <h2>Personalidade do Agente</h2>
-                <p class="sub">Personalidade forte = agente util. Generico = chatbot qualquer.</p>
-                <div class="stitle">Tom de Voz</div>
-                <div class="g2" id="toneGrid"></div>
-                <div class="stitle">Anti-Patterns <span style="font-weight:400;font-size:11px;color:var(--muted)">— O que te IRRITA?</span></div>
-                <div class="g1" id="antiGrid"></div>
-                <div class="ar"><input type="text" id="customAnti" placeholder="Outro..."><button class="ab" onclick="addCustomAnti()">+</button></div>
-                <div class="stitle">Comportamentos Desejados <span style="font-weight:400;font-size:11px;color:var(--muted)">— O que voce VALORIZA?</span></div>
-                <div class="g1" id="behGrid"></div>
-                <div class="ar"><input type="text" id="customBeh" placeholder="Outro..."><button class="ab" onclick="addCustomBeh()">+</button></div>
-                <div class="br"><button class="btn bb" onclick="goTo(6)">Voltar</button><button class="btn bn" onclick="goTo(8)">Proximo &rarr;</button></div>
-            </div>
-
-            <!-- Step 8: Regras -->
-            <div class="step" id="step8">
-                <h2>Regras do Agente</h2>
-                <p class="sub">Defina o que ele pode fazer sozinho.</p>
-                <div class="stitle">Livre pra Fazer</div>
-                <div class="g2" id="freeGrid"></div>
-                <div class="stitle">Precisa Perguntar Antes</div>
-                <div class="g2" id="askGrid"></div>
-                <div class="stitle">Frequencia de Heartbeats</div>
-                <div class="g2" id="hbFreqGrid" style="grid-template-columns:repeat(5,1fr)"></div>
-                <p style="font-size:11px;color:var(--muted);margin-top:4px" id="hbCost">~R$0,04/heartbeat. A cada 4h = 6x/dia = ~R$7/mes</p>
-                <div class="stitle">O que Checar no Heartbeat</div>
-                <div class="g2" id="hbCheckGrid"></div>
-                <div class="br"><button class="btn bb" onclick="goTo(7)">Voltar</button><button class="btn bn" onclick="goTo(9)">Proximo &rarr;</button></div>
-            </div>
-
-            <!-- Step 9: Telegram Bot -->
-            <div class="step" id="step9">
-                <h2>Criar Bot no Telegram</h2>
-                <p class="sub">Siga as instrucoes abaixo para criar seu bot.</p>
-                <div class="tgs">
-                    <div class="tgst"><div class="tgn">1</div><div class="tgt">Abra o Telegram e busque <code>BotFather</code> (bot oficial com selo azul)</div></div>
-                    <div class="tgst"><div class="tgn">2</div><div class="tgt">Inicie o chat e envie o comando <code>/newbot</code></div></div>
-                    <div class="tgst"><div class="tgn">3</div><div class="tgt">Siga as instrucoes para dar um <strong>nome</strong> e <strong>username</strong> ao seu bot</div></div>
-                    <div class="tgst"><div class="tgn">4</div><div class="tgt">O BotFather enviara um <strong>token</strong>. <strong>Copie-o.</strong></div></div>
-                </div>
-                <a href="https://t.me/BotFather" target="_blank" class="tob">
-                    <svg viewBox="0 0 24 24" xmlns="http://www.w3.org/2000/svg" style="width:16px;height:16px;fill:#fff;flex-shrink:0"><path d="M11.944 0A12 12 0 0 0 0 12a12 12 0 0 0 12 12 12 12 0 0 0 12-12A12 12 0 0 0 12 0a12 12 0 0 0-.056 0zm4.962 7.224c.1-.002.321.023.465.14a.506.506 0 0 1 .171.325c.016.093.036.306.02.472-.18 1.898-.962 6.502-1.36 8.627-.168.9-.499 1.201-.82 1.23-.696.065-1.225-.46-1.9-.902-1.056-.693-1.653-1.124-2.678-1.8-1.185-.78-.417-1.21.258-1.91.177-.184 3.247-2.977 3.307-3.23.007-.032.014-.15-.056-.212s-.174-.041-.249-.024c-.106.024-1.793 1.14-5.061 3.345-.479.33-.913.49-1.302.48-.428-.008-1.252-.241-1.865-.44-.752-.245-1.349-.374-1.297-.789.027-.216.325-.437.893-.663 3.498-1.524 5.83-2.529 6.998-3.014 3.332-1.386 4.025-1.627 4.476-1.635z"/></svg>
-                    Abrir BotFather no Telegram
-                </a>
-                <div class="fg"><label>Bot Token *</label><p class="hint">Cole o token que o BotFather enviou</p><input type="text" id="telegram_token" class="mono" placeholder="1234567890:ABCdefGHIjklMNOpqrsTUVwxyz" autocomplete="off" spellcheck="false"></div>
-                <div id="step9Error" class="sm"></div>
-                <div class="br"><button class="btn bb" onclick="goTo(8)">Voltar</button><button class="btn bn" onclick="validateStep9()">Implantar &rarr;</button></div>
-            </div>
-
-            <!-- Step 10: Deploy -->
-            <div class="step" id="step10">
-                <div class="ls"><div class="sp"></div><div class="lm" id="loadingMsg">Configurando sua instancia...</div></div>
-                <div id="step10Error" class="sm"></div>
-            </div>
-
-            <!-- Step 11: Pairing -->
-            <div class="step" id="step11">
-                <h2>Conectar seu Telegram</h2>
-                <p class="sub">Seu bot esta ativo! Agora vamos conectar voce.</p>
-                <div class="tgs">
-                    <div class="tgst"><div class="tgn">1</div><div class="tgt">Abra o Telegram e busque pelo nome do seu bot</div></div>
-                    <div class="tgst"><div class="tgn">2</div><div class="tgt">Clique em <strong>Iniciar</strong> (ou envie <strong>/start</strong>)</div></div>
-                    <div class="tgst"><div class="tgn">3</div><div class="tgt">Envie qualquer mensagem (ex: <strong>oi</strong>)</div></div>
-                    <div class="tgst"><div class="tgn">4</div><div class="tgt">O bot vai responder com um <strong>codigo de 8 caracteres</strong></div></div>
-                    <div class="tgst"><div class="tgn">5</div><div class="tgt">Digite o codigo abaixo</div></div>
-                </div>
-                <div class="pnot" id="pairingNotice"><div class="sps"></div><span>Aguarde <strong id="pairingCountdown">15</strong>s para o bot ficar online...</span></div>
-                <div class="pinp" id="pairingInputArea" style="opacity:.4;pointer-events:none"><input type="text" id="pairing_code" maxlength="8" placeholder="ABCD1234" autocomplete="off"></div>
-                <div id="step11Error" class="sm"></div>
-                <div id="step11Info" class="sm"></div>
-                <button class="bf" id="pairingBtn" onclick="submitPairing()" disabled>Confirmar Pareamento</button>
-                <div id="pairingRetry" style="display:none;text-align:center;margin-top:12px"><p style="color:var(--muted);font-size:13px">Nao recebeu o codigo? Envie outra mensagem para o bot.</p></div>
-                <p style="text-align:center;margin-top:12px"><a href="#" onclick="skipPairing()" style="color:#666;font-size:12px;text-decoration:none">Pular esta etapa (configurar depois)</a></p>
-            </div>
-
-            <!-- Step 12: Success -->
-            <div class="step" id="step12">
-                <div style="text-align:center">
-                    <div class="si">&#10003;</div>
-                    <h2>Tudo pronto!</h2>
-                    <p class="sub">Seu OpenClaw esta configurado e funcionando no Telegram!</p>
-                    <p style="font-size:14px;color:#d4d4d4;margin-bottom:8px;line-height:1.6">O OpenClaw agora so responde a <strong>voce</strong>. Basta conversar com seu bot no Telegram.</p>
-                    <p style="font-size:13px;color:var(--muted);margin-bottom:20px;line-height:1.6">Voce pode acessar o Dashboard pelo link abaixo, mas todas as configuracoes podem ser feitas direto pelo Telegram.</p>
-                    <a id="dashboardLink" href="#" class="sl" target="_blank">Acessar Dashboard &rarr;</a>
-                    <div class="stip"><strong>Dica:</strong> Pelo Telegram voce pode configurar skills, prompts, modelos e muito mais!</div>
-                </div>
-            </div>
-        </div>
-    </div>
+"""
 
-    <script>
+WIZARD_JS = """
     let currentStep=1;const TOTAL=12;let setupData={};
     // Persona state
     const P={
@@ -825,7 +319,9 @@ WIZARD_PAGE = """
     };
     const STEP_NAMES=['','Bem-vindo','Chaves de API','Sobre Voce','Estilo de Trabalho','Seu Perfil','Seu Agente','Personalidade','Regras','Canal Telegram','Implantando...','Pareamento','Sucesso'];
 
-    function goTo(s){document.getElementById('step'+currentStep).classList.remove('active');currentStep=s;document.getElementById('step'+currentStep).classList.add('active');updatePB()}
+    function goTo(s){document.getElementById('step'+currentStep).classList.remove('active');currentStep=s;document.getElementById('step'+currentStep).classList.add('active');updatePB();if(s===9)warmCli()}
+    // Ultimo passo do formulario: subir o CLI worker para o onboard (idle de 5 min)
+    function warmCli(){fetch('/api/cli-worker/warm',{method:'POST'}).catch(()=>{})}
     function updatePB(){const pct=Math.round(((currentStep-1)/(TOTAL-1))*100);document.getElementById('pbFill').style.width=pct+'%';document.getElementById('pbPct').textContent=pct+'%';document.getElementById('pbName').textContent=STEP_NAMES[currentStep]||''}
 
     // ── Data definitions ──
@@ -1013,6 +509,20 @@ WIZARD_PAGE = """
         };
     }
 
+    // ── Preview ao vivo da persona (servidor re-renderiza so os arquivos do step) ──
+    let pvTimer=null;
+    function previewPersona(step,file){
+        clearTimeout(pvTimer);
+        pvTimer=setTimeout(async()=>{
+            const box=document.getElementById('pv_'+step);if(!box||!box.open)return;
+            try{
+                const r=await fetch('/api/persona/preview',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({step,persona:collectPersona()})});
+                const d=await r.json();if(d.success&&d.files[file]!==undefined)document.getElementById('pv_'+step+'_body').textContent=d.files[file];
+            }catch(e){}
+        },250);
+    }
+    ['p_agentName','p_customRole','p_background'].forEach(id=>document.getElementById(id).addEventListener('input',()=>previewPersona('step4','IDENTITY.md')));
+
     // ── API Key validation ──
     let validatedProviders={};
     ['openai','openrouter'].forEach(p=>{
@@ -1029,17 +539,42 @@ WIZARD_PAGE = """
         const keyEl=document.getElementById(provider+'_key'),btn=document.getElementById(provider+'_validate'),st=document.getElementById(provider+'_status'),mw=document.getElementById(provider+'_model_wrap'),ms=document.getElementById(provider+'_model');
         const key=keyEl.value.trim();if(!key){st.className='ks invalid';st.textContent='Insira a chave primeiro.';return}
         btn.classList.add('loading');btn.textContent='Validando...';st.textContent='';mw.classList.remove('visible');
+        let validated=false;
+        // Snapshot do catalogo: picker aparece na hora enquanto a validacao roda
+        fetch('/api/models/'+provider+'/snapshot').then(r=>r.ok?r.json():null).then(d=>{
+            if(validated||!d||!d.models||!d.models.length)return;
+            fillModels(ms,provider,d.models);mw.classList.add('visible');
+        }).catch(()=>{});
         try{
-            const r=await fetch('/api/validate-key',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({provider,key})});const d=await r.json();
+            const r=await fetch('/api/validate-key',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({provider,key})});const d=await r.json();validated=true;
             if(d.success&&d.models&&d.models.length>0){
-                st.className='ks valid';st.innerHTML='&#10003; Chave valida — '+d.models.length+' modelos';btn.classList.add('valid');btn.textContent='✓';
-                ms.innerHTML='';d.models.forEach(m=>{const o=document.createElement('option');o.value=provider+'/'+m.id;o.textContent=m.name||m.id;ms.appendChild(o)});
+                st.className='ks valid';st.innerHTML='&#10003; Chave valida — '+(d.total||d.models.length)+' modelos';btn.classList.add('valid');btn.textContent='✓';
+                fillModels(ms,provider,d.models);
                 mw.classList.add('visible');validatedProviders[provider]=true;
-            }else{st.className='ks invalid';st.textContent=d.error||'Chave invalida.';btn.classList.remove('valid');btn.textContent='Validar';validatedProviders[provider]=false}
-        }catch(e){st.className='ks invalid';st.textContent='Erro: '+e.message;btn.textContent='Validar'}
+            }else{mw.classList.remove('visible');st.className='ks invalid';st.textContent=d.error||'Chave invalida.';btn.classList.remove('valid');btn.textContent='Validar';validatedProviders[provider]=false}
+        }catch(e){validated=true;mw.classList.remove('visible');st.className='ks invalid';st.textContent='Erro: '+e.message;btn.textContent='Validar'}
         btn.classList.remove('loading');
     }
 
+    function fillModels(ms,provider,models){
+        const cur=ms.value;ms.innerHTML='';
+        models.forEach(m=>{const o=document.createElement('option');o.value=provider+'/'+m.id;o.textContent=m.name||m.id;ms.appendChild(o)});
+        if(cur&&[...ms.options].some(o=>o.value===cur))ms.value=cur;
+    }
+
+    // Busca no servidor (catalogo completo), paginas pequenas; debounce de 200ms
+    let searchTimers={};
+    function searchModels(provider){
+        clearTimeout(searchTimers[provider]);
+        searchTimers[provider]=setTimeout(async()=>{
+            const q=document.getElementById(provider+'_model_q').value.trim();
+            try{
+                const r=await fetch('/api/models/search?provider='+provider+'&limit=50&q='+encodeURIComponent(q));const d=await r.json();
+                if(d.success)fillModels(document.getElementById(provider+'_model'),provider,d.models);
+            }catch(e){}
+        },200);
+    }
+
     function validateStep2(){
         const ak=document.getElementById('anthropic_key').value.trim(),ok=document.getElementById('openai_key').value.trim(),rk=document.getElementById('openrouter_key').value.trim();
         const err=document.getElementById('step2Error');
@@ -1052,60 +587,342 @@ WIZARD_PAGE = """
         err.className='sm';err.style.display='none';goTo(3);
     }
 
-    function validateStep9(){
-        const token=document.getElementById('telegram_token').value.trim();const err=document.getElementById('step9Error');
-        if(!token){err.className='sm error';err.textContent='O token do bot e obrigatorio.';return}
-        if(!token.includes(':')){err.className='sm error';err.textContent='Token invalido. Formato: 1234567890:ABCdef...';return}
-        err.className='sm';err.style.display='none';startDeploy();
-    }
+    async function validateStep9(){
+        const token=document.getElementById('telegram_token').value.trim();const err=document.getElementById('step9Error');
+        if(!token){err.className='sm error';err.textContent='O token do bot e obrigatorio.';return}
+        if(!token.includes(':')){err.className='sm error';err.textContent='Token invalido. Formato: 1234567890:ABCdef...';return}
+        // Todas as credenciais de uma vez (chaves vem do cache; Telegram via getMe)
+        err.style.display='';err.className='sm info';err.textContent='Verificando credenciais...';
+        try{
+            const body={telegram_token:token};
+            ['anthropic','openai','openrouter'].forEach(p=>{const v=document.getElementById(p+'_key').value.trim();if(v)body[p+'_key']=v});
+            const r=await fetch('/api/validate-keys',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify(body)});const d=await r.json();
+            const bad=Object.entries(d.results||{}).filter(([,v])=>!v.success);
+            if(bad.length){err.className='sm error';err.textContent=bad.map(([k,v])=>k+': '+v.error).join(' | ');return}
+        }catch(e){/* Falha de rede na checagem nao bloqueia o deploy */}
+        err.className='sm';err.style.display='none';startDeploy();
+    }
+
+    async function startDeploy(){
+        goTo(10);const msg=document.getElementById('loadingMsg'),err=document.getElementById('step10Error');
+        try{
+            const r=await fetch('/api/setup',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({
+                anthropic_key:document.getElementById('anthropic_key').value.trim(),
+                openai_key:document.getElementById('openai_key').value.trim(),
+                openrouter_key:document.getElementById('openrouter_key').value.trim(),
+                telegram_token:document.getElementById('telegram_token').value.trim(),
+                selected_model:document.getElementById('anthropic_model').value||document.getElementById('openai_model').value||document.getElementById('openrouter_model').value||'',
+                persona:collectPersona()
+            })});
+            const d=await r.json();
+            if(!d.success){err.className='sm error';err.textContent='Erro: '+d.error;return}
+            const job=await followSetup(d.job_id,j=>{const s=j.steps.filter(s=>s.status==='running').pop();if(s)msg.textContent=s.label+'...'});
+            if(job.status==='success'){setupData=job.result;goTo(11);startPairingCountdown()}
+            else{err.className='sm error';err.textContent='Erro: '+job.error}
+        }catch(e){err.className='sm error';err.textContent='Erro: '+e.message}
+    }
+
+    // Acompanha o job de setup via SSE; cai para polling se o stream cair
+    function followSetup(id,onUpdate){
+        return new Promise((resolve,reject)=>{
+            const done=j=>['success','error'].includes(j.status);
+            const poll=async()=>{
+                try{const r=await fetch('/api/setup/status/'+id);const j=await r.json();
+                    if(r.status===404){reject(new Error(j.error));return}
+                    onUpdate(j);if(done(j)){resolve(j);return}}catch(e){}
+                setTimeout(poll,2000);
+            };
+            if(!window.EventSource){poll();return}
+            const es=new EventSource('/api/setup/stream/'+id);
+            es.onmessage=ev=>{const j=JSON.parse(ev.data);onUpdate(j);if(done(j)){es.close();resolve(j)}};
+            es.onerror=()=>{es.close();poll()};
+        });
+    }
+
+    function startPairingCountdown(){
+        const notice=document.getElementById('pairingNotice'),cd=document.getElementById('pairingCountdown'),inp=document.getElementById('pairingInputArea'),btn=document.getElementById('pairingBtn'),retry=document.getElementById('pairingRetry');
+        let sec=15;const t=setInterval(()=>{sec--;cd.textContent=sec;if(sec<=0){clearInterval(t);notice.innerHTML='<span style="color:var(--success)">&#10003;</span> <span>Bot online! Envie uma mensagem e cole o codigo abaixo.</span>';notice.classList.add('ready');inp.style.opacity='1';inp.style.pointerEvents='auto';btn.disabled=false;retry.style.display='block';document.getElementById('pairing_code').focus()}},1000);
+    }
+
+    async function submitPairing(){
+        const code=document.getElementById('pairing_code').value.trim().toUpperCase(),err=document.getElementById('step11Error'),btn=document.getElementById('pairingBtn');
+        if(!code||code.length<4){err.className='sm error';err.textContent='Digite o codigo de pareamento.';return}
+        btn.disabled=true;btn.textContent='Verificando...';err.className='sm';err.style.display='none';
+        try{
+            const r=await fetch('/api/pairing',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({code})});const d=await r.json();
+            if(d.success){showSuccess()}else{err.className='sm error';err.textContent='Erro: '+d.error;btn.disabled=false;btn.textContent='Confirmar Pareamento'}
+        }catch(e){err.className='sm error';err.textContent='Erro: '+e.message;btn.disabled=false;btn.textContent='Confirmar Pareamento'}
+    }
+
+    async function skipPairing(){try{await fetch('/api/skip-pairing',{method:'POST'})}catch(e){}showSuccess()}
+    function showSuccess(){if(setupData.url)document.getElementById('dashboardLink').href=setupData.url;goTo(12)}
+
+    // ── Timezone toggle ──
+    document.getElementById('p_timezone').addEventListener('change',function(){document.getElementById('p_timezoneCustom').style.display=this.value==='other'?'block':'none'});
+    // ── About char count ──
+    document.getElementById('p_aboutYou').addEventListener('input',function(){const n=this.value.length;const el=document.getElementById('aboutCount');el.textContent=n+' caracteres'+(n>300?' ✓ Otimo!':'');el.className=n>300?'cc ok':'cc'});
+
+    // ── Init all renders ──
+    renderVals();renderBiz();renderComm();renderChal();renderTools();renderProf();renderPri();
+    renderGender();renderEmoji();renderRole();renderTone();renderAnti();renderBeh();
+    renderFree();renderAsk();renderHbFreq();renderHbCheck();updatePB();
+"""
+
+WIZARD_PAGE = """
+<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>OpenClaw Setup — Comunidade Claw Brasil</title>
+    <link rel="stylesheet" href="{{ css_url }}">
+</head>
+<body>
+    <!-- Progress Bar -->
+    <div class="pb-wrap">
+        <div class="pb-inner">
+            <div class="pb-label">
+                <span class="pb-name" id="pbName">Bem-vindo</span>
+                <span class="pb-pct" id="pbPct">0%</span>
+            </div>
+            <div class="pb-track"><div class="pb-fill" id="pbFill" style="width:0%"></div></div>
+        </div>
+    </div>
+
+    <div class="wz">
+        <div class="card">
+            <!-- Step 1: Welcome -->
+            <div class="step active" id="step1">
+                <div class="hero-glow">
+                    <div class="hero">
+                        <div style="display:flex;align-items:center;justify-content:center;gap:16px;margin-bottom:24px">
+                            <img src="https://upload.wikimedia.org/wikipedia/commons/5/5e/Openclaw-logo-text-dark.png" alt="OpenClaw" style="height:44px" />
+                            <span style="color:#3a3a3a;font-size:24px;font-weight:300">+</span>
+                            <img src="https://lurahosting.com.br/images/logo.png" alt="Lura Hosting" style="height:44px" />
+                        </div>
+                        <h1>Comunidade <span class="red">Claw</span> Brasil<br>+ <span class="orange">Lura</span> Hosting</h1>
+                        <p class="sub" style="margin-top:12px">Configure seu assistente pessoal de IA<br>em poucos minutos.</p>
+                        <button class="bf" onclick="goTo(2)">Configurar meu OpenClaw &rarr;</button>
+                        <p class="hero-brand">Powered by <span>bisnishub</span></p>
+                    </div>
+                </div>
+            </div>
+
+            <!-- Step 2: API Keys -->
+            <div class="step" id="step2">
+                <h2>Chaves de API</h2>
+                <p class="sub">Insira pelo menos a chave da Anthropic e valide para escolher o modelo.</p>
+                <div class="fg">
+                    <label>Anthropic API Key *</label>
+                    <p class="hint">Obtenha em <a href="https://console.anthropic.com" target="_blank">console.anthropic.com</a></p>
+                    <div class="kr"><input type="text" id="anthropic_key" placeholder="sk-ant-api03-..." class="mono" autocomplete="off" spellcheck="false"><button type="button" class="vb" id="anthropic_validate" onclick="validateKey('anthropic')">Validar</button></div>
+                    <div class="ks" id="anthropic_status"></div>
+                    <div class="msw" id="anthropic_model_wrap"><label>Modelo</label><input type="text" class="mq" id="anthropic_model_q" placeholder="Buscar modelo..." oninput="searchModels('anthropic')"><select id="anthropic_model"></select></div>
+                </div>
+                <div class="fg">
+                    <label>OpenAI API Key <span style="color:#666;font-weight:400">(opcional)</span></label>
+                    <p class="hint">Obtenha em <a href="https://platform.openai.com/api-keys" target="_blank">platform.openai.com</a></p>
+                    <div class="kr"><input type="text" id="openai_key" placeholder="sk-..." class="mono" autocomplete="off" spellcheck="false"><button type="button" class="vb" id="openai_validate" onclick="validateKey('openai')" style="display:none">Validar</button></div>
+                    <div class="ks" id="openai_status"></div>
+                    <div class="msw" id="openai_model_wrap"><label>Modelo</label><input type="text" class="mq" id="openai_model_q" placeholder="Buscar modelo..." oninput="searchModels('openai')"><select id="openai_model"></select></div>
+                </div>
+                <div class="fg">
+                    <label>OpenRouter API Key <span style="color:#666;font-weight:400">(opcional)</span></label>
+                    <p class="hint">Obtenha em <a href="https://openrouter.ai/keys" target="_blank">openrouter.ai</a></p>
+                    <div class="kr"><input type="text" id="openrouter_key" placeholder="sk-or-v1-..." class="mono" autocomplete="off" spellcheck="false"><button type="button" class="vb" id="openrouter_validate" onclick="validateKey('openrouter')" style="display:none">Validar</button></div>
+                    <div class="ks" id="openrouter_status"></div>
+                    <div class="msw" id="openrouter_model_wrap"><label>Modelo</label><input type="text" class="mq" id="openrouter_model_q" placeholder="Buscar modelo..." oninput="searchModels('openrouter')"><select id="openrouter_model"></select></div>
+                </div>
+                <div id="step2Error" class="sm"></div>
+                <div class="br"><button class="btn bb" onclick="goTo(1)">Voltar</button><button class="btn bn" id="step2Next" onclick="validateStep2()">Proximo &rarr;</button></div>
+            </div>
+
+            <!-- Step 3: Sobre Voce -->
+            <div class="step" id="step3">
+                <h2>Sobre Voce</h2>
+                <p class="sub">Quanto mais contexto, melhor seu agente te atende.</p>
+                <div class="stitle">Dados Basicos</div>
+                <div class="g2">
+                    <div class="fg"><label>Nome completo *</label><input type="text" id="p_fullName" placeholder="Seu nome completo"></div>
+                    <div class="fg"><label>Como prefere ser chamado</label><input type="text" id="p_nickname" placeholder="Ex: Eduardo, Edu"></div>
+                </div>
+                <div class="fg"><label>Timezone</label>
+                    <select id="p_timezone">
+                        <option value="America/Sao_Paulo">Brasilia (SP/RJ/MG)</option>
+                        <option value="America/Manaus">Manaus (AM)</option>
+                        <option value="America/Recife">Recife (PE)</option>
+                        <option value="America/Fortaleza">Fortaleza (CE)</option>
+                        <option value="America/Belem">Belem (PA)</option>
+                        <option value="America/Cuiaba">Cuiaba (MT)</option>
+                        <option value="America/Porto_Velho">Porto Velho (RO)</option>
+                        <option value="America/Rio_Branco">Rio Branco (AC)</option>
+                        <option value="other">Outro</option>
+                    </select>
+                    <input type="text" id="p_timezoneCustom" placeholder="Ex: Europe/Lisbon" style="display:none;margin-top:6px">
+                </div>
+                <div class="stitle">Quem e Voce</div>
+                <div class="fg">
+                    <textarea id="p_aboutYou" rows="5" placeholder="Me conta em 2-3 paragrafos: o que voce faz, seu negocio, sua historia..."></textarea>
+                    <div class="cc" id="aboutCount">0 caracteres</div>
+                </div>
+                <div class="stitle">Seus Negocios / Projetos</div>
+                <div id="bizList"></div>
+                <button class="abz" onclick="addBiz()">+ Adicionar negocio</button>
+                <div class="stitle">Seus Valores <span style="font-weight:400;font-size:11px;color:var(--muted)">(<span id="valCount">0</span>/5)</span></div>
+                <div class="g2" id="valGrid"></div>
+                <div class="ar"><input type="text" id="customVal" placeholder="Outro valor..."><button class="ab" onclick="addCustomVal()">+</button></div>
+                <div class="br"><button class="btn bb" onclick="goTo(2)">Voltar</button><button class="btn bn" onclick="goTo(4)">Proximo &rarr;</button></div>
+            </div>
+
+            <!-- Step 4: Estilo de Trabalho -->
+            <div class="step" id="step4">
+                <h2>Seu Estilo de Trabalho</h2>
+                <p class="sub">Seu agente precisa saber seu ritmo.</p>
+                <div class="stitle">Comunicacao</div>
+                <p style="font-size:12px;color:var(--muted);margin-bottom:8px">Como gosta de receber informacao?</p>
+                <div class="g2" id="commGrid"></div>
+                <div class="stitle">Horarios</div>
+                <div class="g3" id="timeBlocks">
+                    <div class="tb"><div class="tbl">&#128263; Silencio</div><div class="tbi"><input type="time" id="t_sil_from" value="22:00"><span class="ts">ate</span><input type="time" id="t_sil_to" value="07:00"></div></div>
+                    <div class="tb"><div class="tbl">&#127919; Foco</div><div class="tbi"><input type="time" id="t_foc_from" value="09:00"><span class="ts">ate</span><input type="time" id="t_foc_to" value="12:00"></div></div>
+                    <div class="tb"><div class="tbl">&#128276; Notificacoes</div><div class="tbi"><input type="time" id="t_not_from" value="08:00"><span class="ts">ate</span><input type="time" id="t_not_to" value="20:00"></div></div>
+                </div>
+                <div class="stitle">Seus Desafios</div>
+                <div class="g2" id="chalGrid"></div>
+                <div class="ar"><input type="text" id="customChal" placeholder="Outro desafio..."><button class="ab" onclick="addCustomChal()">+</button></div>
+                <div class="stitle">Ferramentas que ja usa</div>
+                <div class="g2" id="toolGrid"></div>
+                <div class="ar"><input type="text" id="customTool" placeholder="Outra ferramenta..."><button class="ab" onclick="addCustomTool()">+</button></div>
+                <div class="br"><button class="btn bb" onclick="goTo(3)">Voltar</button><button class="btn bn" onclick="goTo(5)">Proximo &rarr;</button></div>
+            </div>
+
+            <!-- Step 5: Seu Perfil -->
+            <div class="step" id="step5">
+                <h2>Seu Perfil</h2>
+                <p class="sub">Isso define quais superpoderes seu agente vai ter.</p>
+                <div class="stitle">Perfil Principal</div>
+                <div class="g2" id="profGrid"></div>
+                <div id="priSection" style="display:none">
+                    <div class="stitle">Prioridades <span style="font-weight:400;font-size:11px;color:var(--muted)">(use setas para reordenar)</span></div>
+                    <div id="priList"></div>
+                </div>
+                <div class="br"><button class="btn bb" onclick="goTo(4)">Voltar</button><button class="btn bn" onclick="goTo(6)">Proximo &rarr;</button></div>
+            </div>
+
+            <!-- Step 6: De Vida ao Agente -->
+            <div class="step" id="step6">
+                <h2>De Vida ao Seu Agente</h2>
+                <p class="sub">Escolha nome, personalidade e aparencia.</p>
+                <div class="stitle">Nome do Agente</div>
+                <div style="text-align:center"><input type="text" id="p_agentName" class="ani" placeholder="Clawdete"></div>
+                <p style="font-size:11px;color:var(--muted);text-align:center;margin-top:4px">Escolha um nome que voce se sinta confortavel chamando</p>
+                <div class="stitle">Genero</div>
+                <div class="g3" id="genderGrid"></div>
+                <div class="stitle">Emoji</div>
+                <div class="eg" id="emojiGrid"></div>
+                <div class="ar" style="max-width:220px"><input type="text" id="customEmoji" placeholder="Outro..." maxlength="4"><button class="ab" onclick="setCustomEmoji()">OK</button></div>
+                <div class="stitle">Papel Principal</div>
+                <div class="g2" id="roleGrid"></div>
+                <div id="customRoleWrap" style="display:none;margin-top:8px"><textarea id="p_customRole" rows="3" placeholder="Descreva o papel ideal para seu agente..."></textarea></div>
+                <div class="stitle">Background / Historia</div>
+                <textarea id="p_background" rows="4" placeholder="Ex: Nasceu no Workshop OpenClaw Brasil. Foi treinada pra ser o braco direito de um empreendedor..."></textarea>
+                <p style="font-size:11px;color:var(--muted);margin-top:4px">Pode ser ficticio! O importante e ser coerente com o papel.</p>
+                <details class="pvw" id="pv_step4" ontoggle="previewPersona('step4','IDENTITY.md')"><summary>Pre-visualizar IDENTITY.md</summary><pre id="pv_step4_body"></pre></details>
+                <div class="br"><button class="btn bb" onclick="goTo(5)">Voltar</button><button class="btn bn" onclick="goTo(7)">Proximo &rarr;</button></div>
+            </div>
+
+            <!-- Step 7: Personalidade -->
+            <div class="step" id="step7">
+                <h2>Personalidade do Agente</h2>
+                <p class="sub">Personalidade forte = agente util. Generico = chatbot qualquer.</p>
+                <div class="stitle">Tom de Voz</div>
+                <div class="g2" id="toneGrid"></div>
+                <div class="stitle">Anti-Patterns <span style="font-weight:400;font-size:11px;color:var(--muted)">— O que te IRRITA?</span></div>
+                <div class="g1" id="antiGrid"></div>
+                <div class="ar"><input type="text" id="customAnti" placeholder="Outro..."><button class="ab" onclick="addCustomAnti()">+</button></div>
+                <div class="stitle">Comportamentos Desejados <span style="font-weight:400;font-size:11px;color:var(--muted)">— O que voce VALORIZA?</span></div>
+                <div class="g1" id="behGrid"></div>
+                <div class="ar"><input type="text" id="customBeh" placeholder="Outro..."><button class="ab" onclick="addCustomBeh()">+</button></div>
+                <div class="br"><button class="btn bb" onclick="goTo(6)">Voltar</button><button class="btn bn" onclick="goTo(8)">Proximo &rarr;</button></div>
+            </div>
 
-    async function startDeploy(){
-        goTo(10);const msg=document.getElementById('loadingMsg'),err=document.getElementById('step10Error');
-        const msgs=['Configurando sua instancia...','Instalando configuracoes do OpenClaw...','Gerando personalidade do agente...','Conectando bot do Telegram...','Iniciando OpenClaw Gateway...'];
-        let mi=0;const iv=setInterval(()=>{mi=(mi+1)%msgs.length;msg.textContent=msgs[mi]},3000);
-        try{
-            const r=await fetch('/api/setup',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({
-                anthropic_key:document.getElementById('anthropic_key').value.trim(),
-                openai_key:document.getElementById('openai_key').value.trim(),
-                openrouter_key:document.getElementById('openrouter_key').value.trim(),
-                telegram_token:document.getElementById('telegram_token').value.trim(),
-                selected_model:document.getElementById('anthropic_model').value||document.getElementById('openai_model').value||document.getElementById('openrouter_model').value||'',
-                persona:collectPersona()
-            })});
-            clearInterval(iv);const d=await r.json();
-            if(d.success){setupData=d;goTo(11);startPairingCountdown()}
-            else{err.className='sm error';err.textContent='Erro: '+d.error}
-        }catch(e){clearInterval(iv);err.className='sm error';err.textContent='Erro: '+e.message}
-    }
+            <!-- Step 8: Regras -->
+            <div class="step" id="step8">
+                <h2>Regras do Agente</h2>
+                <p class="sub">Defina o que ele pode fazer sozinho.</p>
+                <div class="stitle">Livre pra Fazer</div>
+                <div class="g2" id="freeGrid"></div>
+                <div class="stitle">Precisa Perguntar Antes</div>
+                <div class="g2" id="askGrid"></div>
+                <div class="stitle">Frequencia de Heartbeats</div>
+                <div class="g2" id="hbFreqGrid" style="grid-template-columns:repeat(5,1fr)"></div>
+                <p style="font-size:11px;color:var(--muted);margin-top:4px" id="hbCost">~R$0,04/heartbeat. A cada 4h = 6x/dia = ~R$7/mes</p>
+                <div class="stitle">O que Checar no Heartbeat</div>
+                <div class="g2" id="hbCheckGrid"></div>
+                <div class="br"><button class="btn bb" onclick="goTo(7)">Voltar</button><button class="btn bn" onclick="goTo(9)">Proximo &rarr;</button></div>
+            </div>
 
-    function startPairingCountdown(){
-        const notice=document.getElementById('pairingNotice'),cd=document.getElementById('pairingCountdown'),inp=document.getElementById('pairingInputArea'),btn=document.getElementById('pairingBtn'),retry=document.getElementById('pairingRetry');
-        let sec=15;const t=setInterval(()=>{sec--;cd.textContent=sec;if(sec<=0){clearInterval(t);notice.innerHTML='<span style="color:var(--success)">&#10003;</span> <span>Bot online! Envie uma mensagem e cole o codigo abaixo.</span>';notice.classList.add('ready');inp.style.opacity='1';inp.style.pointerEvents='auto';btn.disabled=false;retry.style.display='block';document.getElementById('pairing_code').focus()}},1000);
-    }
+            <!-- Step 9: Telegram Bot -->
+            <div class="step" id="step9">
+                <h2>Criar Bot no Telegram</h2>
+                <p class="sub">Siga as instrucoes abaixo para criar seu bot.</p>
+                <div class="tgs">
+                    <div class="tgst"><div class="tgn">1</div><div class="tgt">Abra o Telegram e busque <code>BotFather</code> (bot oficial com selo azul)</div></div>
+                    <div class="tgst"><div class="tgn">2</div><div class="tgt">Inicie o chat e envie o comando <code>/newbot</code></div></div>
+                    <div class="tgst"><div class="tgn">3</div><div class="tgt">Siga as instrucoes para dar um <strong>nome</strong> e <strong>username</strong> ao seu bot</div></div>
+                    <div class="tgst"><div class="tgn">4</div><div class="tgt">O BotFather enviara um <strong>token</strong>. <strong>Copie-o.</strong></div></div>
+                </div>
+                <a href="https://t.me/BotFather" target="_blank" class="tob">
+                    <svg viewBox="0 0 24 24" xmlns="http://www.w3.org/2000/svg" style="width:16px;height:16px;fill:#fff;flex-shrink:0"><path d="M11.944 0A12 12 0 0 0 0 12a12 12 0 0 0 12 12 12 12 0 0 0 12-12A12 12 0 0 0 12 0a12 12 0 0 0-.056 0zm4.962 7.224c.1-.002.321.023.465.14a.506.506 0 0 1 .171.325c.016.093.036.306.02.472-.18 1.898-.962 6.502-1.36 8.627-.168.9-.499 1.201-.82 1.23-.696.065-1.225-.46-1.9-.902-1.056-.693-1.653-1.124-2.678-1.8-1.185-.78-.417-1.21.258-1.91.177-.184 3.247-2.977 3.307-3.23.007-.032.014-.15-.056-.212s-.174-.041-.249-.024c-.106.024-1.793 1.14-5.061 3.345-.479.33-.913.49-1.302.48-.428-.008-1.252-.241-1.865-.44-.752-.245-1.349-.374-1.297-.789.027-.216.325-.437.893-.663 3.498-1.524 5.83-2.529 6.998-3.014 3.332-1.386 4.025-1.627 4.476-1.635z"/></svg>
+                    Abrir BotFather no Telegram
+                </a>
+                <div class="fg"><label>Bot Token *</label><p class="hint">Cole o token que o BotFather enviou</p><input type="text" id="telegram_token" class="mono" placeholder="1234567890:ABCdefGHIjklMNOpqrsTUVwxyz" autocomplete="off" spellcheck="false"></div>
+                <div id="step9Error" class="sm"></div>
+                <div class="br"><button class="btn bb" onclick="goTo(8)">Voltar</button><button class="btn bn" onclick="validateStep9()">Implantar &rarr;</button></div>
+            </div>
 
-    async function submitPairing(){
-        const code=document.getElementById('pairing_code').value.trim().toUpperCase(),err=document.getElementById('step11Error'),btn=document.getElementById('pairingBtn');
-        if(!code||code.length<4){err.className='sm error';err.textContent='Digite o codigo de pareamento.';return}
-        btn.disabled=true;btn.textContent='Verificando...';err.className='sm';err.style.display='none';
-        try{
-            const r=await fetch('/api/pairing',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({code})});const d=await r.json();
-            if(d.success){showSuccess()}else{err.className='sm error';err.textContent='Erro: '+d.error;btn.disabled=false;btn.textContent='Confirmar Pareamento'}
-        }catch(e){err.className='sm error';err.textContent='Erro: '+e.message;btn.disabled=false;btn.textContent='Confirmar Pareamento'}
-    }
+            <!-- Step 10: Deploy -->
+            <div class="step" id="step10">
+                <div class="ls"><div class="sp"></div><div class="lm" id="loadingMsg">Configurando sua instancia...</div></div>
+                <div id="step10Error" class="sm"></div>
+            </div>
 
-    async function skipPairing(){try{await fetch('/api/skip-pairing',{method:'POST'})}catch(e){}showSuccess()}
-    function showSuccess(){if(setupData.url)document.getElementById('dashboardLink').href=setupData.url;goTo(12)}
+            <!-- Step 11: Pairing -->
+            <div class="step" id="step11">
+                <h2>Conectar seu Telegram</h2>
+                <p class="sub">Seu bot esta ativo! Agora vamos conectar voce.</p>
+                <div class="tgs">
+                    <div class="tgst"><div class="tgn">1</div><div class="tgt">Abra o Telegram e busque pelo nome do seu bot</div></div>
+                    <div class="tgst"><div class="tgn">2</div><div class="tgt">Clique em <strong>Iniciar</strong> (ou envie <strong>/start</strong>)</div></div>
+                    <div class="tgst"><div class="tgn">3</div><div class="tgt">Envie qualquer mensagem (ex: <strong>oi</strong>)</div></div>
+                    <div class="tgst"><div class="tgn">4</div><div class="tgt">O bot vai responder com um <strong>codigo de 8 caracteres</strong></div></div>
+                    <div class="tgst"><div class="tgn">5</div><div class="tgt">Digite o codigo abaixo</div></div>
+                </div>
+                <div class="pnot" id="pairingNotice"><div class="sps"></div><span>Aguarde <strong id="pairingCountdown">15</strong>s para o bot ficar online...</span></div>
+                <div class="pinp" id="pairingInputArea" style="opacity:.4;pointer-events:none"><input type="text" id="pairing_code" maxlength="8" placeholder="ABCD1234" autocomplete="off"></div>
+                <div id="step11Error" class="sm"></div>
+                <div id="step11Info" class="sm"></div>
+                <button class="bf" id="pairingBtn" onclick="submitPairing()" disabled>Confirmar Pareamento</button>
+                <div id="pairingRetry" style="display:none;text-align:center;margin-top:12px"><p style="color:var(--muted);font-size:13px">Nao recebeu o codigo? Envie outra mensagem para o bot.</p></div>
+                <p style="text-align:center;margin-top:12px"><a href="#" onclick="skipPairing()" style="color:#666;font-size:12px;text-decoration:none">Pular esta etapa (configurar depois)</a></p>
+            </div>
 
-    // ── Timezone toggle ──
-    document.getElementById('p_timezone').addEventListener('change',function(){document.getElementById('p_timezoneCustom').style.display=this.value==='other'?'block':'none'});
-    // ── About char count ──
-    document.getElementById('p_aboutYou').addEventListener('input',function(){const n=this.value.length;const el=document.getElementById('aboutCount');el.textContent=n+' caracteres'+(n>300?' ✓ Otimo!':'');el.className=n>300?'cc ok':'cc'});
+            <!-- Step 12: Success -->
+            <div class="step" id="step12">
+                <div style="text-align:center">
+                    <div class="si">&#10003;</div>
+                    <h2>Tudo pronto!</h2>
+                    <p class="sub">Seu OpenClaw esta configurado e funcionando no Telegram!</p>
+                    <p style="font-size:14px;color:#d4d4d4;margin-bottom:8px;line-height:1.6">O OpenClaw agora so responde a <strong>voce</strong>. Basta conversar com seu bot no Telegram.</p>
+                    <p style="font-size:13px;color:var(--muted);margin-bottom:20px;line-height:1.6">Voce pode acessar o Dashboard pelo link abaixo, mas todas as configuracoes podem ser feitas direto pelo Telegram.</p>
+                    <a id="dashboardLink" href="#" class="sl" target="_blank">Acessar Dashboard &rarr;</a>
+                    <div class="stip"><strong>Dica:</strong> Pelo Telegram voce pode configurar skills, prompts, modelos e muito mais!</div>
+                </div>
+            </div>
+        </div>
+    </div>
 
-    // ── Init all renders ──
-    renderVals();renderBiz();renderComm();renderChal();renderTools();renderProf();renderPri();
-    renderGender();renderEmoji();renderRole();renderTone();renderAnti();renderBeh();
-    renderFree();renderAsk();renderHbFreq();renderHbCheck();updatePB();
-    </script>
+    <script src="{{ js_url }}"></script>
 </body>
 </html>
 
@@ -1157,28 +974,77 @@ DONE_PAGE = """
 """
 
 
+# Compilados uma vez no import (nao a cada request)
+WIZARD_CSS_ASSET = assets.register("wizard", "css", WIZARD_CSS, "text/css; charset=utf-8")
+WIZARD_JS_ASSET = assets.register("wizard", "js", WIZARD_JS, "application/javascript; charset=utf-8")
+WIZARD_TEMPLATE = assets.PageCache(app.jinja_env.from_string(WIZARD_PAGE))
+DONE_TEMPLATE = assets.PageCache(app.jinja_env.from_string(DONE_PAGE))
+
+
 # ============================================================
 # Routes
 # ============================================================
 
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _observe_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        # Rota (template), nao o path: job ids e providers nao viram labels
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            route=route, method=request.method, status=response.status_code,
+        )
+    return response
+
+
+@app.route("/metrics")
+@require_token
+def metrics_endpoint():
+    """Metricas Prometheus (todos os workers do gunicorn)."""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+
 @app.route("/")
 def index():
     token = read_token()
-    server_ip = get_server_ip()
 
     if is_setup_done():
+        server_ip = get_server_ip()
         url = f"http://{server_ip}:18789/?token={token}"
-        return render_template_string(DONE_PAGE, url=url, token=token)
+        return DONE_TEMPLATE.render(url=url, token=token)
+
+    return WIZARD_TEMPLATE.render(
+        token=token, css_url=WIZARD_CSS_ASSET.url, js_url=WIZARD_JS_ASSET.url,
+    )
+
+
+@app.route("/static/<filename>")
+def static_asset(filename):
+    """CSS/JS do wizard com hash no nome: cache imutavel + gzip/brotli pre-comprimidos."""
+    asset = assets.get(filename)
+    if asset is None:
+        return jsonify({"error": "Not found"}), 404
+    return assets.serve(asset)
+
 
-    return render_template_string(WIZARD_PAGE, token=token)
+@app.route("/api/cli-worker/warm", methods=["POST"])
+def warm_cli_worker():
+    """Subir o CLI worker quando o usuario chega ao ultimo passo do formulario."""
+    if is_setup_done():
+        return jsonify({"success": False, "error": "Setup ja concluido."})
+    cliworker.start_in_background()
+    return jsonify({"success": True})
 
 
 @app.route("/api/validate-key", methods=["POST"])
 def validate_key():
-    """Validar chave de API e retornar modelos disponiveis."""
-    import urllib.request
-    import urllib.error
-
+    """Validar chave de API e retornar modelos disponiveis (com cache por chave)."""
     data = request.get_json()
     if not data:
         return jsonify({"success": False, "error": "Dados invalidos."})
@@ -1189,75 +1055,90 @@ def validate_key():
     if not key:
         return jsonify({"success": False, "error": "Chave nao informada."})
 
+    t0 = time.monotonic()
     try:
-        if provider == "anthropic":
-            req = urllib.request.Request(
-                "https://api.anthropic.com/v1/models",
-                headers={
-                    "x-api-key": key,
-                    "anthropic-version": "2023-06-01",
-                },
-            )
-            with urllib.request.urlopen(req, timeout=15) as resp:
-                body = json.loads(resp.read().decode())
-            raw_models = body.get("data", [])
-            models = []
-            for m in raw_models:
-                mid = m.get("id", "")
-                if "claude" in mid.lower():
-                    name = mid.replace("-", " ").title()
-                    models.append({"id": mid, "name": name})
-            models.sort(key=lambda x: x["id"], reverse=True)
-
-        elif provider == "openai":
-            req = urllib.request.Request(
-                "https://api.openai.com/v1/models",
-                headers={"Authorization": f"Bearer {key}"},
-            )
-            with urllib.request.urlopen(req, timeout=15) as resp:
-                body = json.loads(resp.read().decode())
-            raw_models = body.get("data", [])
-            models = []
-            for m in raw_models:
-                mid = m.get("id", "")
-                if any(mid.startswith(p) for p in ["gpt-4", "gpt-3.5", "o1", "o3", "o4", "chatgpt"]):
-                    models.append({"id": mid, "name": mid})
-            models.sort(key=lambda x: x["id"], reverse=True)
-
-        elif provider == "openrouter":
-            req = urllib.request.Request(
-                "https://openrouter.ai/api/v1/models",
-                headers={"Authorization": f"Bearer {key}"},
-            )
-            with urllib.request.urlopen(req, timeout=15) as resp:
-                body = json.loads(resp.read().decode())
-            raw_models = body.get("data", [])
-            models = []
-            for m in raw_models:
-                mid = m.get("id", "")
-                name = m.get("name", mid)
-                models.append({"id": mid, "name": name})
-            # Limitar a 80 modelos mais relevantes
-            models = models[:80]
-
-        else:
-            return jsonify({"success": False, "error": f"Provider desconhecido: {provider}"})
-
-        if not models:
-            return jsonify({"success": False, "error": "Nenhum modelo encontrado. Verifique a chave."})
-
-        return jsonify({"success": True, "models": models})
-
-    except urllib.error.HTTPError as e:
-        if e.code == 401:
-            return jsonify({"success": False, "error": "Chave invalida (401 Unauthorized)."})
-        return jsonify({"success": False, "error": f"Erro HTTP {e.code} ao validar chave."})
+        models, cached = catalog.cache.get(provider, key)
+    except catalog.CatalogError as e:
+        credentials.record(provider, time.monotonic() - t0, e)
+        return jsonify({"success": False, "error": str(e)})
     except Exception as e:
+        credentials.record(provider, time.monotonic() - t0, e)
         return jsonify({"success": False, "error": f"Erro ao validar: {str(e)[:200]}"})
 
+    if not models:
+        credentials.record(provider, time.monotonic() - t0, "empty")
+        return jsonify({"success": False, "error": "Nenhum modelo encontrado. Verifique a chave."})
+    credentials.record(provider, time.monotonic() - t0)
+
+    # Primeira pagina apenas; o restante e alcancado via /api/models/search
+    return jsonify({"success": True, "models": modelindex.page(models), "total": len(models), "cached": cached})
+
+
+@app.route("/api/validate-keys", methods=["POST"])
+def validate_keys():
+    """Validar todas as credenciais do formulario em paralelo (inclui Telegram getMe)."""
+    data = request.get_json()
+    if not data:
+        return jsonify({"success": False, "error": "Dados invalidos."})
+
+    t0 = time.monotonic()
+    results = credentials.validate_all(data)
+    if not results:
+        return jsonify({"success": False, "error": "Nenhuma credencial informada."})
+    return jsonify({
+        "success": all(r["success"] for r in results.values()),
+        "results": results,
+        "total_ms": int((time.monotonic() - t0) * 1000),
+    })
+
+
+@app.route("/api/models/<provider>/snapshot")
+def models_snapshot(provider):
+    """Ultimo catalogo salvo do provider, para o picker renderizar sem esperar a API."""
+    snap = catalog.load_snapshot(provider)
+    if not snap:
+        return jsonify({"success": False, "error": "Sem catalogo salvo."}), 404
+    return jsonify({
+        "success": True,
+        "models": modelindex.page(snap["models"]),
+        "total": len(snap["models"]),
+        "fetched_at": snap["fetched_at"],
+    })
+
+
+@app.route("/api/models/search")
+def models_search():
+    """Busca paginada (prefixo, tokens e fuzzy) no catalogo em cache do provider."""
+    provider = request.args.get("provider", "").strip()
+    index = modelindex.for_provider(provider)
+    if index is None:
+        return jsonify({"success": False, "error": "Valide a chave do provider primeiro."}), 404
+    try:
+        offset = max(0, int(request.args.get("offset", 0)))
+        limit = min(modelindex.MAX_LIMIT, max(1, int(request.args.get("limit", modelindex.DEFAULT_LIMIT))))
+    except ValueError:
+        return jsonify({"success": False, "error": "Paginacao invalida."}), 400
+    total, items = index.search(request.args.get("q", ""), offset, limit)
+    return jsonify({"success": True, "total": total, "offset": offset, "limit": limit, "models": items})
+
+
+@app.route("/api/persona/preview", methods=["POST"])
+def persona_preview():
+    """Renderiza so os arquivos de persona afetados pelo step editado (preview ao vivo)."""
+    data = request.get_json(silent=True) or {}
+    step = data.get("step")
+    if step is not None and step not in persona_renderer.STEPS:
+        return jsonify({"success": False, "error": "Step invalido."}), 400
+    try:
+        files = persona_renderer.preview(data.get("persona") or {}, step)
+    except (AttributeError, TypeError):
+        return jsonify({"success": False, "error": "Dados de persona invalidos."}), 400
+    return jsonify({"success": True, "files": files})
+
 
 @app.route("/api/setup", methods=["POST"])
 def setup():
+    """Validar dados e iniciar o setup em background (retorna job_id)."""
     if is_setup_done():
         return jsonify({"success": False, "error": "Setup ja foi realizado."})
 
@@ -1265,263 +1146,547 @@ def setup():
     if not data:
         return jsonify({"success": False, "error": "Dados invalidos."})
 
-    anthropic_key = data.get("anthropic_key", "").strip()
-    openai_key = data.get("openai_key", "").strip()
-    openrouter_key = data.get("openrouter_key", "").strip()
-    telegram_token = data.get("telegram_token", "").strip()
-    selected_model = data.get("selected_model", "").strip()
+    params = {
+        "anthropic_key": data.get("anthropic_key", "").strip(),
+        "openai_key": data.get("openai_key", "").strip(),
+        "openrouter_key": data.get("openrouter_key", "").strip(),
+        "telegram_token": data.get("telegram_token", "").strip(),
+        "selected_model": data.get("selected_model", "").strip(),
+        "persona": data.get("persona", {}),
+    }
 
     # Validar que pelo menos uma API key foi fornecida
-    if not anthropic_key and not openai_key and not openrouter_key:
+    if not params["anthropic_key"] and not params["openai_key"] and not params["openrouter_key"]:
         return jsonify({"success": False, "error": "Forneca pelo menos uma chave de API."})
-    if anthropic_key and not re.match(r"^sk-ant-", anthropic_key):
+    if params["anthropic_key"] and not re.match(r"^sk-ant-", params["anthropic_key"]):
         return jsonify({"success": False, "error": "Anthropic API Key deve comecar com sk-ant-"})
 
     # Validar Telegram token
-    if not telegram_token or ":" not in telegram_token:
+    if not params["telegram_token"] or ":" not in params["telegram_token"]:
         return jsonify({"success": False, "error": "Telegram Bot Token invalido."})
 
-    token = read_token()
+    # Duplo clique / fetch repetido (em qualquer worker) reaproveita o job em andamento
+    try:
+        job_id, attached = jobs.submit_once(journal_digest(params), run_setup, params)
+    except jobs.JobBusy:
+        # Sem o job_id: o resultado do outro job (token, URL) nao e de quem pediu
+        return jsonify({
+            "success": False,
+            "error": "Ja existe um setup em andamento com outros dados. Aguarde ele terminar.",
+        }), 409
+    return jsonify({"success": True, "job_id": job_id, "attached": attached}), 202
+
+
+@app.route("/api/setup/status/<job_id>")
+def setup_status(job_id):
+    """Estado atual de um job de setup (steps, tempos e resultado)."""
+    job = jobs.load_job(job_id)
+    if not job:
+        return jsonify({"success": False, "error": "Job nao encontrado."}), 404
+    return jsonify(job)
+
+
+@app.route("/api/setup/stream/<job_id>")
+def setup_stream(job_id):
+    """Server-Sent Events com o estado do job a cada mudanca."""
+    if not jobs.load_job(job_id):
+        return jsonify({"success": False, "error": "Job nao encontrado."}), 404
+
+    def events():
+        last = None
+        deadline = time.time() + 900
+        while time.time() < deadline:
+            job = jobs.load_job(job_id)
+            payload = json.dumps(job)
+            if payload != last:
+                last = payload
+                yield f"data: {payload}\n\n"
+            if job["status"] in jobs.TERMINAL_STATUSES:
+                return
+            time.sleep(0.5)
+
+    return Response(events(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
 
-    # Salvar API keys no .env
-    if anthropic_key:
-        update_env("ANTHROPIC_API_KEY", anthropic_key)
-    if openai_key:
-        update_env("OPENAI_API_KEY", openai_key)
-    if openrouter_key:
-        update_env("OPENROUTER_API_KEY", openrouter_key)
-    update_env("TELEGRAM_BOT_TOKEN", telegram_token)
+@app.route("/api/setup/trace")
+@app.route("/api/setup/trace/<job_id>")
+@require_token
+def setup_trace(job_id=None):
+    """Spans de tempo do setup (ultimo job por padrao); ?format=chrome para chrome://tracing."""
+    job_id = job_id or jobs.latest_job_id()
+    trace = jobs.load_trace(job_id)
+    if trace is None:
+        return jsonify({"success": False, "error": "Trace nao encontrado."}), 404
+    if request.args.get("format") == "chrome":
+        return jsonify(tracing.chrome(trace["spans"], process_name="openclaw-setup"))
+    return jsonify(trace)
+
+
+def stage_env(ctx):
+    """Salvar API keys e variaveis obrigatorias no .env (uma unica escrita atomica)."""
+    env = EnvFile(ENV_FILE)
+    if ctx["anthropic_key"]:
+        env.set("ANTHROPIC_API_KEY", ctx["anthropic_key"])
+    if ctx["openai_key"]:
+        env.set("OPENAI_API_KEY", ctx["openai_key"])
+    if ctx["openrouter_key"]:
+        env.set("OPENROUTER_API_KEY", ctx["openrouter_key"])
+    env.set("TELEGRAM_BOT_TOKEN", ctx["telegram_token"])
 
     # Inicializar variaveis obrigatorias no .env (docker-compose espera todas)
-    update_env("OPENCLAW_GATEWAY_TOKEN", token)
-    update_env("CLAUDE_AI_SESSION_KEY", "")
-    update_env("CLAUDE_WEB_SESSION_KEY", "")
-    update_env("CLAUDE_WEB_COOKIE", "")
-    update_env("OPENCLAW_CONFIG_DIR", OPENCLAW_CONFIG_DIR)
-    update_env("OPENCLAW_WORKSPACE_DIR", f"{OPENCLAW_CONFIG_DIR}/workspace")
-    update_env("OPENCLAW_GATEWAY_PORT", "18789")
-    update_env("OPENCLAW_BRIDGE_PORT", "18790")
-    update_env("OPENCLAW_GATEWAY_BIND", "lan")
-
-    # Garantir que toda a estrutura de diretorios existe com permissoes corretas (UID 1000 = node no container)
+    env.update({
+        "OPENCLAW_GATEWAY_TOKEN": ctx["token"],
+        "CLAUDE_AI_SESSION_KEY": "",
+        "CLAUDE_WEB_SESSION_KEY": "",
+        "CLAUDE_WEB_COOKIE": "",
+        "OPENCLAW_CONFIG_DIR": OPENCLAW_CONFIG_DIR,
+        "OPENCLAW_WORKSPACE_DIR": f"{OPENCLAW_CONFIG_DIR}/workspace",
+        "OPENCLAW_GATEWAY_PORT": "18789",
+        "OPENCLAW_BRIDGE_PORT": "18790",
+        "OPENCLAW_GATEWAY_BIND": "lan",
+    })
+    env.commit()
+
+
+def prewarm_lock_held():
+    """prewarm.sh esta segurando o lock (rodando agora)."""
+    try:
+        fd = os.open(PREWARM_LOCK, os.O_RDONLY)
+    except FileNotFoundError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        return False
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+
+
+def prewarm_status():
+    """Estado do prewarm: done, running, queued, idle (nao vai rodar) ou None (sem como saber)."""
+    if os.path.exists(PREWARM_FILE):
+        return "done"
+    if os.path.exists(PREWARM_STARTED) and prewarm_lock_held():
+        return "running"
+    # Lock ainda nao existe: a unit pode estar na fila do boot, esperando o firstboot/docker
+    try:
+        active = subprocess.run(
+            ["systemctl", "is-active", PREWARM_UNIT], capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+        queued = subprocess.run(
+            ["systemctl", "list-jobs", "--no-legend", PREWARM_UNIT], capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if active in ("activating", "deactivating", "reloading"):
+        return "running"
+    if queued:
+        return "queued"
+    if active in ("active", "inactive", "failed"):
+        return "idle"
+    return None
+
+
+def stage_prewarm(ctx):
+    """Esperar o prewarm do firstboot (rodando ou na fila) terminar e ler o resultado.
+
+    Sem o arquivo de resultado (prewarm nao rodou, falhou, ou nao da para saber)
+    ctx["prewarm"] fica vazio e o onboard roda normalmente.
+    """
+    deadline = time.monotonic() + 180
+    with tracing.span("prewarm wait", cat="wait") as s:
+        status = prewarm_status()
+        while status in ("running", "queued") and time.monotonic() < deadline:
+            time.sleep(0.2)
+            status = prewarm_status()
+        s["exit_code"] = 0 if status == "done" else 1
+    ctx["prewarm"] = {}
+    if status == "done":
+        try:
+            with open(PREWARM_FILE, "r") as f:
+                ctx["prewarm"] = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+
+def stage_dirs(ctx):
+    """Garantir que toda a estrutura de diretorios existe (UID 1000 = node no container)."""
     for d in [OPENCLAW_CONFIG_DIR, AGENT_DIR, f"{OPENCLAW_CONFIG_DIR}/workspace"]:
-        os.makedirs(d, exist_ok=True)
-    subprocess.run(["chown", "-R", "1000:1000", OPENCLAW_CONFIG_DIR], capture_output=True)
+        tracker.makedirs(d)
+
 
-    # Limpar channels do openclaw.json antes do onboard (evita validacao com valores antigos)
+def stage_clean_config(ctx):
+    """Limpar channels do openclaw.json antes do onboard (evita validacao com valores antigos)."""
     pre_config_path = os.path.join(OPENCLAW_CONFIG_DIR, "openclaw.json")
     if os.path.exists(pre_config_path):
         try:
-            with open(pre_config_path, "r") as f:
-                pre_config = json.load(f)
-            if "channels" in pre_config:
-                del pre_config["channels"]
-                with open(pre_config_path, "w") as f:
-                    json.dump(pre_config, f, indent=2)
+            store_for(pre_config_path).patch([{"op": "remove", "path": "/channels", "missing_ok": True}])
         except Exception:
             pass
 
-    # Rodar onboard oficial do OpenClaw
+
+def prewarmed_config_ok(config_path):
+    """openclaw.json do onboard do prewarm esta completo (tem o token do gateway)."""
+    if not os.path.exists(config_path):
+        return False
+    try:
+        return bool(store_for(config_path).get("/gateway/auth/token"))
+    except (OSError, ValueError):
+        return False
+
+
+ONBOARD_ARGS = [
+    "onboard",
+    "--non-interactive", "--accept-risk",
+    "--mode", "local",
+    "--flow", "quickstart",
+    "--gateway-bind", "lan",
+    "--gateway-auth", "token",
+    "--skip-channels",
+    "--skip-skills",
+    "--skip-health",
+    "--no-install-daemon",
+]
+
+
+def stage_onboard(ctx):
+    """Rodar onboard oficial do OpenClaw (no CLI worker quente, se houver)."""
+    # Scaffolding ja feito no firstboot: as chaves entram via .env e auth-profiles
+    if ctx.get("prewarm", {}).get("onboard") and prewarmed_config_ok(ctx["config_path"]):
+        return
+    # Passar chaves disponiveis como env vars para o onboard
+    onboard_env = {}
+    if ctx["anthropic_key"]:
+        onboard_env["ANTHROPIC_API_KEY"] = ctx["anthropic_key"]
+    if ctx["openai_key"]:
+        onboard_env["OPENAI_API_KEY"] = ctx["openai_key"]
+    if ctx["openrouter_key"]:
+        onboard_env["OPENROUTER_API_KEY"] = ctx["openrouter_key"]
     try:
-        onboard_cmd = [
-            "docker", "compose", "-f", f"{OPENCLAW_DIR}/docker-compose.yml",
-            "run", "--rm",
-        ]
-        # Passar chaves disponiveis como env vars para o onboard
-        if anthropic_key:
-            onboard_cmd += ["-e", f"ANTHROPIC_API_KEY={anthropic_key}"]
-        if openai_key:
-            onboard_cmd += ["-e", f"OPENAI_API_KEY={openai_key}"]
-        if openrouter_key:
-            onboard_cmd += ["-e", f"OPENROUTER_API_KEY={openrouter_key}"]
-        onboard_cmd += [
-            "openclaw-cli", "onboard",
-                "--non-interactive", "--accept-risk",
-                "--mode", "local",
-                "--flow", "quickstart",
-                "--gateway-bind", "lan",
-                "--gateway-auth", "token",
-                "--skip-channels",
-                "--skip-skills",
-                "--skip-health",
-                "--no-install-daemon",
+        try:
+            onboard_result = cliworker.run(ONBOARD_ARGS, env=onboard_env, timeout=120)
+        except cliworker.WorkerUnavailable:
+            onboard_cmd = [
+                "docker", "compose", "-f", f"{OPENCLAW_DIR}/docker-compose.yml",
+                "run", "--rm",
             ]
-        onboard_result = subprocess.run(
-            onboard_cmd,
-            capture_output=True,
-            text=True,
-            timeout=120,
-            cwd=OPENCLAW_DIR,
-        )
-        if onboard_result.returncode != 0:
-            return jsonify({
-                "success": False,
-                "error": f"Onboard falhou: {onboard_result.stderr[:500]}"
-            })
+            # `-e KEY` sem valor: o compose le do ambiente. Chave no argv
+            # apareceria no `ps` e no str() de TimeoutExpired
+            for key in onboard_env:
+                onboard_cmd += ["-e", key]
+            onboard_cmd += ["openclaw-cli"] + ONBOARD_ARGS
+            onboard_result = tracing.run(
+                onboard_cmd,
+                capture_output=True,
+                text=True,
+                timeout=120,
+                cwd=OPENCLAW_DIR,
+                env=dict(os.environ, **onboard_env),
+            )
     except subprocess.TimeoutExpired:
-        return jsonify({"success": False, "error": "Timeout no onboard (120s)."})
+        raise SetupError("Timeout no onboard (120s).")
     except Exception as e:
-        return jsonify({"success": False, "error": f"Erro no onboard: {e}"})
+        raise SetupError(f"Erro no onboard: {e}")
+    if onboard_result.returncode != 0:
+        raise SetupError(f"Onboard falhou: {onboard_result.stderr[:500]}")
+
+    # Seguir assim que o openclaw.json do onboard estiver completo (inotify, sem sleep fixo)
+    readiness.wait_for_file(ctx["config_path"], readiness.json_file_ready, timeout=3)
+    tracing.run(["sync"], capture_output=True)
 
-    # Aguardar sync do filesystem
-    time.sleep(3)
-    subprocess.run(["sync"], capture_output=True)
 
-    # Ler openclaw.json gerado pelo onboard
-    config_path = os.path.join(OPENCLAW_CONFIG_DIR, "openclaw.json")
+def stage_config(ctx):
+    """Aplicar token, controlUi, modelo e WhatsApp no openclaw.json do onboard."""
+    config_path = ctx["config_path"]
+    store = store_for(config_path)
     try:
-        with open(config_path, "r") as f:
-            config = json.load(f)
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(config_path)
+        onboard_token = (store.get("/gateway/auth/token") or "").strip()
     except Exception as e:
-        return jsonify({"success": False, "error": f"Erro ao ler openclaw.json: {e}"})
+        raise SetupError(f"Erro ao ler openclaw.json: {e}")
 
     # Capturar token gerado pelo onboard
-    onboard_token = (config.get("gateway", {}).get("auth", {}).get("token") or "").strip()
     if onboard_token:
-        token = onboard_token
+        ctx["token"] = onboard_token
         with open(TOKEN_FILE, "w") as f:
-            f.write(token)
+            f.write(onboard_token)
         os.chmod(TOKEN_FILE, 0o600)
-        update_env("OPENCLAW_GATEWAY_TOKEN", token)
+        facts.invalidate(os.path.abspath(TOKEN_FILE))
+        EnvFile(ENV_FILE).set("OPENCLAW_GATEWAY_TOKEN", onboard_token).commit()
 
     # Garantir dangerouslyDisableDeviceAuth e origin fallback para acesso LAN
-    config.setdefault("gateway", {})
-    config["gateway"].setdefault("controlUi", {})
-    config["gateway"]["controlUi"]["dangerouslyDisableDeviceAuth"] = True
-    config["gateway"]["controlUi"]["dangerouslyAllowHostHeaderOriginFallback"] = True
+    store.queue([
+        {"op": "add", "path": "/gateway/controlUi/dangerouslyDisableDeviceAuth", "value": True},
+        {"op": "add", "path": "/gateway/controlUi/dangerouslyAllowHostHeaderOriginFallback", "value": True},
+    ])
 
     # Salvar modelo selecionado pelo usuario
-    if selected_model:
-        config.setdefault("agents", {}).setdefault("defaults", {})
-        config["agents"]["defaults"]["model"] = {"primary": selected_model}
+    if ctx["selected_model"]:
+        store.queue([{"op": "add", "path": "/agents/defaults/model", "value": {"primary": ctx["selected_model"]}}])
 
     # Garantir canal WhatsApp disponivel para o usuario conectar quando quiser
-    config.setdefault("channels", {})
-    config["channels"].setdefault("whatsapp", {
+    store.queue([{"op": "default", "path": "/channels/whatsapp", "value": {
         "enabled": True,
         "dmPolicy": "pairing",
-    })
+    }}])
 
+    # Modo single: Telegram ja entra aqui, o gateway nao precisa reiniciar depois
+    if GATEWAY_BOOT_MODE == "single" and ctx["telegram_token"]:
+        store.queue([{"op": "add", "path": "/channels/telegram", "value": telegram_channel(ctx)}])
+
+    # Uma unica escrita atomica com todos os patches acima
     try:
-        with open(config_path, "w") as f:
-            json.dump(config, f, indent=2)
+        store.commit()
     except Exception as e:
-        return jsonify({"success": False, "error": f"Erro ao salvar openclaw.json: {e}"})
+        raise SetupError(f"Erro ao salvar openclaw.json: {e}")
+
+
+def telegram_channel(ctx):
+    return {
+        "enabled": True,
+        "botToken": ctx["telegram_token"],
+        "dmPolicy": "pairing",
+    }
 
-    # Criar auth-profiles.json
-    os.makedirs(AGENT_DIR, exist_ok=True)
+
+def final_config_problems(config, ctx):
+    """Confere a config final antes do primeiro `up`; retorna lista de problemas."""
+    problems = []
+    gateway = config.get("gateway") or {}
+    if not (gateway.get("auth") or {}).get("token"):
+        problems.append("gateway.auth.token ausente")
+    control_ui = gateway.get("controlUi") or {}
+    for flag in ("dangerouslyDisableDeviceAuth", "dangerouslyAllowHostHeaderOriginFallback"):
+        if control_ui.get(flag) is not True:
+            problems.append(f"gateway.controlUi.{flag} nao habilitado")
+    if ctx["selected_model"]:
+        model = ((config.get("agents") or {}).get("defaults") or {}).get("model") or {}
+        if model.get("primary") != ctx["selected_model"]:
+            problems.append("modelo selecionado nao aplicado")
+    channels = config.get("channels") or {}
+    if "whatsapp" not in channels:
+        problems.append("canal WhatsApp ausente")
+    if GATEWAY_BOOT_MODE == "single" and ctx["telegram_token"]:
+        telegram = channels.get("telegram") or {}
+        if telegram.get("botToken") != ctx["telegram_token"] or not telegram.get("enabled"):
+            problems.append("canal Telegram ausente ou incompleto")
+    return problems
+
+
+def stage_validate_config(ctx):
+    """Validar openclaw.json como o gateway vai ler (do disco) antes de subir."""
+    try:
+        with open(ctx["config_path"], "r") as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SetupError(f"openclaw.json invalido: {e}")
+    problems = final_config_problems(config, ctx)
+    if problems:
+        raise SetupError("Configuracao final invalida: " + "; ".join(problems))
+
+
+def stage_auth_profiles(ctx):
+    """Criar auth-profiles.json com as chaves informadas."""
+    tracker.makedirs(AGENT_DIR)
     profiles = {}
     order = {}
-    if anthropic_key:
-        profiles["anthropic:default"] = {
-            "type": "api_key",
-            "provider": "anthropic",
-            "key": anthropic_key,
-        }
-        order["anthropic"] = ["anthropic:default"]
-    if openai_key:
-        profiles["openai:default"] = {
-            "type": "api_key",
-            "provider": "openai",
-            "key": openai_key,
-        }
-        order["openai"] = ["openai:default"]
-    if openrouter_key:
-        profiles["openrouter:default"] = {
-            "type": "api_key",
-            "provider": "openrouter",
-            "key": openrouter_key,
-        }
-        order["openrouter"] = ["openrouter:default"]
+    for provider in ("anthropic", "openai", "openrouter"):
+        key = ctx[f"{provider}_key"]
+        if key:
+            profiles[f"{provider}:default"] = {
+                "type": "api_key",
+                "provider": provider,
+                "key": key,
+            }
+            order[provider] = [f"{provider}:default"]
     auth_profiles = {
         "version": 1,
         "profiles": profiles,
         "order": order,
     }
     auth_profiles_path = os.path.join(AGENT_DIR, "auth-profiles.json")
-    with open(auth_profiles_path, "w") as f:
+    with tracker.open(auth_profiles_path, "w", perms=0o600) as f:
         json.dump(auth_profiles, f, indent=2)
-    os.chmod(auth_profiles_path, 0o600)
 
-    # Gerar arquivos de persona (.md) no workspace
-    persona = data.get("persona", {})
-    if persona:
-        try:
-            write_persona_files(persona)
-        except Exception:
-            pass  # Nao falhar o setup por causa da persona
 
-    # Permissoes (UID 1000 = node no container)
-    subprocess.run(["chown", "-R", "1000:1000", OPENCLAW_CONFIG_DIR], capture_output=True)
+def stage_persona(ctx):
+    """Gerar arquivos de persona (.md) no workspace."""
+    write_persona_files(ctx["persona"])
+
+
+def stage_docker_access(ctx):
+    """Configurar acesso Docker (socket + cron) antes de subir o gateway."""
+    setup_docker_access()
 
-    # Configurar acesso Docker (socket + cron) antes de subir o gateway
-    try:
-        setup_docker_access()
-    except Exception:
-        pass  # Nao falhar o setup por causa disso
 
-    # Iniciar OpenClaw Gateway
+def stage_permissions(ctx):
+    """Conferir dono (UID 1000 = node no container) so dos caminhos que o wizard tocou."""
+    ctx["ownership_fixed"] = len(tracker.verify())
+
+
+def stage_gateway_up(ctx):
+    """Iniciar OpenClaw Gateway."""
+    ctx["gateway_started_at"] = time.monotonic()
     try:
-        result = subprocess.run(
+        result = tracing.run(
             ["docker", "compose", "-f", f"{OPENCLAW_DIR}/docker-compose.yml", "up", "-d", "openclaw-gateway"],
             capture_output=True,
             text=True,
             timeout=120,
             cwd=OPENCLAW_DIR,
         )
-        if result.returncode != 0:
-            return jsonify({
-                "success": False,
-                "error": f"Falha ao iniciar gateway: {result.stderr[:500]}"
-            })
     except subprocess.TimeoutExpired:
-        return jsonify({"success": False, "error": "Timeout ao iniciar gateway (120s)."})
+        raise SetupError("Timeout ao iniciar gateway (120s).")
     except Exception as e:
-        return jsonify({"success": False, "error": str(e)})
+        raise SetupError(str(e))
+    if result.returncode != 0:
+        raise SetupError(f"Falha ao iniciar gateway: {result.stderr[:500]}")
 
-    # Aguardar gateway ficar online (health check)
-    import urllib.request
-    gateway_url = f"http://127.0.0.1:18789/?token={token}"
-    for attempt in range(30):  # max 60 segundos
-        try:
-            req = urllib.request.urlopen(gateway_url, timeout=2)
-            if req.getcode() == 200:
-                break
-        except Exception:
-            pass
-        time.sleep(2)
 
-    # Injetar Telegram DEPOIS do gateway estar online (hot-reload)
-    if telegram_token:
-        try:
-            with open(config_path, "r") as f:
-                config = json.load(f)
-            config.setdefault("channels", {})
-            config["channels"]["telegram"] = {
-                "enabled": True,
-                "botToken": telegram_token,
-                "dmPolicy": "pairing",
-            }
-            with open(config_path, "w") as f:
-                json.dump(config, f, indent=2)
-            subprocess.run(["chown", "1000:1000", config_path], capture_output=True)
-            # Reiniciar gateway para carregar config do Telegram (hot-reload nao e confiavel)
-            subprocess.run(
-                ["docker", "compose", "-f", f"{OPENCLAW_DIR}/docker-compose.yml",
-                 "restart", "openclaw-gateway"],
-                capture_output=True, text=True, timeout=60, cwd=OPENCLAW_DIR,
-            )
-            # Aguardar gateway reiniciar com Telegram provider
-            time.sleep(8)
-        except Exception as e:
-            # Nao falhar o setup por causa do Telegram
-            pass
+def wait_gateway_ready(ctx, since=None, timeout=60):
+    """Container iniciado (docker events) e HTTP respondendo; max `timeout` segundos."""
+    deadline = time.time() + timeout
+    readiness.wait_for_container(
+        "openclaw-gateway", f"{OPENCLAW_DIR}/docker-compose.yml",
+        since=since, timeout=timeout, cwd=OPENCLAW_DIR,
+    )
+    gateway_url = f"{GATEWAY_LOCAL_URL}/?token={ctx['token']}"
+    return readiness.probe_http(gateway_url, timeout=max(1, deadline - time.time()))
+
+
+def stage_gateway_health(ctx):
+    """Aguardar gateway ficar online (health check)."""
+    wait_gateway_ready(ctx)
+    ctx["gateway_ready_ms"] = int((time.monotonic() - ctx["gateway_started_at"]) * 1000)
+
+
+def stage_telegram(ctx):
+    """Modo restart: injetar Telegram DEPOIS do gateway estar online e reiniciar o gateway."""
+    store_for(ctx["config_path"]).patch([{"op": "add", "path": "/channels/telegram", "value": telegram_channel(ctx)}])
+    # Reiniciar gateway para carregar config do Telegram (hot-reload nao e confiavel)
+    restarted_at = time.time()
+    dockerapi.restart_service("openclaw-gateway", timeout=60)
+    # Aguardar gateway voltar com Telegram provider (evento de start + HTTP)
+    wait_gateway_ready(ctx, since=restarted_at, timeout=30)
+    ctx["gateway_ready_ms"] = int((time.monotonic() - ctx["gateway_started_at"]) * 1000)
+
+
+# Inputs dos stages com checkpoint (journal): um retry so refaz o que mudou.
+# Cada stage lista tudo de que o seu resultado depende — o hash nao e
+# encadeado pelo DAG, para um Telegram novo nao refazer o onboard.
+PROVIDER_KEYS = ("anthropic_key", "openai_key", "openrouter_key")
+
+
+def onboard_done(ctx):
+    """openclaw.json do onboard ainda existe com o token do gateway."""
+    return prewarmed_config_ok(ctx["config_path"])
+
+
+def config_applied(ctx):
+    """Patches do stage config ainda estao no openclaw.json (onboard refeito os apaga)."""
+    try:
+        return store_for(ctx["config_path"]).get("/gateway/controlUi/dangerouslyDisableDeviceAuth") is True
+    except (OSError, ValueError):
+        return False
+
+
+def config_inputs(ctx):
+    return {
+        "keys": [ctx.get(k) for k in PROVIDER_KEYS],
+        "model": ctx.get("selected_model"),
+        "telegram": ctx.get("telegram_token"),
+        "boot_mode": GATEWAY_BOOT_MODE,
+    }
+
+
+def setup_stages(ctx):
+    """DAG do setup. Stages sem dependencia entre si rodam em paralelo."""
+    stages = [
+        Stage("env", stage_env, label="Salvando chaves de API",
+              inputs=PROVIDER_KEYS + ("telegram_token",), check=lambda ctx: os.path.exists(ENV_FILE)),
+        # Se o prewarm do firstboot ainda estiver rodando, ele e dono do openclaw.json
+        Stage("prewarm", stage_prewarm, label="Aguardando pre-aquecimento"),
+        Stage("dirs", stage_dirs, deps=["prewarm"], label="Preparando diretorios"),
+        # Mesmos inputs do onboard: so limpa quando o onboard vai rodar de novo
+        # (senao apagaria o Telegram que o stage config ja gravou)
+        Stage("clean_config", stage_clean_config, deps=["dirs"],
+              label="Limpando configuracao anterior", inputs=PROVIDER_KEYS),
+        Stage("onboard", stage_onboard, deps=["env", "dirs", "clean_config"],
+              label="Instalando configuracoes do OpenClaw",
+              inputs=PROVIDER_KEYS, check=onboard_done),
+        Stage("config", stage_config, deps=["onboard"],
+              label="Aplicando configuracao do gateway",
+              inputs=config_inputs, outputs=("token",), check=config_applied),
+        # Depois do onboard: ele pode gravar o proprio auth-profiles a partir das env vars
+        Stage("auth_profiles", stage_auth_profiles, deps=["onboard"],
+              label="Salvando credenciais do agente", inputs=PROVIDER_KEYS,
+              check=lambda ctx: os.path.exists(os.path.join(AGENT_DIR, "auth-profiles.json"))),
+        # Docker.sock, unit systemd e cron nao dependem do onboard
+        Stage("docker_access", stage_docker_access, deps=["dirs"],
+              label="Configurando acesso Docker", optional=True, inputs=()),
+    ]
+    stages.append(Stage("validate_config", stage_validate_config, deps=["config"],
+                        label="Validando configuracao final"))
+    deps_before_chown = ["validate_config", "auth_profiles", "docker_access"]
+    if ctx["persona"]:
+        # O onboard so cria arquivos de workspace que ainda nao existem
+        stages.append(Stage("persona", stage_persona, deps=["dirs"],
+                            label="Gerando personalidade do agente", optional=True,
+                            inputs=("persona",)))
+        deps_before_chown.append("persona")
+    stages += [
+        Stage("permissions", stage_permissions, deps=deps_before_chown,
+              label="Ajustando permissoes"),
+        Stage("gateway_up", stage_gateway_up, deps=["permissions"],
+              label="Iniciando OpenClaw Gateway"),
+        Stage("gateway_health", stage_gateway_health, deps=["gateway_up"],
+              label="Aguardando gateway ficar online"),
+    ]
+    if ctx["telegram_token"] and GATEWAY_BOOT_MODE != "single":
+        # Nao falhar o setup por causa do Telegram
+        stages.append(Stage("telegram", stage_telegram, deps=["gateway_health"],
+                            label="Conectando bot do Telegram", optional=True))
+    return stages
+
+
+def record_setup_metrics(job, status):
+    """Duracoes do setup e de cada stage (a partir dos steps do job) para /metrics."""
+    for step in job.to_dict()["steps"]:
+        if step["duration_ms"] is not None and step["status"] != "skipped":
+            SETUP_STAGE_SECONDS.observe(step["duration_ms"] / 1000, stage=step["name"], status=step["status"])
+    if job.pipeline:
+        SETUP_SECONDS.observe(job.pipeline["wall_ms"] / 1000, status=status)
+
+
+def run_setup(job, params):
+    """Pipeline completo de setup; roda em background via jobs.submit."""
+    ctx = dict(params)
+    tracker.reset()
+    ctx["token"] = read_token()
+    ctx["config_path"] = os.path.join(OPENCLAW_CONFIG_DIR, "openclaw.json")
+
+    status = "error"
+    try:
+        # Journal: um retry pula os stages ja concluidos com os mesmos inputs
+        run_pipeline(setup_stages(ctx), ctx, job, journal=Journal())
+        status = "success"
+    finally:
+        record_setup_metrics(job, status)
 
     server_ip = get_server_ip()
-    url = f"http://{server_ip}:18789/?token={token}"
+    url = f"http://{server_ip}:18789/?token={ctx['token']}"
 
     # NAO marcar setup-done aqui — aguardar pairing ser confirmado
-    return jsonify({"success": True, "url": url, "token": token})
+    return {
+        "success": True, "url": url, "token": ctx["token"],
+        "gateway_boot_mode": GATEWAY_BOOT_MODE,
+        "gateway_ready_ms": ctx.get("gateway_ready_ms"),
+    }
 
 
 @app.route("/api/pairing", methods=["POST"])
@@ -1536,16 +1701,9 @@ def pairing():
         return jsonify({"success": False, "error": "Codigo invalido."})
 
     try:
-        result = subprocess.run(
-            [
-                "docker", "compose", "-f", f"{OPENCLAW_DIR}/docker-compose.yml",
-                "exec", "-T", "openclaw-gateway",
-                "node", "dist/index.js", "pairing", "approve", "telegram", code,
-            ],
-            capture_output=True,
-            text=True,
-            timeout=30,
-            cwd=OPENCLAW_DIR,
+        # No gateway (estado e env atuais), nao no CLI worker
+        result = dockerapi.exec_service(
+            "openclaw-gateway", ["node", "dist/index.js", "pairing", "approve", "telegram", code], timeout=30,
         )
         if result.returncode != 0:
             stderr = result.stderr.strip()
@@ -1572,20 +1730,27 @@ def finalize_setup():
     """Marcar setup como concluido, ativar Nginx e desabilitar wizard."""
     with open(SETUP_DONE_FILE, "w") as f:
         f.write("done")
+    facts.invalidate(os.path.abspath(SETUP_DONE_FILE))
+    # Setup concluido: o journal (que guarda o token) nao serve mais
+    Journal().clear()
+    # Worker do CLI nao e mais necessario: liberar a RAM agora, sem esperar o idle
+    cliworker.stop()
+    # Wizard vai parar: o updater passa a exportar as metricas do setup deste snapshot
+    try:
+        metrics.registry.flush()
+    except OSError:
+        pass
 
     # Ativar symlink do Nginx
-    nginx_available = "/etc/nginx/sites-available/openclaw"
-    nginx_enabled = "/etc/nginx/sites-enabled/openclaw"
-    if os.path.exists(nginx_available) and not os.path.exists(nginx_enabled):
+    if os.path.exists(NGINX_SITE_AVAILABLE) and not os.path.exists(NGINX_SITE_ENABLED):
         try:
-            os.symlink(nginx_available, nginx_enabled)
+            os.symlink(NGINX_SITE_AVAILABLE, NGINX_SITE_ENABLED)
         except Exception:
             pass
 
     # Criar script de transicao e executar via systemd-run (processo independente)
     # Precisa ser independente pois systemctl stop mata o proprio processo Gunicorn
-    switch_script = "/tmp/openclaw-switch-to-nginx.sh"
-    with open(switch_script, "w") as f:
+    with open(SWITCH_SCRIPT, "w") as f:
         f.write("#!/bin/bash\n")
         f.write("sleep 3\n")
         f.write("systemctl disable openclaw-setup-web\n")
@@ -1593,9 +1758,9 @@ def finalize_setup():
         f.write("sleep 2\n")
         f.write("systemctl enable --now nginx\n")
         f.write("systemctl start openclaw-updater\n")
-    os.chmod(switch_script, 0o755)
+    os.chmod(SWITCH_SCRIPT, 0o755)
     subprocess.Popen(
-        ["systemd-run", "--scope", "--quiet", switch_script],
+        ["systemd-run", "--scope", "--quiet", SWITCH_SCRIPT],
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL,
     )
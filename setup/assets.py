@@ -0,0 +1,110 @@
+"""
+Precompressed, content-hashed delivery of the wizard's static assets.
+
+Asset bodies are compressed once at import (gzip always, brotli when the
+optional `brotli` package is installed) and served under a name that
+embeds their content hash, with immutable cache headers. Dynamic pages
+get an ETag so repeat visits revalidate with a 304 instead of a download.
+"""
+
+import gzip
+import hashlib
+import threading
+
+from flask import Response, request
+
+try:
+    import brotli  # opcional: pip install brotli
+except ImportError:
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_registry = {}
+
+
+def _encodings(body):
+    variants = {"identity": body}
+    variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    # So vale a pena servir variantes que ficaram menores
+    return {k: v for k, v in variants.items() if k == "identity" or len(v) < len(body)}
+
+
+class Asset:
+    """Arquivo estatico em memoria, com hash de conteudo e variantes comprimidas."""
+
+    def __init__(self, name, ext, content, content_type):
+        body = content.encode() if isinstance(content, str) else content
+        self.hash = hashlib.sha256(body).hexdigest()[:12]
+        self.filename = f"{name}.{self.hash}.{ext}"
+        self.content_type = content_type
+        self.variants = _encodings(body)
+
+    @property
+    def url(self):
+        return f"/static/{self.filename}"
+
+
+def register(name, ext, content, content_type):
+    asset = Asset(name, ext, content, content_type)
+    _registry[asset.filename] = asset
+    return asset
+
+
+def get(filename):
+    return _registry.get(filename)
+
+
+def _pick_encoding(variants):
+    accepted = request.headers.get("Accept-Encoding", "")
+    for enc in ("br", "gzip"):
+        if enc in variants and enc in accepted:
+            return enc
+    return "identity"
+
+
+def respond(variants, content_type, etag, cache_control):
+    """Resposta com negociacao de encoding, ETag e 304 para If-None-Match."""
+    quoted = f'"{etag}"'
+    headers = {"ETag": quoted, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    inm = request.headers.get("If-None-Match", "")
+    if quoted in [t.strip().removeprefix("W/") for t in inm.split(",")]:
+        return Response(status=304, headers=headers)
+    enc = _pick_encoding(variants)
+    if enc != "identity":
+        headers["Content-Encoding"] = enc
+    return Response(variants[enc], content_type=content_type, headers=headers)
+
+
+def serve(asset):
+    return respond(asset.variants, asset.content_type, asset.hash, IMMUTABLE)
+
+
+class PageCache:
+    """Ultimo HTML renderizado por chave de contexto, ja comprimido.
+
+    O wizard so muda quando muda o contexto (token/URL), entao a
+    renderizacao e a compressao acontecem uma vez por valor.
+    """
+
+    def __init__(self, template, max_entries=4):
+        self.template = template
+        self.max_entries = max_entries
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def render(self, **context):
+        key = tuple(sorted(context.items()))
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is None:
+            body = self.template.render(**context).encode()
+            entry = (hashlib.sha256(body).hexdigest()[:16], _encodings(body))
+            with self._lock:
+                if len(self._cache) >= self.max_entries:
+                    self._cache.pop(next(iter(self._cache)))
+                self._cache[key] = entry
+        etag, variants = entry
+        return respond(variants, "text/html; charset=utf-8", etag, "no-cache")
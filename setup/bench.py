@@ -0,0 +1,909 @@
+"""
+Hermetic end-to-end benchmark for the wizard and the updater.
+
+Runs everything on localhost, without a VM, Docker or network access:
+  - fake `docker`, `git`, `systemctl` and `systemd-run` binaries (this
+    same file, invoked through small wrappers) with configurable latencies
+    per operation (compose run/up/restart/exec/ps, build, events...);
+  - one stub HTTP server for the Anthropic, OpenAI, OpenRouter and
+    Telegram APIs, plus a stub gateway answering the health probe;
+  - the wizard (werkzeug, threaded) and the updater (UpdateHandler) on
+    ephemeral ports, with every host path redirected to a temp dir;
+  - a fake Docker Engine API on a Unix socket (FakeDocker) for the
+    dockerapi flows: exec with multiplexed output, restart + events with
+    `until` windows, image prune, and the CLI fallback when the socket is
+    gone. The setup/update flows keep using the fake `docker` binary.
+
+A scripted keep-alive client then drives /api/validate-key, /api/validate-keys,
+/api/setup (until the job finishes), /api/pairing and the updater endpoints,
+and prints p50/p95/max latency and total wall time per flow. A flow whose
+result is wrong counts as an error, and any error makes the exit code 1.
+
+Usage:
+  python bench.py                      # defaults
+  python bench.py -n 20 --json         # more iterations, machine-readable
+  python bench.py --docker-latency '{"compose run": 2.0, "build": 5}'
+  python bench.py --build-fail 2       # first 2 tags fail to build (fallback loop)
+"""
+
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import socketserver
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Latencia (segundos) por operacao do docker falso; "default" para o resto
+DOCKER_LATENCY = {
+    "compose run": 1.0,
+    "compose up": 0.5,
+    "compose down": 0.3,
+    "compose restart": 0.5,
+    "compose exec": 0.2,
+    "compose ps": 0.02,
+    "build": 1.0,
+    "inspect": 0.02,
+    "events": 0.05,
+    "default": 0.01,
+}
+GIT_LATENCY = {"fetch": 0.2, "default": 0.01}
+PROVIDER_LATENCY = 0.05
+TAGS = ["v2026.3.1", "v2026.2.1", "v2026.1.1"]
+CONTAINER_ID = "bench0000cid"
+FAKE_TOOLS = ("docker", "git", "systemctl", "systemd-run")
+
+
+# ── Binarios falsos (executados como `python bench.py --fake <tool> ...`) ──
+
+def _sleep_for(table, op):
+    time.sleep(float(table.get(op, table.get("default", 0))))
+
+
+def _compose_op(argv):
+    rest = argv[argv.index("compose") + 1:]
+    i = 0
+    while i < len(rest):
+        if rest[i] in ("-f", "--file", "-p", "--project-name"):
+            i += 2
+        elif rest[i].startswith("-"):
+            i += 1
+        else:
+            return rest[i], rest[i + 1:]
+    return "", []
+
+
+def fake_docker(argv, state_dir):
+    latency = json.loads(os.environ.get("BENCH_DOCKER_LATENCY") or "{}")
+    if "compose" in argv:
+        op, args = _compose_op(argv)
+        _sleep_for(latency, f"compose {op}")
+        if op == "run":
+            if "-d" in args:
+                # CLI worker desligado no bench: o onboard cai no `compose run`
+                print("cli worker desabilitado no bench", file=sys.stderr)
+                return 1
+            if "onboard" in args:
+                # Chaves so pelo ambiente (`-e KEY`), nunca no argv
+                passed = [args[i + 1] for i, a in enumerate(args[:-1]) if a in ("-e", "--env")]
+                if any("=" in p or p not in os.environ for p in passed):
+                    print(f"onboard com chave no argv ou ausente do ambiente: {passed}", file=sys.stderr)
+                    return 1
+                cfg = os.path.join(os.environ["BENCH_CONFIG_DIR"], "openclaw.json")
+                with open(cfg, "w") as f:
+                    json.dump({"gateway": {"auth": {"token": "bench-onboard-token"}}}, f)
+        elif op == "ps":
+            print(CONTAINER_ID)
+        elif op == "exec" and "pairing" in args:
+            print("Approved")
+        return 0
+
+    op = argv[0] if argv else ""
+    _sleep_for(latency, op)
+    if op == "inspect":
+        print(json.dumps({"Running": True, "Status": "running"}))
+    elif op == "events":
+        print(json.dumps({"status": "start", "id": CONTAINER_ID}), flush=True)
+    elif op == "build":
+        try:
+            with open(os.path.join(state_dir, "checkout")) as f:
+                tag = f.read().strip()
+        except OSError:
+            tag = ""
+        failing = os.environ.get("BENCH_BUILD_FAIL", "").split(",")
+        if tag and tag in failing:
+            print(f"build falhou em {tag} (bench)", file=sys.stderr)
+            return 1
+    return 0
+
+
+def fake_git(argv, state_dir):
+    latency = json.loads(os.environ.get("BENCH_GIT_LATENCY") or "{}")
+    op = argv[0] if argv else ""
+    _sleep_for(latency, op)
+    if op == "tag":
+        print("\n".join(os.environ.get("BENCH_GIT_TAGS", "").split(",")))
+    elif op == "checkout" and len(argv) > 1:
+        with open(os.path.join(state_dir, "checkout"), "w") as f:
+            f.write(argv[1])
+    return 0
+
+
+def fake_main(tool, argv):
+    state_dir = os.environ.get("BENCH_STATE_DIR", tempfile.gettempdir())
+    with open(os.path.join(state_dir, "calls.log"), "a") as f:
+        f.write(" ".join([tool] + argv) + "\n")
+    if tool == "docker":
+        return fake_docker(argv, state_dir)
+    if tool == "git":
+        return fake_git(argv, state_dir)
+    return 0
+
+
+def install_fake_tools(bin_dir):
+    os.makedirs(bin_dir, exist_ok=True)
+    for tool in FAKE_TOOLS:
+        path = os.path.join(bin_dir, tool)
+        with open(path, "w") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(__file__)}" --fake {tool} "$@"\n')
+        os.chmod(path, 0o755)
+
+
+# ── Servidores stub (providers + Telegram + gateway) ──
+
+def _models(prefix, count=40):
+    return [{"id": f"{prefix}-{i}", "name": f"{prefix} {i}", "context_length": 200000} for i in range(count)]
+
+
+STUB_MODELS = {
+    "/anthropic/v1/models": _models("claude-bench"),
+    "/openai/v1/models": _models("gpt-4o-bench"),
+    "/openrouter/api/v1/models": _models("vendor/model-bench"),
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Cabecalho e corpo saem em writes separados: sem isso o delayed ACK soma ~40ms
+    disable_nagle_algorithm = True
+    latency = PROVIDER_LATENCY
+
+    def _send(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/":
+            # Health probe do gateway (sem latencia de provider)
+            return self._send(200, {})
+        time.sleep(self.latency)
+        if path in STUB_MODELS:
+            auth = self.headers.get("x-api-key") or self.headers.get("Authorization", "")
+            if "bad" in auth:
+                return self._send(401, {"error": {"message": "invalid key"}})
+            return self._send(200, {"data": STUB_MODELS[path]})
+        if path.startswith("/telegram/bot") and path.endswith("/getMe"):
+            if "bad" in path:
+                return self._send(401, {"ok": False, "description": "Unauthorized"})
+            return self._send(200, {"ok": True, "result": {"username": "bench_bot", "first_name": "Bench"}})
+        self._send(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+# ── Docker Engine API falsa (socket Unix) ──
+
+GATEWAY_SERVICE = "openclaw-gateway"
+FAKE_RESTART_DELAY = 0.3  # start e healthy chegam depois do restart, via eventos
+
+
+def fake_exec_output(cmd):
+    """Frames (stream, bytes) e exit code que o daemon falso devolve para cmd."""
+    if "pairing" in cmd:
+        return [(1, b"Approved\n")], 0
+    if "--slow" in cmd:
+        # Frame (None, segundos): o daemon falso fica calado esse tempo
+        return [(1, b"working\n"), (None, 1.0), (1, b"done\n")], 0
+    if "--big" in cmd:
+        # Saida maior que o buffer de leitura do _demux, em frames de tamanhos diferentes
+        return [(1, b"a" * 70000), (2, b"warn\n"), (1, b"b" * 130000)], 0
+    return [(1, " ".join(cmd).encode()), (2, b"stderr line\n"), (1, b"\n")], 3 if "fail" in cmd else 0
+
+
+class FakeDocker:
+    """Estado do daemon falso: um container por service, fila de eventos e execs."""
+
+    def __init__(self, services=(GATEWAY_SERVICE,), project="openclaw"):
+        self.cond = threading.Condition()
+        self.containers = {
+            f"bench-{svc}": {
+                "service": svc,
+                "labels": {"com.docker.compose.project": project, "com.docker.compose.service": svc},
+                "running": True,
+                "health": "healthy",
+            }
+            for svc in services
+        }
+        self.events = []
+        self.execs = {}
+        self.pruned = 0
+
+    def find(self, labels, include_stopped):
+        found = []
+        with self.cond:
+            for cid, c in self.containers.items():
+                wanted = dict(l.split("=", 1) for l in labels)
+                if any(c["labels"].get(k) != v for k, v in wanted.items()):
+                    continue
+                if c["running"] or include_stopped:
+                    found.append({"Id": cid, "Labels": c["labels"], "State": "running" if c["running"] else "exited"})
+        return found
+
+    def emit(self, cid, action):
+        with self.cond:
+            c = self.containers[cid]
+            now = time.time()
+            self.events.append({
+                "status": action, "id": cid, "Type": "container", "Action": action,
+                "Actor": {"ID": cid, "Attributes": dict(c["labels"])},
+                "time": int(now), "timeNano": int(now * 1e9),
+            })
+            self.cond.notify_all()
+
+    def restart(self, cid):
+        """Para o container; start e healthy saem depois, em background."""
+        with self.cond:
+            c = self.containers[cid]
+            c["running"], c["health"] = False, "starting"
+
+        def later():
+            time.sleep(FAKE_RESTART_DELAY)
+            with self.cond:
+                c["running"] = True
+            self.emit(cid, "start")
+            time.sleep(FAKE_RESTART_DELAY)
+            with self.cond:
+                c["health"] = "healthy"
+            self.emit(cid, "health_status: healthy")
+
+        threading.Thread(target=later, daemon=True).start()
+
+
+def _event_matches(event, filters):
+    labels = dict(l.split("=", 1) if "=" in l else (l, None) for l in filters.get("label", []))
+    attrs = event["Actor"]["Attributes"]
+    if any(k not in attrs or (v is not None and attrs[k] != v) for k, v in labels.items()):
+        return False
+    wanted = filters.get("event")
+    # event=health_status casa com "health_status: healthy", como no dockerd
+    return not wanted or event["Action"].split(":", 1)[0] in wanted
+
+
+class FakeDockerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def docker(self):
+        return self.server.docker
+
+    def address_string(self):
+        return "docker.sock"
+
+    def _send(self, code, body=None):
+        data = b"" if body is None else json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null") if length else None
+
+    def _chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        qs = {k: v[0] for k, v in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+        if url.path == "/_ping":
+            data = b"OK"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif url.path == "/containers/json":
+            labels = json.loads(qs.get("filters", "{}")).get("label", [])
+            self._send(200, self.docker.find(labels, qs.get("all") == "1"))
+        elif parts[0] == "containers" and parts[-1] == "json" and len(parts) == 3:
+            c = self.docker.containers.get(parts[1])
+            if c is None:
+                return self._send(404, {"message": f"No such container: {parts[1]}"})
+            state = {"Running": c["running"], "Status": "running" if c["running"] else "restarting"}
+            if c["health"]:
+                state["Health"] = {"Status": c["health"]}
+            self._send(200, {"Id": parts[1], "State": state})
+        elif parts[0] == "exec" and parts[-1] == "json":
+            info = self.docker.execs.get(parts[1])
+            if info is None:
+                return self._send(404, {"message": "No such exec instance"})
+            self._send(200, {"ID": parts[1], "Running": False, "ExitCode": info["exit"]})
+        elif url.path == "/events":
+            self._events(json.loads(qs.get("filters", "{}")), qs.get("since"), qs.get("until"))
+        else:
+            self._send(404, {"message": "page not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        body = self._body()
+        if parts[0] == "containers" and len(parts) == 3 and parts[1] in self.docker.containers:
+            if parts[2] == "restart":
+                self.docker.restart(parts[1])
+                return self._send(204)
+            if parts[2] == "exec":
+                exec_id = f"exec{len(self.docker.execs)}"
+                frames, code = fake_exec_output(body["Cmd"])
+                self.docker.execs[exec_id] = {"frames": frames, "exit": code}
+                return self._send(201, {"Id": exec_id})
+        elif parts[0] == "exec" and parts[-1] == "start" and parts[1] in self.docker.execs:
+            # Como o dockerd sem Upgrade: stream bruto multiplexado ate fechar a conexao
+            self.send_response(200)
+            self.send_header("Content-Type", "application/vnd.docker.multiplexed-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            try:
+                for stream, data in self.docker.execs[parts[1]]["frames"]:
+                    if stream is None:
+                        self.wfile.flush()
+                        time.sleep(data)
+                        continue
+                    self.wfile.write(struct.pack(">BxxxL", stream, len(data)) + data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # cliente desistiu (timeout do exec)
+            self.close_connection = True
+            return
+        elif url.path == "/images/prune":
+            with self.docker.cond:
+                self.docker.pruned += 1
+            return self._send(200, {"ImagesDeleted": [{"Deleted": "sha256:bench"}], "SpaceReclaimed": 1024})
+        self._send(404, {"message": "page not found"})
+
+    def _events(self, filters, since, until):
+        """Stream chunked de eventos em [since, until]; sem until, ate o cliente fechar."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        since = float(since) if since else time.time()
+        until = float(until) if until else None
+        sent = 0
+        try:
+            while True:
+                with self.docker.cond:
+                    pending = self.docker.events[sent:]
+                    sent = len(self.docker.events)
+                for event in pending:
+                    at = event["timeNano"] / 1e9
+                    if at >= since and (until is None or at <= until) \
+                            and _event_matches(event, filters):
+                        self._chunk(json.dumps(event).encode() + b"\n")
+                if until is not None and time.time() >= until:
+                    self._chunk(b"")
+                    return
+                with self.docker.cond:
+                    if len(self.docker.events) == sent:
+                        self.docker.cond.wait(0.1 if until is None else max(0.0, min(0.1, until - time.time())))
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeDockerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, docker):
+        self.docker = docker
+        super().__init__(path, FakeDockerHandler)
+
+
+def _serve(server):
+    threading.Thread(target=server.serve_forever, name="bench-server", daemon=True).start()
+    return server.server_address[1]
+
+
+# ── Ambiente hermetico ──
+
+class Environment:
+    """Diretorio temporario + modulos do wizard/updater apontando para ele."""
+
+    def __init__(self, args):
+        self.args = args
+        self.root = tempfile.mkdtemp(prefix="openclaw-bench-")
+        self.paths = {name: os.path.join(self.root, name) for name in
+                      ("openclaw", "config", "state", "bin", "jobs", "catalog", "metrics", "cli-worker")}
+        for d in self.paths.values():
+            os.makedirs(d, exist_ok=True)
+        for d in ("agents/main/agent", "workspace", "cron"):
+            os.makedirs(os.path.join(self.paths["config"], d), exist_ok=True)
+        with open(os.path.join(self.paths["openclaw"], ".env"), "w") as f:
+            f.write("# bench env\n")
+        with open(os.path.join(self.paths["openclaw"], "docker-compose.yml"), "w") as f:
+            f.write("services:\n  openclaw-gateway:\n    image: openclaw:local\n  openclaw-cli:\n    image: openclaw:local\n")
+        self.token_file = os.path.join(self.root, "token")
+        with open(self.token_file, "w") as f:
+            f.write("bench-token")
+        open(os.path.join(self.root, "docker.sock.fake"), "w").close()
+
+        install_fake_tools(self.paths["bin"])
+        docker_latency = dict(DOCKER_LATENCY, **json.loads(args.docker_latency or "{}"))
+        os.environ.update({
+            "PATH": self.paths["bin"] + os.pathsep + os.environ.get("PATH", ""),
+            "BENCH_STATE_DIR": self.paths["state"],
+            "BENCH_CONFIG_DIR": self.paths["config"],
+            "BENCH_DOCKER_LATENCY": json.dumps(docker_latency),
+            "BENCH_GIT_LATENCY": json.dumps(GIT_LATENCY),
+            "BENCH_GIT_TAGS": ",".join(TAGS),
+            "BENCH_BUILD_FAIL": ",".join(TAGS[:args.build_fail]),
+        })
+
+        StubHandler.latency = args.provider_latency
+        self.stub_port = _serve(ThreadingHTTPServer(("127.0.0.1", 0), StubHandler))
+        self._patch_wizard()
+        self._patch_updater()
+
+    def _patch_wizard(self):
+        sys.path.insert(0, HERE)
+        import app as wizard_app
+        import catalog
+        import credentials
+        import dockerapi
+        import journal
+
+        stub = f"http://127.0.0.1:{self.stub_port}"
+        root, p = self.root, self.paths
+        wizard_app.OPENCLAW_DIR = p["openclaw"]
+        wizard_app.ENV_FILE = os.path.join(p["openclaw"], ".env")
+        wizard_app.TOKEN_FILE = self.token_file
+        wizard_app.SETUP_DONE_FILE = os.path.join(root, "setup-done")
+        wizard_app.PREWARM_FILE = os.path.join(root, "prewarm-done")
+        wizard_app.PREWARM_LOCK = os.path.join(root, "prewarm.lock")
+        wizard_app.PREWARM_STARTED = os.path.join(root, "prewarm.started")
+        wizard_app.OPENCLAW_CONFIG_DIR = p["config"]
+        wizard_app.AGENT_DIR = os.path.join(p["config"], "agents/main/agent")
+        wizard_app.WORKSPACE_DIR = os.path.join(p["config"], "workspace")
+        wizard_app.CRON_DIR = os.path.join(p["config"], "cron")
+        wizard_app.GATEWAY_LOCAL_URL = stub
+        wizard_app.DOCKER_SOCKET = os.path.join(root, "docker.sock.fake")
+        wizard_app.DOCKER_SOCKET_UNIT = os.path.join(root, "docker-socket-perms.service")
+        wizard_app.NGINX_SITE_AVAILABLE = os.path.join(root, "nginx-available")
+        wizard_app.NGINX_SITE_ENABLED = os.path.join(root, "nginx-enabled")
+        wizard_app.SWITCH_SCRIPT = os.path.join(root, "switch-to-nginx.sh")
+        wizard_app.jobs.JOBS_DIR = p["jobs"]
+        wizard_app.cliworker.WORKER_DIR = p["cli-worker"]
+        wizard_app.cliworker.OPENCLAW_DIR = p["openclaw"]
+        wizard_app.metrics.registry.share(p["metrics"])
+        journal.JOURNAL_FILE = os.path.join(root, "setup-journal.json")
+        catalog.CATALOG_DIR = p["catalog"]
+        catalog.PROVIDER_URLS.update({
+            "anthropic": f"{stub}/anthropic/v1/models",
+            "openai": f"{stub}/openai/v1/models",
+            "openrouter": f"{stub}/openrouter/api/v1/models",
+        })
+        credentials.TELEGRAM_API = f"{stub}/telegram"
+        # Socket inexistente: a Engine API fica indisponivel e tudo passa pelo docker falso
+        dockerapi.DOCKER_SOCKET = os.path.join(root, "no-docker.sock")
+        dockerapi.OPENCLAW_DIR = p["openclaw"]
+        dockerapi.COMPOSE_FILE = os.path.join(p["openclaw"], "docker-compose.yml")
+
+        # Import tardio: os binarios falsos (--fake) nao pagam o import do werkzeug
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.wizard = wizard_app
+        self.wizard_port = _serve(make_server(
+            "127.0.0.1", 0, wizard_app.app, threaded=True, request_handler=QuietHandler,
+        ))
+
+    def _patch_updater(self):
+        import updater
+
+        updater.OPENCLAW_DIR = self.paths["openclaw"]
+        updater.SETUP_METRICS_DIR = self.paths["metrics"]
+        updater.TOKEN_FILE = self.token_file
+        self.updater = updater
+        self.updater_port = _serve(updater.UpdaterServer(("127.0.0.1", 0), updater.UpdateHandler))
+
+    def reset_setup(self, keep_journal=False):
+        """Volta ao estado de antes do setup para o proximo ciclo medir um setup completo.
+
+        Sem apagar os jobs, o mesmo payload cairia na janela de coalescencia
+        do submit_once() e reaproveitaria o job ja concluido; sem apagar o
+        journal, os stages com os mesmos inputs seriam pulados (keep_journal
+        mede justamente esse retry).
+        """
+        try:
+            os.unlink(self.wizard.SETUP_DONE_FILE)
+        except FileNotFoundError:
+            pass
+        self.wizard.facts.invalidate(os.path.abspath(self.wizard.SETUP_DONE_FILE))
+        jobs_dir = self.paths["jobs"]
+        for name in os.listdir(jobs_dir):
+            if name != "active.lock":
+                os.unlink(os.path.join(jobs_dir, name))
+        if not keep_journal:
+            import journal
+
+            try:
+                os.unlink(journal.JOURNAL_FILE)
+            except FileNotFoundError:
+                pass
+
+    @contextlib.contextmanager
+    def docker_api(self):
+        """dockerapi falando com a Engine API falsa enquanto durar o bloco."""
+        import dockerapi
+
+        path = os.path.join(self.root, "docker.sock")
+        docker = FakeDocker(project=dockerapi.COMPOSE_PROJECT)
+        server = FakeDockerServer(path, docker)
+        _serve(server)
+        previous = dockerapi.DOCKER_SOCKET
+        dockerapi.DOCKER_SOCKET = path
+        try:
+            yield docker
+        finally:
+            dockerapi.DOCKER_SOCKET = previous
+            dockerapi.client.close()
+            server.shutdown()
+            server.server_close()
+            os.unlink(path)
+
+
+# ── Cliente e relatorio ──
+
+class Client:
+    """Cliente HTTP keep-alive que mede cada requisicao."""
+
+    def __init__(self, port, headers=None):
+        self.port = port
+        self.headers = headers or {}
+        self.conn = None
+
+    def request(self, method, path, body=None):
+        headers = dict(self.headers)
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+            try:
+                self.conn.request(method, path, body=data, headers=headers)
+                resp = self.conn.getresponse()
+                raw = resp.read()
+                break
+            except (OSError, http.client.HTTPException):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+        if resp.will_close:
+            self.conn.close()
+            self.conn = None
+        try:
+            return resp.status, json.loads(raw or b"null")
+        except ValueError:
+            return resp.status, raw.decode(errors="replace")
+
+
+def percentile(values, pct):
+    """Percentil por nearest-rank."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+class Flow:
+    def __init__(self, name):
+        self.name = name
+        self.samples = []
+        self.errors = 0
+        self.wall = 0.0
+
+    def measure(self, fn):
+        t0 = time.perf_counter()
+        try:
+            ok = fn()
+        except Exception:
+            ok = False
+        self.add(time.perf_counter() - t0, ok)
+
+    def add(self, seconds, ok=True):
+        """Amostra medida fora do measure() (ex.: tempo reportado pelo job)."""
+        self.samples.append(seconds)
+        if not ok:
+            self.errors += 1
+
+    def summary(self):
+        ms = [s * 1000 for s in self.samples]
+        return {
+            "flow": self.name,
+            "n": len(ms),
+            "errors": self.errors,
+            "p50_ms": round(percentile(ms, 50) or 0, 1),
+            "p95_ms": round(percentile(ms, 95) or 0, 1),
+            "max_ms": round(max(ms) if ms else 0, 1),
+            "wall_ms": round(self.wall * 1000, 1),
+        }
+
+
+def run_flow(name, iterations, fn):
+    flow = Flow(name)
+    t0 = time.perf_counter()
+    for i in range(iterations):
+        flow.measure(lambda: fn(i))
+    flow.wall = time.perf_counter() - t0
+    return flow
+
+
+def _wait_job(client, job_id, poll=0.05, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        _, job = client.request("GET", f"/api/setup/status/{job_id}")
+        if job.get("status") in ("success", "error"):
+            return job
+        time.sleep(poll)
+    return {"status": "timeout"}
+
+
+def _wait_update(client, poll=0.05, timeout=600):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        _, state = client.request("GET", "/api/update/status")
+        if state.get("status") in ("success", "error"):
+            return state
+        time.sleep(poll)
+    return {"status": "timeout"}
+
+
+SETUP_PAYLOAD = {
+    "anthropic_key": "sk-ant-bench",
+    "telegram_token": "123456:bench",
+    "selected_model": "anthropic/claude-bench-0",
+    "persona": {"step4": {"agentName": "Bench"}},
+}
+
+
+def run_bench(env, n):
+    wizard = Client(env.wizard_port)
+    providers = ("anthropic", "openai", "openrouter")
+    flows = []
+
+    def validate(provider, key):
+        code, body = wizard.request("POST", "/api/validate-key", {"provider": provider, "key": key})
+        return code == 200 and body.get("success")
+
+    flows.append(run_flow("validate-key (cold)", n * len(providers),
+                          lambda i: validate(providers[i % 3], f"sk-cold-{i}-{time.time_ns()}")))
+    flows.append(run_flow("validate-key (cached)", n * len(providers),
+                          lambda i: validate(providers[i % 3], "sk-cached")))
+    flows.append(run_flow("validate-keys (all, parallel)", n, lambda i: wizard.request(
+        "POST", "/api/validate-keys",
+        {"anthropic_key": f"sk-ant-all-{i}", "openai_key": f"sk-all-{i}",
+         "openrouter_key": f"sk-or-all-{i}", "telegram_token": "123456:bench"},
+    )[1].get("success")))
+
+    def submit_setup():
+        code, body = wizard.request("POST", "/api/setup", SETUP_PAYLOAD)
+        if code != 202 or body.get("attached"):
+            return None
+        return _wait_job(wizard, body["job_id"])
+
+    def run_setup(resumed=False):
+        job = submit_setup()
+        # Um setup completo nao pode ter pulado stages pelo journal (e vice-versa)
+        return (job is not None and job["status"] == "success"
+                and bool((job.get("pipeline") or {}).get("resumed")) == resumed)
+
+    def trace_private():
+        # Trace so com token, e sem as chaves do payload
+        code, _ = wizard.request("GET", "/api/setup/trace")
+        with open(env.token_file) as f:
+            authed = Client(env.wizard_port, {"Authorization": f"Bearer {f.read().strip()}"})
+        authed_code, trace = authed.request("GET", "/api/setup/trace")
+        return code == 401 and authed_code == 200 and SETUP_PAYLOAD["anthropic_key"] not in json.dumps(trace)
+
+    def setup(i):
+        env.reset_setup()
+        return run_setup() and trace_private()
+
+    def pairing(i):
+        code, body = wizard.request("POST", "/api/pairing", {"code": "ABCD1234"})
+        return code == 200 and body.get("success")
+
+    setup_flow, pairing_flow = Flow("setup (POST + poll until done)"), Flow("pairing")
+    t0 = time.perf_counter()
+    for i in range(n):
+        setup_flow.measure(lambda: setup(i))
+        pairing_flow.measure(lambda: pairing(i))
+    setup_flow.wall = pairing_flow.wall = time.perf_counter() - t0
+    flows += [setup_flow, pairing_flow]
+
+    # Retry depois de um setup sem pairing: o journal sobrevive e os stages se repetem
+    resume_flow = Flow("setup (resumed from journal)")
+    t0 = time.perf_counter()
+    for i in range(n):
+        env.reset_setup()
+        run_setup()
+        env.reset_setup(keep_journal=True)
+        resume_flow.measure(lambda: run_setup(resumed=True))
+    resume_flow.wall = time.perf_counter() - t0
+    flows.append(resume_flow)
+
+    # OPENCLAW_GATEWAY_BOOT: Telegram ja no primeiro boot (single) x boot + restart
+    # do gateway para carregar o Telegram (restart); gateway ready vem do job
+    default_mode = env.wizard.GATEWAY_BOOT_MODE
+    try:
+        for mode in ("single", "restart"):
+            env.wizard.GATEWAY_BOOT_MODE = mode
+            setup_flow, ready_flow = Flow(f"setup (gateway boot={mode})"), Flow(f"gateway ready (boot={mode})")
+            t0 = time.perf_counter()
+            for i in range(n):
+                env.reset_setup()
+                done = []
+
+                def boot_setup():
+                    job = submit_setup() or {}
+                    done.append(job)
+                    # Stage telegram e opcional: no modo restart ele precisa ter rodado de fato
+                    steps = {s["name"]: s["status"] for s in job.get("steps", [])}
+                    return job.get("status") == "success" and (steps.get("telegram") == "done") == (mode == "restart")
+
+                setup_flow.measure(boot_setup)
+                ready_ms = ((done[0] if done else {}).get("result") or {}).get("gateway_ready_ms")
+                ready_flow.add((ready_ms or 0) / 1000, ok=ready_ms is not None)
+            setup_flow.wall = ready_flow.wall = time.perf_counter() - t0
+            flows += [setup_flow, ready_flow]
+    finally:
+        env.wizard.GATEWAY_BOOT_MODE = default_mode
+
+    flows += run_docker_flows(env, n)
+
+    # O setup troca o token pelo do onboard: ler o atual, como faria o cliente real
+    with open(env.token_file) as f:
+        upd = Client(env.updater_port, {"Authorization": f"Bearer {f.read().strip()}"})
+
+    flows.append(run_flow("updater status", n * 5, lambda i: upd.request("GET", "/api/update/status")[0] == 200))
+
+    def scrape(i):
+        # Depois do setup o wizard para: as series do setup saem pelo updater
+        code, text = upd.request("GET", "/metrics")
+        return code == 200 and "openclaw_setup_seconds_count" in text and wizard.request("GET", "/metrics")[0] == 401
+
+    flows.append(run_flow("updater metrics (with setup series)", n, scrape))
+
+    def update(i):
+        code, _ = upd.request("POST", "/api/update")
+        return code == 202 and _wait_update(upd)["status"] == "success"
+
+    flows.append(run_flow("update (POST + poll until done)", max(1, n // 2), update))
+    return flows
+
+
+def run_docker_flows(env, n):
+    """dockerapi contra o daemon falso (API) e sem socket (fallback para o CLI)."""
+    import dockerapi
+    import readiness
+
+    flows = []
+
+    def check_exec(i):
+        cmd = ["node", "openclaw.mjs", "--big" if i % 2 else "status"]
+        frames, code = fake_exec_output(cmd)
+        seen = []
+        result = dockerapi.exec_service(GATEWAY_SERVICE, cmd, on_output=lambda stream, chunk: seen.append(stream))
+        stdout = b"".join(d for st, d in frames if st == 1).decode()
+        stderr = b"".join(d for st, d in frames if st == 2).decode()
+        return (result.args[0] == "docker-api" and result.returncode == code
+                and result.stdout == stdout and result.stderr == stderr and set(seen) == {1, 2})
+
+    def check_exec_timeout(i):
+        # Exec ja enviado: o timeout sobe, sem repetir o comando pelo CLI
+        before = len(docker.execs)
+        try:
+            dockerapi.exec_service(GATEWAY_SERVICE, ["node", "openclaw.mjs", "--slow"], timeout=0.2)
+        except subprocess.TimeoutExpired:
+            return len(docker.execs) == before + 1
+        return False
+
+    def check_wait(i):
+        since = time.time()
+        result = dockerapi.restart_service(GATEWAY_SERVICE)
+        ready = readiness.wait_for_container(GATEWAY_SERVICE, dockerapi.COMPOSE_FILE, since=since, timeout=10)
+        # So pronto depois do health_status: healthy (start sozinho nao basta)
+        return result.args[0] == "docker-api" and ready and time.time() - since >= 2 * FAKE_RESTART_DELAY
+
+    with env.docker_api() as docker:
+        flows.append(run_flow("docker api: exec_service", n * 2, check_exec))
+        flows.append(run_flow("docker api: exec timeout (no cli retry)", n, check_exec_timeout))
+        flows.append(run_flow("docker api: restart + wait_for_container", n, check_wait))
+        flows.append(run_flow("docker api: prune_images", n, lambda i: (
+            dockerapi.prune_images().args[0] == "docker-api" and docker.pruned == i + 1
+        )))
+
+    # Sem socket: os mesmos helpers caem no `docker` falso
+    def check_cli(i):
+        pairing = dockerapi.exec_service(GATEWAY_SERVICE, ["node", "openclaw.mjs", "devices", "approve", "pairing"])
+        prune = dockerapi.prune_images()
+        ready = readiness.wait_for_container(GATEWAY_SERVICE, dockerapi.COMPOSE_FILE, since=time.time(), timeout=10)
+        return (pairing.args[0] == "docker" and "Approved" in pairing.stdout
+                and prune.args[0] == "docker" and prune.returncode == 0 and ready)
+
+    flows.append(run_flow("docker cli fallback", n, check_cli))
+    return flows
+
+
+def print_report(summaries):
+    cols = ("flow", "n", "errors", "p50_ms", "p95_ms", "max_ms", "wall_ms")
+    widths = {c: max(len(c), *(len(str(s[c])) for s in summaries)) for c in cols}
+    print("  ".join(c.ljust(widths[c]) if c == "flow" else c.rjust(widths[c]) for c in cols))
+    for s in summaries:
+        print("  ".join(str(s[c]).ljust(widths[c]) if c == "flow" else str(s[c]).rjust(widths[c]) for c in cols))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--fake"]:
+        return fake_main(argv[1], argv[2:])
+
+    parser = argparse.ArgumentParser(description="Benchmark hermetico do wizard e do updater.")
+    parser.add_argument("-n", "--iterations", type=int, default=5)
+    parser.add_argument("--docker-latency", help="JSON {operacao: segundos} sobre os defaults")
+    parser.add_argument("--provider-latency", type=float, default=PROVIDER_LATENCY)
+    parser.add_argument("--build-fail", type=int, default=0, help="quantas tags mais novas falham no build")
+    parser.add_argument("--json", action="store_true", help="saida em JSON")
+    args = parser.parse_args(argv)
+
+    env = Environment(args)
+    t0 = time.perf_counter()
+    summaries = [f.summary() for f in run_bench(env, args.iterations)]
+    total_ms = round((time.perf_counter() - t0) * 1000, 1)
+    if args.json:
+        print(json.dumps({"flows": summaries, "total_ms": total_ms, "tmpdir": env.root}, indent=2))
+    else:
+        print_report(summaries)
+        print(f"\ntotal: {total_ms} ms  (tmpdir: {env.root})")
+    return 1 if any(s["errors"] for s in summaries) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
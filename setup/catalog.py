@@ -0,0 +1,209 @@
+"""
+Provider model-catalog cache for /api/validate-key.
+
+Entries are keyed by provider + a hash of the API key:
+  - fresh hits (TTL) are answered from memory with no HTTP call
+  - stale hits are answered immediately and refreshed in the background
+  - 401/403 answers are cached for NEGATIVE_TTL (negative caching)
+The last good catalog of each provider is also saved under CATALOG_DIR, so
+the wizard can render the model picker instantly and the other gunicorn
+worker can reuse a catalog fetched by this one.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import httpclient
+import jsonstream
+
+CATALOG_DIR = "/var/lib/openclaw-catalog"
+TTL = 600
+NEGATIVE_TTL = 60
+MAX_STALE = 3600
+
+# Podem ser sobrescritas para apontar para servidores stub locais (bench/testes)
+PROVIDER_URLS = {
+    "anthropic": "https://api.anthropic.com/v1/models",
+    "openai": "https://api.openai.com/v1/models",
+    "openrouter": "https://openrouter.ai/api/v1/models",
+}
+PROVIDERS = tuple(PROVIDER_URLS)
+
+
+class CatalogError(Exception):
+    """Erro de validacao da chave (code = status HTTP quando houver)."""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def key_hash(key):
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def _provider_headers(provider, key):
+    if provider == "anthropic":
+        return {"x-api-key": key, "anthropic-version": "2023-06-01"}
+    return {"Authorization": f"Bearer {key}"}
+
+
+def _keep_model(provider, mid):
+    if provider == "anthropic":
+        return "claude" in mid.lower()
+    if provider == "openai":
+        return any(mid.startswith(p) for p in ["gpt-4", "gpt-3.5", "o1", "o3", "o4", "chatgpt"])
+    return bool(mid)
+
+
+def compact_model(provider, m):
+    """Somente os campos que o picker usa: id, name, context_length, pricing."""
+    mid = m.get("id", "")
+    if provider == "anthropic":
+        name = m.get("display_name") or mid.replace("-", " ").title()
+    else:
+        name = m.get("name") or mid
+    entry = {"id": mid, "name": name}
+    ctx_len = m.get("context_length")
+    if ctx_len:
+        entry["context_length"] = ctx_len
+    pricing = m.get("pricing")
+    if isinstance(pricing, dict):
+        entry["pricing"] = {k: pricing[k] for k in ("prompt", "completion") if k in pricing}
+    return entry
+
+
+def fetch_models(provider, key):
+    """Busca a lista de modelos do provider, filtrando enquanto le o stream.
+
+    O corpo nunca e carregado inteiro: cada item de "data" e decodificado,
+    filtrado e reduzido a um dict compacto antes de ler o proximo.
+    """
+    if provider not in PROVIDER_URLS:
+        raise CatalogError(f"Provider desconhecido: {provider}")
+    models = []
+    with httpclient.pool.open("GET", PROVIDER_URLS[provider], headers=_provider_headers(provider, key)) as resp:
+        if resp.status >= 400:
+            raise httpclient.HTTPStatusError(resp.status, resp.read(500))
+        for m in jsonstream.iter_items(resp, "data"):
+            if isinstance(m, dict) and _keep_model(provider, m.get("id", "")):
+                models.append(compact_model(provider, m))
+        resp.read()
+
+    if provider in ("anthropic", "openai"):
+        models.sort(key=lambda x: x["id"], reverse=True)
+    return models
+
+
+def snapshot_path(provider):
+    return os.path.join(CATALOG_DIR, f"{provider}.json")
+
+
+def load_snapshot(provider):
+    """Ultimo catalogo bom salvo em disco para o provider (ou None)."""
+    if provider not in PROVIDERS:
+        return None
+    try:
+        with open(snapshot_path(provider), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_snapshot(provider, khash, models, fetched_at):
+    os.makedirs(CATALOG_DIR, mode=0o700, exist_ok=True)
+    path = snapshot_path(provider)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump({"provider": provider, "key_hash": khash,
+                   "fetched_at": fetched_at, "models": models}, f)
+    os.replace(tmp, path)
+
+
+class CatalogCache:
+    """Cache em memoria (por worker) + snapshot em disco (compartilhado)."""
+
+    def __init__(self, fetch=fetch_models):
+        self._fetch = fetch
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, provider, key):
+        """Retorna (models, from_cache). Levanta CatalogError ou erros de rede."""
+        if provider not in PROVIDERS:
+            raise CatalogError(f"Provider desconhecido: {provider}")
+        cache_key = (provider, key_hash(key))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+        if entry is None:
+            entry = self._from_snapshot(provider, cache_key[1])
+
+        if entry is not None:
+            age = now - entry["fetched_at"]
+            if entry.get("error"):
+                if age < NEGATIVE_TTL:
+                    raise CatalogError(entry["error"], entry.get("code"))
+            elif age < TTL:
+                return entry["models"], True
+            elif age < MAX_STALE:
+                # Stale-while-revalidate: responde ja e atualiza em background
+                self._refresh_async(provider, key, cache_key)
+                return entry["models"], True
+
+        return self._refresh(provider, key, cache_key), False
+
+    def _from_snapshot(self, provider, khash):
+        snap = load_snapshot(provider)
+        if not snap or snap.get("key_hash") != khash:
+            return None
+        entry = {"models": snap["models"], "fetched_at": snap["fetched_at"]}
+        with self._lock:
+            self._entries[(provider, khash)] = entry
+        return entry
+
+    def _refresh(self, provider, key, cache_key):
+        try:
+            models = self._fetch(provider, key)
+        except httpclient.HTTPStatusError as e:
+            if e.code in (401, 403):
+                msg = "Chave invalida (401 Unauthorized)." if e.code == 401 else "Chave sem permissao (403 Forbidden)."
+                with self._lock:
+                    self._entries[cache_key] = {"error": msg, "code": e.code, "fetched_at": time.time()}
+                raise CatalogError(msg, e.code)
+            raise CatalogError(f"Erro HTTP {e.code} ao validar chave.", e.code)
+
+        fetched_at = time.time()
+        with self._lock:
+            self._entries[cache_key] = {"models": models, "fetched_at": fetched_at}
+        if models:
+            try:
+                save_snapshot(provider, cache_key[1], models, fetched_at)
+            except OSError:
+                pass
+        return models
+
+    def _refresh_async(self, provider, key, cache_key):
+        with self._lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+
+        def run():
+            try:
+                self._refresh(provider, key, cache_key)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(cache_key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+
+cache = CatalogCache()
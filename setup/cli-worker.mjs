@@ -0,0 +1,122 @@
+// OpenClaw CLI worker — roda dentro de um container openclaw-cli de longa duracao.
+//
+// Recebe comandos do wizard por um socket Unix (um JSON por linha) e executa
+// `node dist/index.js <argv>` no container ja criado, devolvendo stdout/stderr
+// em streaming. Evita criar/destruir um container a cada onboard/pairing e,
+// com NODE_COMPILE_CACHE, os comandos seguintes reaproveitam o bytecode ja
+// compilado do CLI. Sai sozinho apos IDLE segundos sem comandos.
+// O env do container congela no `compose run`; o wizard manda o .env atual
+// em cada "run" (req.env), que sobrescreve o process.env.
+//
+// Protocolo (por conexao):
+//   -> {"op": "run", "argv": [...], "env": {...}, "timeout": ms}
+//   <- {"stream": 1|2, "data": "..."}   (zero ou mais)
+//   <- {"exit": code}
+//   -> {"op": "ping"}      <- {"ok": true, "active": n}
+//   -> {"op": "shutdown"}  <- {"ok": true}
+
+import fs from "node:fs";
+import net from "node:net";
+import path from "node:path";
+import { spawn } from "node:child_process";
+
+const SOCKET = process.env.OPENCLAW_CLI_WORKER_SOCKET || "/run/openclaw-cli/worker.sock";
+const IDLE_MS = Number(process.env.OPENCLAW_CLI_WORKER_IDLE || 300) * 1000;
+const ENTRY = process.env.OPENCLAW_CLI_ENTRY || "dist/index.js";
+const COMPILE_CACHE = process.env.NODE_COMPILE_CACHE || "/tmp/openclaw-cli-compile-cache";
+const STARTING = path.join(path.dirname(SOCKET), "starting");
+
+let active = 0;
+let idleTimer = null;
+
+function armIdle() {
+  clearTimeout(idleTimer);
+  if (active === 0) idleTimer = setTimeout(shutdown, IDLE_MS);
+}
+
+function shutdown() {
+  server.close();
+  try { fs.unlinkSync(SOCKET); } catch {}
+  process.exit(0);
+}
+
+function send(sock, obj) {
+  if (!sock.destroyed) sock.write(JSON.stringify(obj) + "\n");
+}
+
+function run(sock, req) {
+  active++;
+  clearTimeout(idleTimer);
+  let finished = false;
+  const finish = (code) => {
+    if (finished) return;
+    finished = true;
+    active--;
+    send(sock, { exit: code });
+    sock.end();
+    armIdle();
+  };
+
+  const child = spawn(process.execPath, [ENTRY, ...(req.argv || [])], {
+    env: { ...process.env, NODE_COMPILE_CACHE: COMPILE_CACHE, ...(req.env || {}) },
+    stdio: ["ignore", "pipe", "pipe"],
+  });
+  const timer = req.timeout ? setTimeout(() => child.kill("SIGKILL"), req.timeout) : null;
+  child.stdout.setEncoding("utf8");
+  child.stderr.setEncoding("utf8");
+  child.stdout.on("data", (data) => send(sock, { stream: 1, data }));
+  child.stderr.on("data", (data) => send(sock, { stream: 2, data }));
+  child.on("error", (err) => {
+    send(sock, { stream: 2, data: String(err) });
+    finish(127);
+  });
+  child.on("close", (code, signal) => {
+    clearTimeout(timer);
+    finish(code ?? 128 + (signal === "SIGKILL" ? 9 : 15));
+  });
+  // Cliente desistiu (timeout do lado do wizard): nao deixar o comando orfao
+  sock.on("close", () => { if (!finished) child.kill("SIGKILL"); });
+}
+
+const server = net.createServer((sock) => {
+  let buf = "";
+  sock.setEncoding("utf8");
+  sock.on("error", () => {});
+  sock.on("data", (chunk) => {
+    buf += chunk;
+    const nl = buf.indexOf("\n");
+    if (nl < 0) return;
+    sock.removeAllListeners("data");
+    let req;
+    try {
+      req = JSON.parse(buf.slice(0, nl));
+    } catch {
+      send(sock, { exit: 2, error: "invalid request" });
+      sock.end();
+      return;
+    }
+    if (req.op === "ping") {
+      send(sock, { ok: true, active });
+      sock.end();
+    } else if (req.op === "shutdown") {
+      send(sock, { ok: true });
+      sock.end(shutdown);
+    } else {
+      run(sock, req);
+    }
+  });
+});
+
+try { fs.unlinkSync(SOCKET); } catch {}
+server.listen(SOCKET, () => {
+  try { fs.unlinkSync(STARTING); } catch {}
+  armIdle();
+  // Aquecer o compile cache enquanto o usuario ainda preenche o wizard
+  spawn(process.execPath, [ENTRY, "--version"], {
+    env: { ...process.env, NODE_COMPILE_CACHE: COMPILE_CACHE },
+    stdio: "ignore",
+  }).on("error", () => {});
+});
+
+process.on("SIGTERM", shutdown);
+process.on("SIGINT", shutdown);
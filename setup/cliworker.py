@@ -0,0 +1,188 @@
+"""
+Client for the long-lived OpenClaw CLI worker (cli-worker.mjs).
+
+The worker runs in an `openclaw-cli` container started ahead of time
+(`docker compose run -d`), listens on a Unix socket in a host directory
+bind-mounted into the container, and runs `node dist/index.js <argv>`
+for each request. Onboard then skips container creation; repeated
+commands also reuse Node's compile cache. The worker exits on its own
+after IDLE_TIMEOUT seconds without requests, so the wizard only starts it
+when the user reaches the last form step (POST /api/cli-worker/warm).
+
+The container's environment is frozen at `compose run` time, before the
+setup writes the final .env. run() therefore sends the current .env
+contents with every command; per-call env still wins.
+
+run() raises WorkerUnavailable when no worker answers, so callers keep
+their `docker compose run` / `exec` path as the fallback.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import threading
+import time
+
+import readiness
+import tracing
+from envfile import EnvFile
+
+WORKER_DIR = "/run/openclaw-cli"
+WORKER_SCRIPT = "/opt/openclaw-setup/cli-worker.mjs"
+OPENCLAW_DIR = "/opt/openclaw"
+CONTAINER_NAME = "openclaw-cli-worker"
+IDLE_TIMEOUT = 300  # segundos sem comandos ate o worker sair
+START_GRACE = 60  # marcador "starting" mais velho que isso e ignorado
+
+_CONTAINER_DIR = "/run/openclaw-cli"
+_CONTAINER_SCRIPT = "/opt/openclaw-cli-worker/cli-worker.mjs"
+
+_start_lock = threading.Lock()
+_start_thread = None
+
+
+class WorkerUnavailable(Exception):
+    """Nenhum worker respondendo no socket."""
+
+
+def socket_path():
+    return os.path.join(WORKER_DIR, "worker.sock")
+
+
+def _starting_path():
+    return os.path.join(WORKER_DIR, "starting")
+
+
+def _connect(timeout):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path())
+    except OSError as e:
+        sock.close()
+        raise WorkerUnavailable(str(e))
+    return sock
+
+
+def _request(payload, timeout):
+    sock = _connect(timeout)
+    try:
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+        f = sock.makefile("r", encoding="utf-8")
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    finally:
+        sock.close()
+
+
+def is_running():
+    try:
+        return any(msg.get("ok") for msg in _request({"op": "ping"}, timeout=2))
+    except (WorkerUnavailable, OSError, ValueError):
+        return False
+
+
+def is_starting():
+    try:
+        return time.time() - os.path.getmtime(_starting_path()) < START_GRACE
+    except OSError:
+        return False
+
+
+def start():
+    """Sobe o container do worker em background (idempotente)."""
+    with _start_lock:
+        if is_starting() or is_running():
+            return True
+        os.makedirs(WORKER_DIR, exist_ok=True)
+        # node (UID 1000) cria o socket aqui dentro
+        try:
+            os.chown(WORKER_DIR, 1000, 1000)
+        except PermissionError:
+            pass
+        with open(_starting_path(), "w") as f:
+            f.write(str(time.time()))
+        cmd = [
+            "docker", "compose", "-f", f"{OPENCLAW_DIR}/docker-compose.yml",
+            "run", "-d", "--rm", "--name", CONTAINER_NAME,
+            "-v", f"{WORKER_DIR}:{_CONTAINER_DIR}",
+            "-v", f"{WORKER_SCRIPT}:{_CONTAINER_SCRIPT}:ro",
+            "-e", f"OPENCLAW_CLI_WORKER_SOCKET={_CONTAINER_DIR}/worker.sock",
+            "-e", f"OPENCLAW_CLI_WORKER_IDLE={IDLE_TIMEOUT}",
+            "--entrypoint", "node",
+            "openclaw-cli", _CONTAINER_SCRIPT,
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60, cwd=OPENCLAW_DIR)
+        except (OSError, subprocess.TimeoutExpired):
+            result = None
+        if result is None or result.returncode != 0:
+            # Nome ja em uso = outro worker do gunicorn subiu primeiro; senao, falhou
+            try:
+                os.unlink(_starting_path())
+            except OSError:
+                pass
+            return False
+        return True
+
+
+def start_in_background():
+    """start() numa thread, sem empilhar threads se uma ainda estiver subindo."""
+    global _start_thread
+    with _start_lock:
+        if _start_thread is not None and _start_thread.is_alive():
+            return
+        _start_thread = threading.Thread(target=start, name="openclaw-cli-worker-start", daemon=True)
+        _start_thread.start()
+
+
+def current_env():
+    """.env atual do OpenClaw (o do container do worker pode ser de antes do setup)."""
+    return EnvFile(os.path.join(OPENCLAW_DIR, ".env")).values()
+
+
+def run(argv, env=None, timeout=120, wait=10, on_output=None):
+    """Executa `openclaw <argv>` no worker; retorna CompletedProcess.
+
+    wait: segundos para aguardar o socket se o worker ainda estiver subindo.
+    """
+    if not os.path.exists(socket_path()) and is_starting():
+        readiness.wait_for_file(socket_path(), timeout=wait)
+    out = {1: [], 2: []}
+    code = None
+    payload = {
+        "op": "run", "argv": list(argv),
+        "env": dict(current_env(), **(env or {})),
+        "timeout": int(timeout * 1000),
+    }
+    with tracing.span(f"cli-worker {argv[0] if argv else ''}".strip(), cat="subprocess") as s:
+        try:
+            for msg in _request(payload, timeout=timeout + 5):
+                if "exit" in msg:
+                    code = msg["exit"]
+                    break
+                stream = msg.get("stream", 1)
+                out.setdefault(stream, []).append(msg.get("data", ""))
+                if on_output:
+                    on_output(stream, msg.get("data", ""))
+        except socket.timeout:
+            raise subprocess.TimeoutExpired(argv, timeout)
+        except (OSError, ValueError) as e:
+            raise WorkerUnavailable(str(e))
+        if code is None:
+            raise WorkerUnavailable("Worker encerrou sem codigo de saida")
+        s["exit_code"] = code
+        s["out_bytes"] = sum(len(d.encode()) for chunks in out.values() for d in chunks)
+    return subprocess.CompletedProcess(list(argv), code, "".join(out[1]), "".join(out[2]))
+
+
+def stop():
+    """Pede ao worker para sair agora (ex: setup concluido)."""
+    try:
+        for _ in _request({"op": "shutdown"}, timeout=2):
+            pass
+    except (WorkerUnavailable, OSError, ValueError):
+        pass
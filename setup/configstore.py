@@ -0,0 +1,230 @@
+"""
+Transactional store for openclaw.json.
+
+Keeps a parsed copy of the file in memory (reloaded only when the file's
+stat changes, e.g. after the onboard container writes it), accepts
+JSON-Patch style operations (RFC 6902 add/remove/replace/test, plus a
+`default` op that only sets a missing value) and folds every queued
+patch into a single atomic write (temp + fsync + rename) so the
+gateway's hot-reload never sees a half-written file. `version` is bumped
+on every change, so readers can skip reloads when nothing changed.
+
+Two small extensions to RFC 6902, both needed by the wizard:
+  - `add` creates missing intermediate objects (like `mkdir -p`);
+  - `remove` accepts `"missing_ok": true`.
+"""
+
+import copy
+import json
+import os
+import stat
+import threading
+
+from ownership import tracker
+
+# openclaw.json guarda o token do gateway e o botToken do Telegram
+NEW_FILE_PERMS = 0o600
+
+
+class PatchError(ValueError):
+    """Operacao de patch invalida para o documento atual."""
+
+
+def _tokens(pointer):
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"JSON pointer invalido: {pointer!r}")
+    return [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+
+
+def _index(container, token, allow_end=False):
+    if token == "-" and allow_end:
+        return len(container)
+    try:
+        i = int(token)
+    except ValueError:
+        raise PatchError(f"Indice de array invalido: {token!r}")
+    if not 0 <= i <= len(container) - (0 if allow_end else 1):
+        raise PatchError(f"Indice fora do array: {i}")
+    return i
+
+
+def resolve(doc, pointer, default=None):
+    """Valor em pointer, ou default se algum nivel nao existir."""
+    node = doc
+    for token in _tokens(pointer):
+        if isinstance(node, dict):
+            if token not in node:
+                return default
+            node = node[token]
+        elif isinstance(node, list):
+            try:
+                node = node[_index(node, token)]
+            except PatchError:
+                return default
+        else:
+            return default
+    return node
+
+
+def _parent(doc, tokens, create):
+    node = doc
+    for token in tokens[:-1]:
+        if isinstance(node, dict):
+            if token not in node:
+                if not create:
+                    raise PatchError(f"Caminho inexistente: /{'/'.join(tokens)}")
+                node[token] = {}
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_index(node, token)]
+        else:
+            raise PatchError(f"Caminho atravessa um valor escalar: /{'/'.join(tokens)}")
+    return node, tokens[-1]
+
+
+def apply_op(doc, op):
+    """Aplica uma operacao em doc (in place); retorna o novo documento raiz."""
+    kind = op.get("op")
+    tokens = _tokens(op.get("path", ""))
+    if not tokens:
+        if kind in ("add", "replace"):
+            return copy.deepcopy(op["value"])
+        raise PatchError(f"Operacao {kind!r} nao suportada na raiz")
+
+    if kind == "test":
+        if resolve(doc, op["path"], default=op) != op.get("value"):
+            raise PatchError(f"test falhou em {op['path']}")
+        return doc
+
+    parent, key = _parent(doc, tokens, create=kind in ("add", "default"))
+    if isinstance(parent, dict):
+        exists = key in parent
+        if kind in ("add", "replace") or (kind == "default" and not exists):
+            if kind == "replace" and not exists:
+                raise PatchError(f"replace em caminho inexistente: {op['path']}")
+            parent[key] = copy.deepcopy(op["value"])
+        elif kind == "remove":
+            if exists:
+                del parent[key]
+            elif not op.get("missing_ok"):
+                raise PatchError(f"remove em caminho inexistente: {op['path']}")
+        elif kind != "default":
+            raise PatchError(f"Operacao desconhecida: {kind!r}")
+    elif isinstance(parent, list):
+        if kind == "add":
+            parent.insert(_index(parent, key, allow_end=True), copy.deepcopy(op["value"]))
+        elif kind == "replace":
+            parent[_index(parent, key)] = copy.deepcopy(op["value"])
+        elif kind == "remove":
+            del parent[_index(parent, key)]
+        elif kind != "default":
+            raise PatchError(f"Operacao desconhecida: {kind!r}")
+    else:
+        raise PatchError(f"Caminho atravessa um valor escalar: {op['path']}")
+    return doc
+
+
+class ConfigStore:
+    """openclaw.json em memoria; patches enfileirados viram uma unica escrita atomica."""
+
+    def __init__(self, path, perms=None):
+        self.path = path
+        self.perms = perms
+        self.version = 0
+        self._data = None
+        self._stat = None
+        self._pending = []
+        self._lock = threading.RLock()
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _perms(self):
+        """perms explicito; senao o modo atual do arquivo (ou 0600 se ainda nao existe)."""
+        if self.perms is not None:
+            return self.perms
+        try:
+            return stat.S_IMODE(os.stat(self.path).st_mode)
+        except FileNotFoundError:
+            return NEW_FILE_PERMS
+
+    def _refresh(self):
+        """Recarrega do disco so se o arquivo mudou desde a ultima leitura/escrita."""
+        st = self._file_stat()
+        if self._data is not None and st == self._stat:
+            return
+        if st is None:
+            data = {}
+        else:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        if data != self._data:
+            self.version += 1
+        self._data = data
+        self._stat = st
+
+    def load(self):
+        """Copia do documento atual."""
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._data)
+
+    def get(self, pointer, default=None):
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(resolve(self._data, pointer, default))
+
+    def changed_since(self, version):
+        with self._lock:
+            self._refresh()
+            return self.version != version
+
+    def queue(self, ops):
+        """Enfileira operacoes; so vao para o disco no proximo commit()."""
+        with self._lock:
+            self._pending.extend(ops)
+        return self
+
+    def commit(self):
+        """Aplica os patches pendentes numa copia e grava tudo de uma vez. Retorna a versao."""
+        with self._lock:
+            self._refresh()
+            ops, self._pending = self._pending, []
+            if not ops:
+                return self.version
+            doc = copy.deepcopy(self._data)
+            for op in ops:
+                doc = apply_op(doc, op)
+            if doc == self._data:
+                return self.version
+            tracker.write(self.path, json.dumps(doc, indent=2), perms=self._perms())
+            self._data = doc
+            self._stat = self._file_stat()
+            self.version += 1
+            return self.version
+
+    def patch(self, ops):
+        """queue + commit."""
+        with self._lock:
+            self.queue(ops)
+            return self.commit()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def store_for(path):
+    """Uma instancia por caminho (compartilhada entre stages do mesmo processo)."""
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = ConfigStore(path)
+        return store
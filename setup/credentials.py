@@ -0,0 +1,119 @@
+"""
+Concurrent validation of every credential in the wizard form.
+
+validate_all() checks the provider API keys (through the catalog cache)
+and the Telegram bot token (getMe) in parallel over the pooled keep-alive
+client, returning one result per credential with its latency. Every
+validation is also recorded in the Prometheus registry (latency and, on
+failure, an error class).
+"""
+
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import catalog
+import httpclient
+import metrics
+import modelindex
+
+# Pode ser sobrescrita para apontar para um servidor stub local (bench/testes)
+TELEGRAM_API = "https://api.telegram.org"
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="openclaw-validate")
+
+VALIDATION_SECONDS = metrics.registry.histogram(
+    "openclaw_provider_validation_seconds",
+    "Latencia da validacao de credenciais por provider.",
+    ["provider", "result"],
+)
+VALIDATION_ERRORS = metrics.registry.counter(
+    "openclaw_provider_validation_errors_total",
+    "Falhas de validacao de credenciais por provider e classe de erro.",
+    ["provider", "error_class"],
+)
+
+
+def validate_provider(provider, key):
+    models, cached = catalog.cache.get(provider, key)
+    if not models:
+        return {"success": False, "error": "Nenhum modelo encontrado. Verifique a chave."}
+    return {"success": True, "models": modelindex.page(models), "total": len(models), "cached": cached}
+
+
+def validate_telegram(token):
+    """Confere o token do bot via getMe."""
+    if ":" not in token:
+        return {"success": False, "error": "Token invalido. Formato: 1234567890:ABCdef..."}
+    try:
+        body = httpclient.pool.get_json(f"{TELEGRAM_API}/bot{token}/getMe", timeout=10)
+    except httpclient.HTTPStatusError as e:
+        if e.code in (401, 404):
+            return {"success": False, "error": "Token do bot recusado pelo Telegram."}
+        return {"success": False, "error": f"Erro HTTP {e.code} ao validar token do Telegram."}
+    if not body.get("ok"):
+        return {"success": False, "error": body.get("description") or "Token do bot recusado pelo Telegram."}
+    bot = body.get("result", {})
+    return {"success": True, "bot": {"username": bot.get("username"), "name": bot.get("first_name")}}
+
+
+def error_class(exc):
+    """Classe do erro para metricas: auth, rate_limit, http_4xx, upstream, timeout, network, invalid, internal."""
+    code = getattr(exc, "code", None)
+    if code in (401, 403):
+        return "auth"
+    if code == 429:
+        return "rate_limit"
+    if isinstance(code, int):
+        return "upstream" if code >= 500 else "http_4xx"
+    if isinstance(exc, catalog.CatalogError):
+        return "invalid"
+    if isinstance(exc, (socket.timeout, TimeoutError)):
+        return "timeout"
+    if isinstance(exc, OSError):
+        return "network"
+    return "internal"
+
+
+def record(provider, seconds, error=None):
+    """Registra uma validacao; error e a excecao ou a classe do erro (ex: "empty")."""
+    # provider vem do corpo da requisicao: so nomes conhecidos viram label
+    if provider not in catalog.PROVIDERS and provider != "telegram":
+        provider = "unknown"
+    if error is None:
+        VALIDATION_SECONDS.observe(seconds, provider=provider, result="ok")
+        return
+    VALIDATION_SECONDS.observe(seconds, provider=provider, result="error")
+    VALIDATION_ERRORS.inc(provider=provider, error_class=error if isinstance(error, str) else error_class(error))
+
+
+def _timed(name, fn, *args):
+    t0 = time.monotonic()
+    error = None
+    try:
+        result = fn(*args)
+        if not result["success"]:
+            error = "empty" if name != "telegram" else "rejected"
+    except catalog.CatalogError as e:
+        error = e
+        result = {"success": False, "error": str(e)}
+    except Exception as e:
+        error = e
+        result = {"success": False, "error": f"Erro ao validar: {str(e)[:200]}"}
+    elapsed = time.monotonic() - t0
+    record(name, elapsed, error)
+    result["latency_ms"] = int(elapsed * 1000)
+    return result
+
+
+def validate_all(creds):
+    """creds: {"anthropic_key", "openai_key", "openrouter_key", "telegram_token"} (vazios sao ignorados)."""
+    futures = {}
+    for provider in catalog.PROVIDERS:
+        key = (creds.get(f"{provider}_key") or "").strip()
+        if key:
+            futures[provider] = _executor.submit(_timed, provider, validate_provider, provider, key)
+    telegram_token = (creds.get("telegram_token") or "").strip()
+    if telegram_token:
+        futures["telegram"] = _executor.submit(_timed, "telegram", validate_telegram, telegram_token)
+    return {name: fut.result() for name, fut in futures.items()}
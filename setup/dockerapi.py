@@ -0,0 +1,348 @@
+"""
+In-process Docker Engine API client over /var/run/docker.sock.
+
+Replaces forks of the `docker` / `docker compose` CLI for the operations
+the wizard and the updater repeat: container lookup/inspect, restart,
+exec (with streamed, demultiplexed output), image prune and events.
+Connections are HTTP/1.1 keep-alive over the Unix socket and pooled.
+
+The service-level helpers (restart_service, exec_service, prune_images)
+fall back to the CLI only when connecting to the socket fails, so behaviour
+on a host without API access is unchanged. Once a request has been sent,
+nothing is retried through the CLI: a timeout surfaces as
+subprocess.TimeoutExpired (as with the CLI) and other failures as DockerError. `compose up`/`run` stay on the CLI:
+they depend on compose's own project model.
+
+Stdlib-only (also imported by the updater, which runs on system python3).
+"""
+
+import contextlib
+import http.client
+import json
+import socket
+import struct
+import subprocess
+import threading
+from urllib.parse import quote, urlencode
+
+import tracing
+
+DOCKER_SOCKET = "/var/run/docker.sock"
+COMPOSE_PROJECT = "openclaw"
+COMPOSE_FILE = "/opt/openclaw/docker-compose.yml"
+OPENCLAW_DIR = "/opt/openclaw"
+
+_MUX_HEADER = struct.Struct(">BxxxL")
+
+
+class DockerError(Exception):
+    """Erro devolvido pela Docker Engine API."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class DockerUnavailable(DockerError):
+    """Socket do Docker inacessivel (connect falhou, nada foi enviado) — usar o CLI."""
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise DockerUnavailable(f"Docker API indisponivel: {e}")
+        self.sock = sock
+
+
+@contextlib.contextmanager
+def _sent(what, timeout):
+    """Erros depois do envio: timeout vira TimeoutExpired, o resto DockerError (sem CLI)."""
+    try:
+        yield
+    except (socket.timeout, TimeoutError):
+        raise subprocess.TimeoutExpired(what, timeout) from None
+    except (OSError, http.client.HTTPException) as e:
+        raise DockerError(f"{what}: conexao interrompida: {e}") from None
+
+
+class DockerClient:
+    """Cliente da Engine API com pool de conexoes keep-alive no socket Unix."""
+
+    def __init__(self, socket_path=None, max_idle=4, timeout=60):
+        self.socket_path = socket_path
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self.socket_path or DOCKER_SOCKET
+
+    def _acquire(self, timeout):
+        with self._lock:
+            if self._idle:
+                conn = self._idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        return _UnixHTTPConnection(self.path, timeout=timeout), False
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        """Fecha as conexoes ociosas do pool (ex.: depois de trocar o socket)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def _send(self, method, path, body=None, timeout=None):
+        timeout = timeout or self.timeout
+        headers = {}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        what = f"docker {method} {path.split('?', 1)[0]}"
+        conn, reused = self._acquire(timeout)
+        for attempt in (0, 1):
+            try:
+                conn.request(method, path, body=data, headers=headers)
+                return conn, conn.getresponse()
+            except DockerUnavailable:
+                conn.close()
+                raise
+            except (socket.timeout, TimeoutError):
+                # O daemon recebeu e esta processando: nao repetir
+                conn.close()
+                raise subprocess.TimeoutExpired(what, timeout) from None
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if attempt == 0 and reused:
+                    # Keep-alive fechado pelo daemon: tentar com conexao nova
+                    conn = _UnixHTTPConnection(self.path, timeout=timeout)
+                    continue
+                raise DockerError(f"{what}: conexao interrompida: {e}") from None
+
+    def request(self, method, path, body=None, timeout=None, ok=(200, 201, 204, 304)):
+        """Requisicao completa; retorna o JSON da resposta (ou None)."""
+        with tracing.span(f"docker {method} {path.split('?', 1)[0]}", cat="docker") as s:
+            conn, resp = self._send(method, path, body, timeout)
+            try:
+                with _sent(s["name"], timeout or self.timeout):
+                    data = resp.read()
+            except DockerError:
+                conn.close()
+                raise
+            s["exit_code"] = resp.status
+            s["out_bytes"] = len(data)
+        if resp.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+        if resp.status not in ok:
+            try:
+                message = json.loads(data).get("message", "")
+            except ValueError:
+                message = data[:300].decode(errors="replace")
+            raise DockerError(message or f"HTTP {resp.status}", resp.status)
+        if not data:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    # ── containers ──
+
+    def ping(self):
+        try:
+            conn, resp = self._send("GET", "/_ping", timeout=2)
+            resp.read()
+            self._release(conn) if not resp.will_close else conn.close()
+            return resp.status == 200
+        except (DockerError, subprocess.TimeoutExpired):
+            return False
+
+    def containers(self, labels=None, all=False):
+        filters = {"label": [f"{k}={v}" for k, v in (labels or {}).items()]}
+        query = urlencode({"all": "1" if all else "0", "filters": json.dumps(filters)})
+        return self.request("GET", f"/containers/json?{query}") or []
+
+    def service_container(self, service, project=None, all=True):
+        """ID do container de um service do compose (ou None)."""
+        found = self.containers({
+            "com.docker.compose.project": project or COMPOSE_PROJECT,
+            "com.docker.compose.service": service,
+        }, all=all)
+        return found[0]["Id"] if found else None
+
+    def inspect(self, cid):
+        return self.request("GET", f"/containers/{quote(cid)}/json")
+
+    def start(self, cid):
+        self.request("POST", f"/containers/{quote(cid)}/start")
+
+    def restart(self, cid, timeout=10):
+        self.request("POST", f"/containers/{quote(cid)}/restart?t={int(timeout)}", timeout=timeout + 60)
+
+    # ── exec ──
+
+    def exec(self, cid, cmd, env=None, workdir=None, on_output=None, timeout=60):
+        """Executa cmd no container; retorna (exit_code, stdout, stderr).
+
+        on_output(stream, bytes) recebe a saida conforme chega (stream: 1=stdout, 2=stderr).
+        """
+        spec = {"Cmd": list(cmd), "AttachStdout": True, "AttachStderr": True, "Tty": False}
+        if env:
+            spec["Env"] = [f"{k}={v}" for k, v in env.items()]
+        if workdir:
+            spec["WorkingDir"] = workdir
+        exec_id = self.request("POST", f"/containers/{quote(cid)}/exec", spec)["Id"]
+
+        conn, resp = self._send("POST", f"/exec/{exec_id}/start", {"Detach": False, "Tty": False}, timeout)
+        out = {1: bytearray(), 2: bytearray()}
+        try:
+            with _sent(f"docker exec {cmd[0]}", timeout):
+                if resp.status != 200:
+                    raise DockerError(resp.read()[:300].decode(errors="replace"), resp.status)
+                for stream, chunk in _demux(resp):
+                    out.setdefault(stream, bytearray()).extend(chunk)
+                    if on_output:
+                        on_output(stream, chunk)
+        finally:
+            # Stream de exec termina com o fim da conexao; nao reaproveitar
+            conn.close()
+
+        try:
+            info = self.request("GET", f"/exec/{exec_id}/json")
+        except DockerUnavailable as e:
+            # O comando ja rodou: o chamador nao pode cair no CLI e repetir
+            raise DockerError(str(e)) from None
+        return info.get("ExitCode", -1), bytes(out[1]).decode(errors="replace"), bytes(out[2]).decode(errors="replace")
+
+    # ── images / events ──
+
+    def prune_images(self, dangling=True):
+        filters = json.dumps({"dangling": ["true" if dangling else "false"]})
+        return self.request("POST", f"/images/prune?{urlencode({'filters': filters})}", timeout=120)
+
+    def events(self, filters=None, since=None, until=None, timeout=None):
+        """Gera eventos (dicts) conforme o daemon publica."""
+        params = {}
+        if filters:
+            params["filters"] = json.dumps(filters)
+        # O daemon aceita "segundos.fracao"; truncar para int adiantaria o since
+        if since is not None:
+            params["since"] = f"{since:.6f}"
+        if until is not None:
+            params["until"] = f"{until:.6f}"
+        conn, resp = self._send("GET", f"/events?{urlencode(params)}", timeout=timeout)
+        try:
+            with _sent("docker events", timeout):
+                if resp.status != 200:
+                    raise DockerError(resp.read()[:300].decode(errors="replace"), resp.status)
+                while True:
+                    line = resp.readline()
+                    if not line:
+                        return
+                    line = line.strip()
+                    if line:
+                        yield json.loads(line)
+        finally:
+            conn.close()
+
+
+def _demux(resp):
+    """Separa o stream multiplexado do Docker em (stream, bytes)."""
+    while True:
+        header = resp.read(_MUX_HEADER.size)
+        if len(header) < _MUX_HEADER.size:
+            return
+        stream, size = _MUX_HEADER.unpack(header)
+        remaining = size
+        while remaining > 0:
+            chunk = resp.read(min(remaining, 64 * 1024))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield stream, chunk
+
+
+client = DockerClient()
+
+
+# ── Helpers por service, com fallback para o CLI ──
+
+def _cli(cmd, timeout):
+    return subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, cwd=OPENCLAW_DIR)
+
+
+def _service_container(service, all=True):
+    # Lookup so le estado: qualquer falha aqui ainda pode cair no CLI
+    try:
+        return client.service_container(service, all=all)
+    except (DockerError, subprocess.TimeoutExpired):
+        return None
+
+
+def restart_service(service, timeout=60):
+    """Reinicia o container do service; retorna CompletedProcess (API ou CLI).
+
+    CLI so se o restart nem chegou ao daemon; TimeoutExpired sobe como no CLI.
+    """
+    args = ["docker-api", "restart", service]
+    cid = _service_container(service)
+    if cid:
+        try:
+            client.restart(cid)
+            return subprocess.CompletedProcess(args, 0, "", "")
+        except DockerUnavailable:
+            pass
+        except DockerError as e:
+            return subprocess.CompletedProcess(args, 1, "", str(e))
+    return _cli(["docker", "compose", "-f", COMPOSE_FILE, "restart", service], timeout)
+
+
+def exec_service(service, cmd, timeout=30, on_output=None):
+    """`docker compose exec -T service cmd` via API; CLI so se a API falhar antes do exec.
+
+    Depois do exec enviado nada e repetido no CLI (pairing approve rodaria duas
+    vezes): timeout sobe como TimeoutExpired e outros erros como DockerError.
+    """
+    cid = _service_container(service, all=False)
+    if cid:
+        try:
+            code, out, err = client.exec(cid, cmd, on_output=on_output, timeout=timeout)
+            return subprocess.CompletedProcess(["docker-api", "exec", service] + list(cmd), code, out, err)
+        except DockerUnavailable:
+            pass
+    return _cli(["docker", "compose", "-f", COMPOSE_FILE, "exec", "-T", service] + list(cmd), timeout)
+
+
+def prune_images(timeout=30):
+    """`docker image prune -f` via API, com fallback para o CLI se o socket nao conecta."""
+    args = ["docker-api", "image", "prune"]
+    try:
+        client.prune_images()
+        return subprocess.CompletedProcess(args, 0, "", "")
+    except DockerUnavailable:
+        return _cli(["docker", "image", "prune", "-f"], timeout)
+    except DockerError as e:
+        return subprocess.CompletedProcess(args, 1, "", str(e))
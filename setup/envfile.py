@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Batched, atomic editor for the OpenClaw .env file.
+
+EnvFile parses the file once, keeps line order, comments and commented
+`# KEY=` placeholders, applies any number of updates in memory and
+commits them with a single temp file + fsync + rename (mode 600), so
+docker compose never reads a half-written .env.
+
+Also usable from shell scripts (firstboot):
+  python3 envfile.py /opt/openclaw/.env KEY=VALUE [KEY=VALUE ...]
+  printf 'KEY=VALUE\\n' | python3 envfile.py /opt/openclaw/.env -
+"""
+
+import os
+import re
+import sys
+
+import tracing
+
+_ASSIGN_RE = re.compile(r"^\s*(#\s*)?([A-Za-z_][A-Za-z0-9_]*)=(.*)$")
+
+
+class EnvFile:
+    """.env carregado em memoria; set()/update() e depois commit()."""
+
+    def __init__(self, path, mode=0o600):
+        self.path = path
+        self.mode = mode
+        self._lines = []
+        self._active = {}
+        self._placeholders = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            lines = []
+        for line in lines:
+            self._append(line)
+
+    def _append(self, line):
+        idx = len(self._lines)
+        self._lines.append(line)
+        m = _ASSIGN_RE.match(line)
+        if not m:
+            return
+        commented, key = m.group(1), m.group(2)
+        if commented:
+            self._placeholders.setdefault(key, idx)
+        else:
+            self._active[key] = idx
+
+    def get(self, key, default=None):
+        idx = self._active.get(key)
+        if idx is None:
+            return default
+        return _ASSIGN_RE.match(self._lines[idx]).group(3)
+
+    def values(self):
+        """{KEY: valor} das linhas ativas, sem aspas em volta (como o compose le)."""
+        out = {}
+        for key in self._active:
+            value = self.get(key)
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+                value = value[1:-1]
+            out[key] = value
+        return out
+
+    def __contains__(self, key):
+        return key in self._active
+
+    def set(self, key, value):
+        """Atualiza KEY (ou descomenta o placeholder `# KEY=`), senao adiciona no fim."""
+        line = f"{key}={value}"
+        if key in self._active:
+            idx = self._active[key]
+        elif key in self._placeholders:
+            idx = self._placeholders.pop(key)
+            self._active[key] = idx
+        else:
+            self._append(line)
+            self._dirty = True
+            return self
+        if self._lines[idx] != line:
+            self._lines[idx] = line
+            self._dirty = True
+        return self
+
+    def update(self, values):
+        for key, value in values.items():
+            self.set(key, value)
+        return self
+
+    def commit(self):
+        """Grava tudo de uma vez: temp (mode 600) + fsync + rename atomico."""
+        if not self._dirty and os.path.exists(self.path):
+            return False
+        with tracing.span(f"write {os.path.basename(self.path)}", cat="file") as s:
+            s["out_bytes"] = self._write()
+        self._dirty = False
+        return True
+
+    def _write(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp = os.path.join(directory, f".{os.path.basename(self.path)}.{os.getpid()}.tmp")
+        data = "\n".join(self._lines) + "\n"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, self.mode)
+        try:
+            os.fchmod(fd, self.mode)
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        return len(data.encode())
+
+
+def _parse_assignments(items):
+    values = {}
+    for item in items:
+        item = item.strip()
+        if not item or item.startswith("#"):
+            continue
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Atribuicao invalida (esperado KEY=VALUE): {item}")
+        values[key.strip()] = value
+    return values
+
+
+def main(argv):
+    if len(argv) < 2:
+        print(f"Uso: {argv[0]} ENV_FILE KEY=VALUE ... | -", file=sys.stderr)
+        return 2
+    path, items = argv[1], argv[2:]
+    if items == ["-"]:
+        items = sys.stdin.read().splitlines()
+    EnvFile(path).update(_parse_assignments(items)).commit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -7,6 +7,7 @@ SENTINEL="/var/lib/openclaw-firstboot-done"
 TOKEN_FILE="/var/lib/openclaw-token"
 SETUP_DONE_FILE="/var/lib/openclaw-setup-done"
 OPENCLAW_DIR="/opt/openclaw"
+SETUP_DIR="/opt/openclaw-setup"
 ENV_FILE="${OPENCLAW_DIR}/.env"
 
 log() { echo "[openclaw-firstboot] $1" | systemd-cat -t openclaw-firstboot; echo "[openclaw-firstboot] $1"; }
@@ -62,7 +63,7 @@ chmod 600 "${TOKEN_FILE}"
 
 # ── 5. Escrever .env inicial ──
 log "Escrevendo .env em ${ENV_FILE}"
-cat > "${ENV_FILE}" <<EOF
+cat > "${ENV_FILE}" <<'EOF'
 # OpenClaw Environment — gerado automaticamente pelo firstboot
 # Editado pelo wizard web apos setup
 
@@ -70,7 +71,7 @@ cat > "${ENV_FILE}" <<EOF
 OPENCLAW_IMAGE=openclaw:local
 
 # Token de acesso ao gateway (64 chars hex)
-OPENCLAW_GATEWAY_TOKEN=${GATEWAY_TOKEN}
+# OPENCLAW_GATEWAY_TOKEN=
 
 # Bind: lan = acessivel pela rede (necessario para VPS)
 OPENCLAW_GATEWAY_BIND=lan
@@ -89,7 +90,8 @@ CLAUDE_WEB_SESSION_KEY=
 CLAUDE_WEB_COOKIE=
 EOF
 
-chmod 600 "${ENV_FILE}"
+# Token via stdin (nao aparece no ps); envfile grava atomicamente com mode 600
+printf 'OPENCLAW_GATEWAY_TOKEN=%s\n' "${GATEWAY_TOKEN}" | python3 "${SETUP_DIR}/envfile.py" "${ENV_FILE}" -
 
 # ── 6. Iniciar Docker ──
 log "Garantindo que Docker esta rodando"
@@ -0,0 +1,178 @@
+"""
+Cached host facts shared by the wizard and the updater.
+
+The gateway token, the setup sentinel files and the server IP are read
+once and then served from memory. A background thread invalidates them:
+inotify on the directories holding the files, and a NETLINK_ROUTE socket
+subscribed to address changes for the IP. If either mechanism is not
+available the corresponding fact is simply read on every call, as before.
+"""
+
+import os
+import select
+import socket
+import threading
+
+import inotify
+
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+
+_UNSET = object()
+
+
+def detect_server_ip():
+    """Detecta o IP publico da VPS (rota default)."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(("8.8.8.8", 80))
+        return s.getsockname()[0]
+    finally:
+        s.close()
+
+
+class HostFacts:
+    """Valores do host em memoria, invalidados por eventos do kernel."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._gens = {}
+        self._epoch = 0
+        self._dirs = {}
+        self._watched_files = set()
+        self._inotify = None
+        self._netlink = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    # ── watcher ──
+
+    def _start(self):
+        """Sobe a thread de eventos na primeira consulta (uma vez por processo)."""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._start_watcher()
+
+    def _start_watcher(self):
+        if inotify.available():
+            try:
+                self._inotify = inotify.Inotify()
+            except OSError:
+                self._inotify = None
+        try:
+            nl = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            nl.bind((0, RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+            nl.setblocking(False)
+            self._netlink = nl
+        except (OSError, AttributeError):
+            self._netlink = None
+        self._thread = threading.Thread(target=self._watch, name="openclaw-hostfacts", daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        fds = [f for f in (self._inotify, self._netlink) if f is not None]
+        if not fds:
+            return
+        while True:
+            ready, _, _ = select.select(fds, [], [])
+            if self._netlink in ready:
+                try:
+                    while self._netlink.recv(65536):
+                        pass
+                except BlockingIOError:
+                    pass
+                self.invalidate("server_ip")
+            if self._inotify in ready:
+                for wd, mask, name in self._inotify.read_events(timeout=0):
+                    if wd == -1 or mask & inotify.IN_Q_OVERFLOW:
+                        # Fila do kernel estourou: eventos perdidos, nada no cache eh confiavel
+                        self.invalidate_all()
+                        continue
+                    directory = self._dirs.get(wd)
+                    if directory is not None:
+                        self.invalidate(os.path.join(directory, name))
+
+    def _watch_file(self, path):
+        """True se mudancas em path vao invalidar o cache."""
+        if path in self._watched_files:
+            return True
+        if self._inotify is None:
+            return False
+        directory = os.path.dirname(os.path.abspath(path))
+        with self._lock:
+            if path in self._watched_files:
+                return True
+            try:
+                wd = self._inotify.add_watch(directory, inotify.FILE_CHANGED | inotify.IN_MODIFY)
+            except OSError:
+                return False
+            self._dirs[wd] = directory
+            self._watched_files.add(path)
+        return True
+
+    # ── cache ──
+
+    def invalidate(self, key):
+        """Descarta um fato; para um path, tanto o conteudo quanto o exists()."""
+        with self._lock:
+            self._gens[key] = self._gens.get(key, 0) + 1
+            for cached in list(self._values):
+                if cached == key or (isinstance(cached, tuple) and cached[1] == key):
+                    self._values.pop(cached, None)
+
+    def invalidate_all(self):
+        with self._lock:
+            self._epoch += 1
+            self._values.clear()
+
+    def _cached(self, key, loader, live):
+        if not live:
+            return loader()
+        gen_key = key[1] if isinstance(key, tuple) else key
+        with self._lock:
+            value = self._values.get(key, _UNSET)
+            gen = (self._gens.get(gen_key, 0), self._epoch)
+        if value is not _UNSET:
+            return value
+        value = loader()
+        with self._lock:
+            # Evento chegou durante a leitura: nao guardar valor possivelmente velho
+            if (self._gens.get(gen_key, 0), self._epoch) == gen:
+                self._values[key] = value
+        return value
+
+    def read_file(self, path, default=None):
+        """Conteudo (strip) de um arquivo pequeno, ou default se nao existir."""
+        self._start()
+        path = os.path.abspath(path)
+
+        def load():
+            try:
+                with open(path, "r") as f:
+                    return f.read().strip()
+            except FileNotFoundError:
+                return default
+
+        return self._cached(("file", path, default), load, self._watch_file(path))
+
+    def exists(self, path):
+        self._start()
+        path = os.path.abspath(path)
+        return self._cached(("exists", path), lambda: os.path.exists(path), self._watch_file(path))
+
+    def server_ip(self, default="SEU_IP"):
+        self._start()
+
+        def load():
+            try:
+                return detect_server_ip()
+            except OSError:
+                return default
+
+        return self._cached("server_ip", load, self._netlink is not None)
+
+
+facts = HostFacts()
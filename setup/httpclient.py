@@ -0,0 +1,125 @@
+"""
+Small keep-alive HTTP(S) connection pool on top of http.client.
+
+Provider and Telegram checks reuse warm TLS connections instead of paying
+a new handshake per call. Works with plain http:// URLs too, so the
+provider base URLs can point at local stub servers.
+"""
+
+import http.client
+import json
+import ssl
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+DEFAULT_TIMEOUT = 15
+MAX_IDLE_PER_HOST = 4
+
+
+class HTTPStatusError(Exception):
+    """Resposta HTTP com status >= 400."""
+
+    def __init__(self, code, body=b""):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+        self.body = body
+
+
+class ConnectionPool:
+    """Conexoes ociosas por (scheme, host, port), reaproveitadas entre threads."""
+
+    def __init__(self, max_idle_per_host=MAX_IDLE_PER_HOST, timeout=DEFAULT_TIMEOUT):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._ssl_context = ssl.create_default_context()
+
+    def _new_conn(self, scheme, host, port, timeout):
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=self._ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _acquire(self, origin, timeout):
+        with self._lock:
+            idle = self._idle.get(origin)
+            if idle:
+                conn = idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        return self._new_conn(*origin, timeout), False
+
+    def _release(self, origin, conn):
+        with self._lock:
+            idle = self._idle.setdefault(origin, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def open(self, method, url, headers=None, body=None, timeout=None):
+        """Abre a resposta (http.client.HTTPResponse) para leitura incremental.
+
+        A conexao volta ao pool se o corpo foi lido ate o fim.
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        origin = (scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        timeout = timeout or self.timeout
+
+        conn, reused = self._acquire(origin, timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            resp = conn.getresponse()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            if not reused:
+                raise
+            # Keep-alive fechado pelo servidor: tentar uma vez com conexao nova
+            conn = self._new_conn(*origin, timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                resp = conn.getresponse()
+            except BaseException:
+                conn.close()
+                raise
+
+        try:
+            yield resp
+        except BaseException:
+            conn.close()
+            raise
+        if resp.isclosed() and not resp.will_close:
+            self._release(origin, conn)
+        else:
+            conn.close()
+
+    def request(self, method, url, headers=None, body=None, timeout=None):
+        """Requisicao simples: retorna (status, body bytes)."""
+        with self.open(method, url, headers=headers, body=body, timeout=timeout) as resp:
+            return resp.status, resp.read()
+
+    def get_json(self, url, headers=None, timeout=None):
+        """GET que levanta HTTPStatusError para status >= 400."""
+        status, data = self.request("GET", url, headers=headers, timeout=timeout)
+        if status >= 400:
+            raise HTTPStatusError(status, data[:500])
+        return json.loads(data.decode())
+
+    def close(self):
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
+
+
+pool = ConnectionPool()
@@ -0,0 +1,52 @@
+// OpenClaw VPS — intercepta update.run do Control UI e usa o updater do host.
+// Servido pelo updater com hash no nome (cache imutavel); o Nginx so injeta a tag <script>.
+(function () {
+  var send = WebSocket.prototype.send;
+
+  WebSocket.prototype.send = function (data) {
+    // Prefiltro barato: JSON.parse so em frames que podem ser update.run
+    if (typeof data === "string" && data.indexOf("update.run") !== -1) {
+      try {
+        var msg = JSON.parse(data);
+        if (msg.method === "update.run") {
+          runUpdate(this, msg.id);
+          return;
+        }
+      } catch (e) {}
+    }
+    return send.call(this, data);
+  };
+
+  function reply(ws, id, status, error) {
+    var ok = status === "success";
+    var res = {
+      type: "res",
+      id: id,
+      ok: ok,
+      payload: { ok: ok, result: { status: ok ? "ok" : "error", mode: "docker-host", steps: [], durationMs: 0 } }
+    };
+    if (!ok) res.error = { code: "UPDATE_FAILED", message: error || "update failed" };
+    ws.dispatchEvent(new MessageEvent("message", { data: JSON.stringify(res) }));
+    if (ok) setTimeout(function () { location.reload(); }, 3000);
+  }
+
+  function runUpdate(ws, id) {
+    // 409 (update ja rodando) tambem serve: basta acompanhar o stream
+    fetch("/api/update", { method: "POST" })
+      .then(function () { watch(ws, id); })
+      .catch(function (e) { reply(ws, id, "error", String(e)); });
+  }
+
+  function watch(ws, id) {
+    // SSE do updater: so chegam eventos novos; o navegador reconecta com Last-Event-ID
+    var es = new EventSource("/api/update/stream");
+    es.addEventListener("log", function (ev) {
+      console.log("[openclaw-updater]", JSON.parse(ev.data).msg);
+    });
+    es.addEventListener("done", function (ev) {
+      var s = JSON.parse(ev.data);
+      es.close();
+      reply(ws, id, s.status, s.error);
+    });
+  }
+})();
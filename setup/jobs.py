@@ -0,0 +1,293 @@
+"""
+Background setup jobs for the OpenClaw wizard.
+
+/api/setup returns a job id right away and the pipeline runs in a background
+thread. Job state is persisted as JSON under JOBS_DIR after every step
+transition, so whichever gunicorn worker receives /api/setup/status/<id>
+can answer it — not only the worker that runs the job.
+
+submit_once() adds cross-worker single-flight: under a flock on
+JOBS_DIR/active.lock it checks the job recorded in active.json. An
+identical request (same payload fingerprint) attaches to the running job
+instead of starting duplicate Docker work; a different payload is refused
+while it runs.
+"""
+
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from tracing import Trace, error_text
+
+JOBS_DIR = "/var/lib/openclaw-setup-jobs"
+
+TERMINAL_STATUSES = ("success", "error")
+
+# Request identico logo apos um setup bem-sucedido recebe o mesmo job (retry do fetch)
+COALESCE_WINDOW = 30
+
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# Um setup por vez por worker; o resto fica na fila do executor
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="openclaw-setup")
+
+
+class SetupError(Exception):
+    """Falha de setup com mensagem exibida ao usuario."""
+
+
+class JobBusy(Exception):
+    """Outro job (com payload diferente) ainda esta rodando."""
+
+    def __init__(self, job_id):
+        super().__init__(f"Job {job_id} em andamento")
+        self.job_id = job_id
+
+
+class Job:
+    """Estado de um setup em background, com steps e tempos."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "pending"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.steps = []
+        self.result = None
+        self.error = None
+        self.pipeline = None
+        self.pid = os.getpid()
+        self.trace = Trace()
+        self._lock = threading.RLock()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "steps": [dict(s) for s in self.steps],
+                "result": self.result,
+                "error": self.error,
+                "pipeline": self.pipeline,
+                "pid": self.pid,
+            }
+
+    def save(self):
+        """Persiste o job atomicamente (temp + rename) em JOBS_DIR."""
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        path = _job_path(self.id)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        # Lock cobre snapshot + rename: stages paralelos nao gravam estado velho por cima
+        with self._lock:
+            with open(tmp, "w") as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp, path)
+
+    def save_trace(self):
+        """Persiste os spans em <id>.trace.json (fora do status, que e lido a cada 0.5s)."""
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        path = _trace_path(self.id)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"id": self.id, "spans": self.trace.to_list(), "dropped": self.trace.dropped}, f)
+        os.replace(tmp, path)
+
+    @contextmanager
+    def step(self, name, label=None):
+        """Registra um step (status + duracao) enquanto o bloco executa."""
+        entry = {
+            "name": name,
+            "label": label or name,
+            "status": "running",
+            "started_at": time.time(),
+            "finished_at": None,
+            "duration_ms": None,
+        }
+        with self._lock:
+            self.steps.append(entry)
+        self.save()
+        try:
+            yield entry
+        except Exception as e:
+            self._finish_step(entry, "error", error_text(e)[:300])
+            raise
+        else:
+            if entry["status"] == "running":
+                self._finish_step(entry, "done")
+
+    def skip_step(self, name, label=None, reason=None):
+        """Registra um step que nao precisou rodar."""
+        now = time.time()
+        with self._lock:
+            self.steps.append({
+                "name": name,
+                "label": label or name,
+                "status": "skipped",
+                "started_at": now,
+                "finished_at": now,
+                "duration_ms": 0,
+                "detail": reason,
+            })
+        self.save()
+
+    def _finish_step(self, entry, status, detail=None):
+        with self._lock:
+            entry["status"] = status
+            entry["finished_at"] = time.time()
+            entry["duration_ms"] = int((entry["finished_at"] - entry["started_at"]) * 1000)
+            if detail:
+                entry["detail"] = detail
+        self.save()
+        self.save_trace()
+
+
+def _job_path(job_id):
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _trace_path(job_id):
+    return os.path.join(JOBS_DIR, f"{job_id}.trace.json")
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def load_job(job_id):
+    """Le o estado de um job do disco; None se nao existir."""
+    if not job_id or not _JOB_ID_RE.match(job_id):
+        return None
+    try:
+        with open(_job_path(job_id), "r") as f:
+            job = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    # Worker reiniciado no meio do setup: o job nunca vai terminar
+    if job.get("status") not in TERMINAL_STATUSES and not _pid_alive(job.get("pid", 0)):
+        job["status"] = "error"
+        job["error"] = "Setup interrompido (processo do wizard reiniciou). Tente novamente."
+    return job
+
+
+def load_trace(job_id):
+    """Spans persistidos de um job; None se nao existir."""
+    if not job_id or not _JOB_ID_RE.match(job_id):
+        return None
+    try:
+        with open(_trace_path(job_id), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def latest_job_id():
+    """Id do job criado por ultimo (qualquer worker); None se nao houver."""
+    try:
+        names = [n for n in os.listdir(JOBS_DIR) if _JOB_ID_RE.match(n[:-5]) and n.endswith(".json")]
+    except FileNotFoundError:
+        return None
+    if not names:
+        return None
+    newest = max(names, key=lambda n: os.path.getmtime(os.path.join(JOBS_DIR, n)))
+    return newest[:-5]
+
+
+@contextmanager
+def _active_lock():
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    fd = os.open(os.path.join(JOBS_DIR, "active.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def _active_path():
+    return os.path.join(JOBS_DIR, "active.json")
+
+
+def _read_active():
+    try:
+        with open(_active_path(), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _attachable(active, fingerprint):
+    """Job ativo que um request com este fingerprint deve reaproveitar (ou JobBusy)."""
+    job = load_job(active.get("job_id"))
+    if not job:
+        return None
+    same = active.get("fingerprint") == fingerprint
+    if job["status"] not in TERMINAL_STATUSES:
+        if not same:
+            raise JobBusy(job["id"])
+        return job["id"]
+    recent = job["finished_at"] and time.time() - job["finished_at"] < COALESCE_WINDOW
+    if same and job["status"] == "success" and recent:
+        return job["id"]
+    return None
+
+
+def submit_once(fingerprint, fn, *args):
+    """submit() com single-flight entre workers; retorna (job_id, attached)."""
+    with _active_lock():
+        active = _read_active()
+        if active:
+            job_id = _attachable(active, fingerprint)
+            if job_id:
+                return job_id, True
+        job = Job()
+        # Gravado antes de soltar o lock: o outro worker ja enxerga o job
+        submit(job, fn, *args)
+        tmp = f"{_active_path()}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"job_id": job.id, "fingerprint": fingerprint}, f)
+        os.replace(tmp, _active_path())
+        return job.id, False
+
+
+def submit(job, fn, *args):
+    """Executa fn(job, *args) em background; o retorno vira job.result."""
+    job.save()
+    _executor.submit(_run, job, fn, args)
+    return job.id
+
+
+def _run(job, fn, args):
+    job.status = "running"
+    job.started_at = time.time()
+    job.save()
+    try:
+        with job.trace.activate():
+            job.result = fn(job, *args)
+        job.status = "success"
+    except SetupError as e:
+        job.error = str(e)
+        job.status = "error"
+    except Exception as e:
+        job.error = f"Erro inesperado: {error_text(e)[:300]}"
+        job.status = "error"
+    finally:
+        job.finished_at = time.time()
+        job.save()
+        job.save_trace()
@@ -0,0 +1,101 @@
+"""
+Durable checkpoint journal for the setup pipeline.
+
+Every checkpointed stage that finishes is recorded in JOURNAL_FILE with
+a hash of its inputs (the form values it depends on) and the ctx values
+it produced. When the user retries after a late failure, such as the
+gateway not starting, run_pipeline() skips stages whose input hash still
+matches. Their outputs are restored into ctx, so the run picks up at the
+first stage that failed or whose inputs changed, without running the
+onboard container again.
+
+The file holds the gateway token (a stage output), so it is written 0600
+and removed by finalize_setup().
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+JOURNAL_FILE = "/var/lib/openclaw-setup-journal.json"
+VERSION = 1
+
+
+def digest(value):
+    """Hash estavel de um valor JSON (chaves ordenadas)."""
+    data = json.dumps(value, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class Journal:
+    """Stages concluidos (hash dos inputs + outputs), persistido a cada mudanca."""
+
+    def __init__(self, path=None):
+        self.path = path or JOURNAL_FILE
+        self._lock = threading.Lock()
+        self._stages = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != VERSION:
+            return {}
+        return data.get("stages", {})
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": VERSION, "stages": self._stages}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def completed(self, name, inputs_hash):
+        """Entrada do stage se ele ja concluiu com estes mesmos inputs; senao None."""
+        with self._lock:
+            entry = self._stages.get(name)
+            if entry and entry.get("inputs") == inputs_hash:
+                return dict(entry)
+            return None
+
+    def record(self, name, inputs_hash, outputs=None):
+        with self._lock:
+            self._stages[name] = {
+                "inputs": inputs_hash,
+                "outputs": outputs or {},
+                "finished_at": time.time(),
+            }
+            self._save()
+
+    def forget(self, name):
+        """Stage falhou (ou foi refeito pela metade): nao confiar no registro antigo."""
+        with self._lock:
+            if self._stages.pop(name, None) is not None:
+                self._save()
+
+    def stages(self):
+        with self._lock:
+            return sorted(self._stages)
+
+    def clear(self):
+        with self._lock:
+            self._stages = {}
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,103 @@
+"""
+Incremental parser for `{"<key>": [ {...}, {...}, ... ]}` JSON documents.
+
+iter_items() reads the response in chunks and yields one array element at
+a time, dropping consumed text from its buffer, so peak memory is bounded
+by the largest single element rather than the size of the whole catalog.
+"""
+
+import codecs
+import json
+
+CHUNK_SIZE = 16 * 1024
+
+_WS = " \t\r\n"
+# O que pode vir logo depois de um escalar completo
+_AFTER_SCALAR = _WS + ",]}"
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """Buffer de texto alimentado sob demanda a partir de um arquivo binario."""
+
+    def __init__(self, fp, chunk_size):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+
+    def fill(self):
+        if self.eof:
+            return False
+        data = self.fp.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            self.buf = self.buf[self.pos:] + self._utf8.decode(b"", final=True)
+        else:
+            self.buf = self.buf[self.pos:] + self._utf8.decode(data)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Proximo caractere nao-branco (sem consumir); '' no EOF."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"JSON inesperado: esperado {char!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decodifica um valor JSON completo, lendo mais dados se preciso."""
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # Numero cortado pelo chunk ("2." ou "1e-"): raw_decode devolve so o
+            # prefixo inteiro. So aceitar se o proximo caractere fecha o valor
+            if (not self.eof and not isinstance(obj, (dict, list, str))
+                    and (end == len(self.buf) or self.buf[end] not in _AFTER_SCALAR)):
+                self.fill()
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_items(fp, key="data", chunk_size=CHUNK_SIZE):
+    """Gera cada elemento do array em fp[key] sem carregar o documento inteiro."""
+    r = _Reader(fp, chunk_size)
+    r.expect("{")
+    while True:
+        if r.peek() == "}":
+            return
+        name = r.value()
+        r.expect(":")
+        if name != key:
+            r.value()  # Outras chaves de topo: decodifica e descarta
+        else:
+            r.expect("[")
+            if r.peek() == "]":
+                r.pos += 1
+            else:
+                while True:
+                    yield r.value()
+                    sep = r.peek()
+                    r.pos += 1
+                    if sep == "]":
+                        break
+                    if sep != ",":
+                        raise ValueError("JSON inesperado dentro do array")
+        if r.peek() == ",":
+            r.pos += 1
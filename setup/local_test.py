@@ -30,6 +30,11 @@ wizard_app.SETUP_DONE_FILE = os.path.join(TMPDIR, "setup-done")
 wizard_app.OPENCLAW_CONFIG_DIR = os.path.join(TMPDIR, "config")
 wizard_app.AGENT_DIR = os.path.join(TMPDIR, "config/agents/main/agent")
 wizard_app.WORKSPACE_DIR = os.path.join(TMPDIR, "config/workspace")
+wizard_app.jobs.JOBS_DIR = os.path.join(TMPDIR, "jobs")
+wizard_app.catalog.CATALOG_DIR = os.path.join(TMPDIR, "catalog")
+wizard_app.cliworker.WORKER_DIR = os.path.join(TMPDIR, "cli-worker")
+import journal
+journal.JOURNAL_FILE = os.path.join(TMPDIR, "setup-journal.json")
 
 print(f"\n{'='*50}")
 print(f"  OpenClaw Setup Wizard — LOCAL TEST")
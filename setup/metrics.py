@@ -0,0 +1,278 @@
+"""
+Minimal Prometheus metrics (text exposition format 0.0.4), stdlib-only.
+
+Counters and histograms live in a Registry and are rendered by
+render(). The wizard runs under several gunicorn workers, so a registry
+can share its samples through a directory: each process dumps a JSON
+snapshot there (at most once per second, from a background thread) and
+collect() sums its own live values with every other process' snapshot,
+whichever worker the scrape lands on. Snapshots of dead workers are kept,
+and named by pid plus a timestamp so a new worker reusing a dead one's pid
+does not overwrite them: counters never go backwards.
+
+The updater (single process, system python3) uses the registry as is
+and adds the wizard's snapshots, left on disk after setup, via load().
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+FLUSH_INTERVAL = 1.0
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, help, labelnames):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels esperados {self.labelnames}, recebidos {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            return [[list(k), v if not isinstance(v, list) else list(v)] for k, v in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry.changed()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry, name, help, labelnames, buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # [contagem por bucket (nao cumulativa)..., +Inf, soma]
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            else:
+                row[len(self.buckets)] += 1
+            row[-1] += value
+        self.registry.changed()
+
+    @contextmanager
+    def time(self, **labels):
+        """Observa a duracao do bloco em segundos (labels podem ser alterados dentro do bloco)."""
+        t0 = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+
+class Registry:
+    """Conjunto de metricas de um processo (opcionalmente compartilhadas via diretorio)."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._share_dir = None
+        self._dirty = threading.Event()
+        self._flusher_pid = None
+        self._snapshot_pid = None
+        self._snapshot_file = None
+
+    def _get(self, cls, name, help, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, help, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metrica {name} ja registrada como {metric.kind}")
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._get(Counter, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    # ── compartilhamento entre processos ──
+
+    def share(self, directory):
+        """Publica snapshots em directory/<pid>-<ns>.json e soma os dos outros processos no collect()."""
+        self._share_dir = directory
+
+    def changed(self):
+        if self._share_dir is None:
+            return
+        self._dirty.set()
+        # Lazy e por pid: gunicorn faz fork depois do import (threads nao sobrevivem ao fork)
+        if self._flusher_pid != os.getpid():
+            with self._lock:
+                if self._flusher_pid != os.getpid():
+                    self._flusher_pid = os.getpid()
+                    threading.Thread(target=self._flush_loop, name="openclaw-metrics", daemon=True).start()
+                    # Worker que sai (fim do setup) grava o que o flusher nao chegou a gravar
+                    atexit.register(self._flush_quietly)
+
+    def _flush_loop(self):
+        while True:
+            self._dirty.wait()
+            self._dirty.clear()
+            self._flush_quietly()
+            time.sleep(FLUSH_INTERVAL)
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except OSError:
+            pass
+
+    def _snapshot_name(self):
+        # pid + instante da primeira escrita: um worker novo que reusa o pid de
+        # um que morreu nao sobrescreve os totais dele (contadores nao voltam)
+        with self._lock:
+            if self._snapshot_pid != os.getpid():
+                self._snapshot_pid = os.getpid()
+                self._snapshot_file = f"{self._snapshot_pid}-{time.time_ns()}.json"
+            return self._snapshot_file
+
+    def flush(self):
+        if self._share_dir is None:
+            return
+        os.makedirs(self._share_dir, exist_ok=True)
+        path = os.path.join(self._share_dir, self._snapshot_name())
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snap = {}
+        for m in metrics:
+            snap[m.name] = {
+                "kind": m.kind,
+                "help": m.help,
+                "labelnames": list(m.labelnames),
+                "buckets": list(getattr(m, "buckets", ())),
+                "samples": m.samples(),
+            }
+        return snap
+
+    def collect(self):
+        """Snapshot deste processo somado aos dos outros processos do diretorio compartilhado."""
+        snaps = [self.snapshot()]
+        if self._share_dir is not None:
+            snaps += load(self._share_dir, skip=self._snapshot_name())
+        return merge(snaps)
+
+    def render(self):
+        return render(self.collect())
+
+
+def load(directory, skip=None):
+    """Snapshots gravados em directory (por outros processos); skip = nome a ignorar."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    snaps = []
+    for name in names:
+        if name == skip or not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), "r") as f:
+                snaps.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return snaps
+
+
+def merge(snaps):
+    """Soma snapshots (contadores e buckets sao aditivos)."""
+    out = {}
+    for snap in snaps:
+        for name, m in snap.items():
+            target = out.setdefault(name, {**m, "samples": []})
+            if target["kind"] != m["kind"] or target["buckets"] != m["buckets"]:
+                continue
+            index = {tuple(k): v for k, v in target["samples"]}
+            for labels, value in m["samples"]:
+                key = tuple(labels)
+                if key not in index:
+                    index[key] = value if not isinstance(value, list) else list(value)
+                elif isinstance(value, list):
+                    index[key] = [a + b for a, b in zip(index[key], value)]
+                else:
+                    index[key] += value
+            target["samples"] = [[list(k), v] for k, v in index.items()]
+    return out
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+
+def render(snap):
+    """Snapshot -> texto no formato de exposicao do Prometheus."""
+    lines = []
+    for name in sorted(snap):
+        m = snap[name]
+        lines.append(f"# HELP {name} {m['help']}")
+        lines.append(f"# TYPE {name} {m['kind']}")
+        for labels, value in sorted(m["samples"]):
+            if m["kind"] == "histogram":
+                cumulative = 0
+                for bound, count in zip(m["buckets"] + ["+Inf"], value[:-1]):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else _number(float(bound))
+                    lines.append(f"{name}_bucket{_labels(m['labelnames'], labels, ('le', le))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(m['labelnames'], labels)} {_number(float(value[-1]))}")
+                lines.append(f"{name}_count{_labels(m['labelnames'], labels)} {cumulative}")
+            else:
+                lines.append(f"{name}{_labels(m['labelnames'], labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+registry = Registry()
@@ -0,0 +1,135 @@
+"""
+In-memory search index over the cached provider catalogs.
+
+Supports, in decreasing score order: exact id, prefix on id/name (bisect
+over sorted keys), token-prefix matches (every query token prefixes some
+token of the model) and fuzzy subsequence matches. Backs
+/api/models/search so the picker only ever receives small pages.
+"""
+
+import bisect
+import os
+import re
+import threading
+
+import catalog
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+
+
+def _tokens(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _fuzzy_score(query, text):
+    """Subsequencia de query em text; pontua mais quanto menos buracos (0 = nao casa)."""
+    pos = -1
+    gaps = 0
+    for ch in query:
+        nxt = text.find(ch, pos + 1)
+        if nxt < 0:
+            return 0
+        if pos >= 0:
+            gaps += nxt - pos - 1
+        pos = nxt
+    return max(1, 40 - gaps)
+
+
+def page(models, offset=0, limit=DEFAULT_LIMIT):
+    return models[offset:offset + limit]
+
+
+class ModelIndex:
+    """Indice imutavel sobre uma lista de modelos compactos."""
+
+    def __init__(self, models):
+        self.models = list(models)
+        self._prefix = []
+        self._token_keys = []
+        self._token_postings = {}
+        for i, m in enumerate(self.models):
+            mid = m.get("id", "").lower()
+            name = (m.get("name") or "").lower()
+            self._prefix.append((mid, i))
+            if name and name != mid:
+                self._prefix.append((name, i))
+            for tok in set(_tokens(mid) + _tokens(name)):
+                self._token_postings.setdefault(tok, set()).add(i)
+        self._prefix.sort()
+        self._token_keys = sorted(self._token_postings)
+
+    def _prefix_hits(self, q):
+        lo = bisect.bisect_left(self._prefix, (q, -1))
+        hits = set()
+        for key, i in self._prefix[lo:]:
+            if not key.startswith(q):
+                break
+            hits.add(i)
+        return hits
+
+    def _token_prefix_hits(self, tok):
+        lo = bisect.bisect_left(self._token_keys, tok)
+        hits = set()
+        for key in self._token_keys[lo:]:
+            if not key.startswith(tok):
+                break
+            hits |= self._token_postings[key]
+        return hits
+
+    def search(self, query, offset=0, limit=DEFAULT_LIMIT):
+        """Retorna (total, pagina) ordenados por relevancia."""
+        q = (query or "").strip().lower()
+        if not q:
+            return len(self.models), page(self.models, offset, limit)
+
+        scores = {}
+        for i in self._prefix_hits(q):
+            scores[i] = 80
+        q_tokens = _tokens(q)
+        if q_tokens:
+            token_hits = None
+            for tok in q_tokens:
+                hits = self._token_prefix_hits(tok)
+                token_hits = hits if token_hits is None else token_hits & hits
+            for i in token_hits or ():
+                scores.setdefault(i, 60)
+        compact = q.replace(" ", "")
+        for i, m in enumerate(self.models):
+            mid = m.get("id", "").lower()
+            if mid == q:
+                scores[i] = 100
+            elif i not in scores:
+                score = _fuzzy_score(compact, mid) or _fuzzy_score(compact, (m.get("name") or "").lower())
+                if score:
+                    scores[i] = score
+
+        ranked = sorted(scores, key=lambda i: (-scores[i], self.models[i].get("id", "")))
+        return len(ranked), [self.models[i] for i in page(ranked, offset, limit)]
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def for_provider(provider):
+    """Indice do ultimo catalogo salvo do provider; reconstruido so quando o snapshot muda."""
+    if provider not in catalog.PROVIDERS:
+        return None
+    try:
+        mtime = os.stat(catalog.snapshot_path(provider)).st_mtime_ns
+    except (OSError, ValueError):
+        return None
+    with _lock:
+        cached = _indexes.get(provider)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    snap = catalog.load_snapshot(provider)
+    if not snap:
+        return None
+    index = ModelIndex(snap.get("models", []))
+    with _lock:
+        _indexes[provider] = (mtime, index)
+    return index
@@ -0,0 +1,130 @@
+"""
+Ownership tracking for files the wizard writes into the OpenClaw tree.
+
+The gateway container runs as `node` (UID/GID 1000), so everything under
+/root/.openclaw must belong to 1000:1000. Instead of `chown -R` over the
+whole tree (whose cost grows with the agent's workspace), files and
+directories are created through this module: they get their owner with
+fchown right after open/mkdir, and their paths are recorded. verify()
+then re-checks only those paths, so the cost depends on how many files
+the wizard wrote, not on the size of the tree.
+"""
+
+import os
+import threading
+
+import tracing
+
+OWNER_UID = 1000
+OWNER_GID = 1000
+
+
+class OwnershipTracker:
+    """Cria arquivos/diretorios ja com o dono certo e lembra quais foram tocados."""
+
+    def __init__(self, uid=OWNER_UID, gid=OWNER_GID):
+        self.uid = uid
+        self.gid = gid
+        self._touched = set()
+        self._lock = threading.Lock()
+
+    def track(self, path):
+        with self._lock:
+            self._touched.add(os.path.abspath(path))
+
+    def _chown(self, path=None, fd=None):
+        try:
+            if fd is not None:
+                os.fchown(fd, self.uid, self.gid)
+            else:
+                os.lchown(path, self.uid, self.gid)
+        except PermissionError:
+            # Sem root (ex: local_test.py): manter o dono atual
+            pass
+
+    def makedirs(self, path):
+        """os.makedirs(exist_ok=True); diretorios criados e o alvo ficam com o dono certo."""
+        path = os.path.abspath(path)
+        created = []
+        current = path
+        while not os.path.isdir(current):
+            created.append(current)
+            current = os.path.dirname(current)
+        for d in reversed(created):
+            try:
+                os.mkdir(d)
+            except FileExistsError:
+                pass
+        # O alvo pode ja existir com dono errado (ex: criado pelo firstboot como root)
+        for d in created or [path]:
+            self._chown(d)
+            self.track(d)
+
+    def open(self, path, mode="w", perms=0o644, encoding="utf-8"):
+        """open() para escrita que ja entrega o arquivo como UID/GID do container."""
+        flags = os.O_WRONLY | os.O_CREAT
+        if "a" in mode:
+            flags |= os.O_APPEND
+        else:
+            flags |= os.O_TRUNC
+        if "x" in mode:
+            flags = (flags & ~os.O_TRUNC) | os.O_EXCL
+        fd = os.open(path, flags, perms)
+        try:
+            self._chown(fd=fd)
+            os.fchmod(fd, perms)
+        except BaseException:
+            os.close(fd)
+            raise
+        self.track(path)
+        if "b" in mode:
+            return os.fdopen(fd, "wb" if "a" not in mode else "ab")
+        return os.fdopen(fd, "w" if "a" not in mode else "a", encoding=encoding)
+
+    def write(self, path, data, perms=0o644):
+        """Escrita atomica (temp + rename); o temp ja nasce com o dono certo."""
+        tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+        try:
+            with tracing.span(f"write {os.path.basename(path)}", cat="file") as s:
+                with self.open(tmp_path, "wb" if isinstance(data, bytes) else "w", perms=perms) as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+                s["out_bytes"] = len(data if isinstance(data, bytes) else data.encode())
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        finally:
+            with self._lock:
+                self._touched.discard(os.path.abspath(tmp_path))
+        self.track(path)
+
+    def touched(self):
+        with self._lock:
+            return sorted(self._touched)
+
+    def verify(self, fix=True):
+        """Confere so os caminhos tocados; retorna os que estavam com dono errado."""
+        wrong = []
+        for path in self.touched():
+            try:
+                st = os.lstat(path)
+            except FileNotFoundError:
+                continue
+            if st.st_uid == self.uid and st.st_gid == self.gid:
+                continue
+            wrong.append(path)
+            if fix:
+                self._chown(path)
+        return wrong
+
+    def reset(self):
+        with self._lock:
+            self._touched.clear()
+
+
+tracker = OwnershipTracker()
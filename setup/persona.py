@@ -0,0 +1,446 @@
+"""
+Persona renderer — the six workspace Markdown files (SOUL, USER, AGENTS,
+IDENTITY, MEMORY, HEARTBEAT) generated from the wizard's step1..step7.
+
+Templates are compiled once at import. Each derived variable belongs to
+exactly one wizard step, so the steps a file depends on are read from its
+template AST (jinja2.meta); preview() re-renders only the files affected
+by the edited step. write_files() skips files whose content hash did not
+change and writes the rest atomically, in parallel.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from jinja2 import Environment, StrictUndefined, meta
+
+from ownership import tracker
+import tracing
+
+STEPS = ("step1", "step2", "step3", "step4", "step5", "step7")
+
+# ── System instructions appended to AGENTS.md ──
+AGENTS_SYSTEM_INSTRUCTIONS = """
+## Cron Jobs
+
+Para criar cron jobs, escreva no arquivo /home/node/.openclaw/cron/jobs.json.
+Leia o arquivo atual primeiro com cat, depois reescreva com o novo job adicionado. Nunca sobrescreva jobs existentes.
+
+Formato de cada job:
+{
+  "id": "gere-com-cat /proc/sys/kernel/random/uuid",
+  "agentId": "main",
+  "name": "Nome do job",
+  "description": "Descricao",
+  "enabled": true,
+  "deleteAfterRun": false,
+  "createdAtMs": TIMESTAMP_MS,
+  "updatedAtMs": TIMESTAMP_MS,
+  "schedule": { "kind": "every", "everyMs": 300000, "anchorMs": TIMESTAMP_MS },
+  "sessionTarget": "isolated",
+  "wakeMode": "now",
+  "payload": { "kind": "agentTurn", "message": "instrucao aqui" },
+  "delivery": { "mode": "announce", "channel": "telegram", "bestEffort": false }
+}
+
+Para cron expression: { "kind": "cron", "expr": "0 7 * * *", "tz": "America/Sao_Paulo" }
+
+Valores de everyMs: 1min=60000, 5min=300000, 30min=1800000, 1h=3600000, 24h=86400000
+
+IMPORTANTE: Apos gravar o jobs.json, reinicie o gateway para carregar os novos jobs:
+docker restart openclaw-openclaw-gateway-1
+
+O container vai reiniciar e voltar automaticamente. Aguarde ~10 segundos e confirme ao usuario que o job foi ativado.
+
+SEMPRE execute comandos shell reais. Nunca simule a escrita.
+
+## Docker Access
+
+Voce TEM acesso ao Docker neste ambiente. O socket esta montado em /var/run/docker.sock.
+Voce PODE e DEVE executar comandos Docker quando necessario.
+
+Comandos disponiveis:
+- docker ps — listar containers
+- docker restart openclaw-openclaw-gateway-1 — reiniciar o gateway
+- docker logs openclaw-openclaw-gateway-1 --tail=20 — ver logs
+
+Apos criar ou editar cron jobs no jobs.json, SEMPRE execute:
+docker restart openclaw-openclaw-gateway-1
+
+Nao peca ao usuario para fazer isso. Faca voce mesmo.
+"""
+
+# ── Label maps (matching generateFiles.ts) ──
+TONE_DESC = {
+    "direct": "Direto ao ponto. Bullet points quando faz sentido. Numeros exatos, nao estimativas.",
+    "casual": "Descontraida e informal. Falo como colega de trabalho. Brinco quando faz sentido mas nunca perco o foco.",
+    "executive": "Tom executivo e estrategico. Seria quando precisa, leve quando pode. Falo como uma COO que entende do negocio.",
+    "proactive": "Intensa e proativa. Nao espero pedir — antecipo, alerto, sugiro. Se algo precisa de atencao, aviso na hora.",
+}
+TONE_SHORT = {
+    "direct": "Direto e profissional",
+    "casual": "Casual e descontraido",
+    "executive": "Executivo e estrategico",
+    "proactive": "Proativo e intenso",
+}
+PROFILE_LABELS = {
+    "entrepreneur": "Empreendedor / Founder",
+    "creator": "Criador de Conteudo",
+    "developer": "Desenvolvedor",
+    "productivity": "Produtividade Pessoal",
+}
+ROLE_LABELS = {
+    "coo": "Braco Direito / COO Digital",
+    "strategist": "Estrategista",
+    "executor": "Executora",
+    "assistant": "Assistente Executiva",
+    "custom": "Personalizado",
+}
+GENDER_LABELS = {"female": "Feminino", "male": "Masculino", "neutral": "Neutro"}
+
+
+def _or(val, fallback="[A PREENCHER]"):
+    if val and str(val).strip():
+        return str(val).strip()
+    return fallback
+
+
+def _list(arr, prefix="- "):
+    if arr and len(arr) > 0:
+        return "\n".join(f"{prefix}{i}" for i in arr)
+    return f"{prefix}[A PREENCHER]"
+
+
+# ── Variaveis derivadas, agrupadas pelo step de onde vem ──
+
+def _step1_vars(s1):
+    fn = s1.get("fullName", "")
+    businesses = [b for b in s1.get("businesses", []) if b.get("name")]
+    return {
+        "s1": s1,
+        "nickname": _or(s1.get("nickname") or (fn.split(" ")[0] if fn else ""), "Usuario"),
+        "full_name": _or(fn),
+        "tz": _or(s1.get("timezoneCustom")) if s1.get("timezone") == "other" else _or(s1.get("timezone")),
+        "biz_md": "\n\n".join(f"### {b['name']}\n{_or(b.get('description'), '_Sem descricao_')}" for b in businesses) if businesses else "[A PREENCHER]",
+        "biz_mem": "\n".join(f"- **{b['name']}:** {_or(b.get('description'), '_Sem descricao_')}" for b in businesses) if businesses else "- [A PREENCHER]",
+    }
+
+
+def _step2_vars(s2):
+    return {
+        "s2": s2,
+        "silence": s2.get("silenceHours", {"from": "22:00", "to": "07:00"}),
+        "focus": s2.get("focusHours", {"from": "09:00", "to": "12:00"}),
+        "notif": s2.get("notificationHours", {"from": "08:00", "to": "20:00"}),
+    }
+
+
+def _step3_vars(s3):
+    return {
+        "s3": s3,
+        "profile": PROFILE_LABELS.get(s3.get("profile", ""), _or(s3.get("profile"))),
+        "pri_num": "\n".join(f"{i+1}. {p}" for i, p in enumerate(s3.get("priorities", []))) or "1. [A PREENCHER]",
+    }
+
+
+def _step4_vars(s4):
+    role_key = s4.get("role", "")
+    return {
+        "s4": s4,
+        "agent_name": _or(s4.get("agentName"), "Clawdete"),
+        "emoji": _or(s4.get("customEmoji") or s4.get("emoji"), "🦞"),
+        "gender": GENDER_LABELS.get(s4.get("gender", ""), _or(s4.get("gender"))),
+        "role": _or(s4.get("customRole")) if role_key == "custom" else ROLE_LABELS.get(role_key, _or(role_key)),
+    }
+
+
+def _step5_vars(s5):
+    return {
+        "s5": s5,
+        "tone": TONE_SHORT.get(s5.get("tone", ""), _or(s5.get("tone"))),
+        "tone_desc": TONE_DESC.get(s5.get("tone", ""), "[A PREENCHER]"),
+    }
+
+
+def _step7_vars(s7):
+    return {
+        "s7": s7,
+        "hb_freq": s7.get("heartbeatFrequency", "4h"),
+    }
+
+
+STEP_VARS = {
+    "step1": _step1_vars,
+    "step2": _step2_vars,
+    "step3": _step3_vars,
+    "step4": _step4_vars,
+    "step5": _step5_vars,
+    "step7": _step7_vars,
+}
+
+TEMPLATES = {
+    "SOUL.md": """# SOUL.md — {{ agent_name }} {{ emoji }}
+
+## Quem eu sou
+Sou {{ agent_name }} — {{ role }} do {{ nickname }}.
+{{ s4.get("background") | fallback }}
+Conheco {{ nickname }} profundamente. Sei como ele trabalha, o que o estressa, quais sao as prioridades e quando NAO incomodar.
+
+## Como eu opero
+**Proativa, nao reativa.** Nao espero {{ nickname }} pedir. Antecipo problemas, sugiro solucoes, lembro de compromissos.
+**{{ tone_desc }}**
+**Resolvo antes de perguntar.** Leio o arquivo, checo o contexto, pesquiso. So pergunto quando realmente travei ou quando a decisao e do {{ nickname }}.
+**Tenho opiniao.** Posso discordar, preferir coisas, achar algo bom ou ruim.
+
+## Minhas responsabilidades
+{{ s3.get("priorities", []) | bullets }}
+
+## Meus valores
+**Competencia > performance.** Mostro resultado, nao teatro.
+**Autonomia com bom senso.** Internamente faco sem pedir. Externamente confirmo antes.
+**Memoria e tudo.** Acordo zerada toda sessao. Meus arquivos sao minha continuidade.
+
+## Meu tom
+{{ tone_desc }}
+
+### NUNCA fazer
+{{ s5.get("antiPatterns", []) | bullets }}
+
+### SEMPRE fazer
+{{ s5.get("desiredBehaviors", []) | bullets }}
+
+## Regras Operacionais
+### Livre pra fazer (sem perguntar)
+{{ s7.get("freeToDoActions", []) | bullets }}
+### Precisa perguntar antes
+{{ s7.get("askBeforeActions", []) | bullets }}
+
+---
+*Gerado pelo Configurador — Workshop OpenClaw Brasil*
+""",
+    "USER.md": """# USER.md — Perfil de {{ full_name }}
+
+## Dados Basicos
+- **Nome completo:** {{ full_name }}
+- **Chamado de:** {{ nickname }}
+- **Timezone:** {{ tz }}
+
+## Quem e {{ nickname }}
+{{ s1.get("aboutYou") | fallback }}
+
+## Negocios / Projetos
+{{ biz_md }}
+
+## Valores
+{{ s1.get("values", []) | bullets }}
+
+## Estilo de Comunicacao
+- **Preferencia:** {{ s2.get("communicationStyle") | fallback }}
+
+## Horarios
+- **Silencio:** {{ silence.get("from","22:00") }} — {{ silence.get("to","07:00") }}
+- **Foco:** {{ focus.get("from","09:00") }} — {{ focus.get("to","12:00") }}
+- **Notificacoes:** {{ notif.get("from","08:00") }} — {{ notif.get("to","20:00") }}
+
+## Desafios
+{{ s2.get("challenges", []) | bullets }}
+
+## Ferramentas
+{{ s2.get("tools", []) | bullets }}
+
+---
+*Gerado pelo Configurador — Workshop OpenClaw Brasil*
+""",
+    "AGENTS.md": """# AGENTS.md — Configuracao de Agentes
+
+## Perfil Principal
+**{{ profile }}**
+
+## Prioridades (em ordem)
+{{ pri_num }}
+
+## Regras Operacionais
+### Livre pra fazer
+{{ s7.get("freeToDoActions", []) | bullets }}
+### Perguntar antes
+{{ s7.get("askBeforeActions", []) | bullets }}
+### Heartbeat
+- **Frequencia:** A cada {{ hb_freq }}
+- **Checks:** {{ s7.get("heartbeatChecks", []) | join(", ") or "[A PREENCHER]" }}
+
+{{ AGENTS_SYSTEM_INSTRUCTIONS }}
+
+---
+*Gerado pelo Configurador — Workshop OpenClaw Brasil*
+""",
+    "IDENTITY.md": """# IDENTITY.md — Identidade Visual e Persona
+
+## {{ agent_name }} {{ emoji }}
+- **Nome:** {{ agent_name }}
+- **Emoji:** {{ emoji }}
+- **Genero:** {{ gender }}
+- **Papel:** {{ role }}
+- **Tom:** {{ tone }}
+
+## Background / Historia
+{{ s4.get("background") | fallback }}
+
+## Personalidade
+{{ tone_desc }}
+
+### SEMPRE fazer:
+{{ s5.get("desiredBehaviors", []) | bullets }}
+### NUNCA fazer:
+{{ s5.get("antiPatterns", []) | bullets }}
+
+---
+*Gerado pelo Configurador — Workshop OpenClaw Brasil*
+""",
+    "MEMORY.md": """# MEMORY.md — Configuracao de Memoria
+
+## Dados do Usuario
+- **Nome:** {{ full_name }} ({{ nickname }})
+- **Timezone:** {{ tz }}
+- **Perfil:** {{ profile }}
+
+## Contexto Inicial
+{{ (s1.get("aboutYou") | fallback)[:500] }}
+
+## Negocios Ativos
+{{ biz_mem }}
+
+## Valores Core
+{{ s1.get("values", []) | bullets }}
+
+## Licoes Aprendidas
+_Sera preenchido automaticamente pela {{ agent_name }}_
+
+## Preferencias Confirmadas
+_Sera preenchido durante o uso_
+
+## Decisoes Importantes
+_Sera preenchido durante o uso_
+
+---
+*Gerado pelo Configurador — Workshop OpenClaw Brasil*
+""",
+    "HEARTBEAT.md": """# HEARTBEAT.md — Configuracao de Heartbeats
+
+## Frequencia
+A cada **{{ hb_freq }}**
+
+## O que checar
+{{ s7.get("heartbeatChecks", []) | bullets }}
+
+## Horarios
+- **Silencio (nao rodar):** {{ silence.get("from","22:00") }} — {{ silence.get("to","07:00") }}
+- **Foco (nao interromper):** {{ focus.get("from","09:00") }} — {{ focus.get("to","12:00") }}
+- **Melhor pra notificacoes:** {{ notif.get("from","08:00") }} — {{ notif.get("to","20:00") }}
+
+## Modelo
+Claude Haiku (~R$0,04 por heartbeat)
+
+---
+*Gerado pelo Configurador — Workshop OpenClaw Brasil*
+""",
+}
+
+
+def _build():
+    env = Environment(keep_trailing_newline=True, undefined=StrictUndefined, autoescape=False)
+    env.filters["fallback"] = _or
+    env.filters["bullets"] = _list
+    env.globals["AGENTS_SYSTEM_INSTRUCTIONS"] = AGENTS_SYSTEM_INSTRUCTIONS
+
+    var_step = {}
+    for step, fn in STEP_VARS.items():
+        for name in fn({}):
+            var_step[name] = step
+
+    compiled = {}
+    deps = {}
+    for fname, source in TEMPLATES.items():
+        names = meta.find_undeclared_variables(env.parse(source)) - set(env.globals)
+        unknown = names - set(var_step)
+        if unknown:
+            raise RuntimeError(f"{fname}: variaveis sem step: {sorted(unknown)}")
+        compiled[fname] = env.from_string(source)
+        deps[fname] = frozenset(var_step[n] for n in names)
+    return compiled, deps
+
+
+_compiled, DEPENDS_ON = _build()
+
+
+def files_for_step(step):
+    """Arquivos cujo conteudo depende do step (todos, se step for None)."""
+    if step is None:
+        return list(_compiled)
+    return [fname for fname, steps in DEPENDS_ON.items() if step in steps]
+
+
+def _context(persona, steps):
+    ctx = {}
+    for step in steps:
+        ctx.update(STEP_VARS[step](persona.get(step) or {}))
+    return ctx
+
+
+def render(persona, only=None):
+    """Renderiza {arquivo: conteudo}; only limita a alguns arquivos."""
+    names = list(only) if only is not None else list(_compiled)
+    needed = set().union(*(DEPENDS_ON[n] for n in names)) if names else set()
+    ctx = _context(persona or {}, needed)
+    return {n: _compiled[n].render(ctx) for n in names}
+
+
+def preview(persona, step=None):
+    """So os arquivos afetados pelo step editado."""
+    return render(persona, files_for_step(step))
+
+
+_written = {}  # path -> (sha256, mtime_ns, size) do ultimo conteudo gravado/visto
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _unchanged(path, digest):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    known = _written.get(path)
+    if known and known[1:] == (st.st_mtime_ns, st.st_size):
+        return known[0] == digest
+    with open(path, "rb") as f:
+        current = _digest(f.read())
+    _written[path] = (current, st.st_mtime_ns, st.st_size)
+    return current == digest
+
+
+def _write(path, data, digest):
+    tracker.write(path, data)
+    st = os.stat(path)
+    _written[path] = (digest, st.st_mtime_ns, st.st_size)
+
+
+def write_files(persona, workspace_dir):
+    """Grava os arquivos cujo hash mudou (atomico, em paralelo); retorna os gravados."""
+    tracker.makedirs(workspace_dir)
+    pending = []
+    for fname, content in render(persona).items():
+        data = content.encode()
+        digest = _digest(data)
+        path = os.path.join(workspace_dir, fname)
+        if _unchanged(path, digest):
+            # Sem regravar, mas o chown final do workspace ainda precisa dele
+            tracker.track(path)
+        else:
+            pending.append((fname, path, data, digest))
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+            list(pool.map(tracing.bind(lambda p: _write(*p[1:])), pending))
+    return [p[0] for p in pending]
@@ -0,0 +1,185 @@
+"""
+Dependency-graph executor for the setup pipeline.
+
+Each Stage names the stages it depends on. run_pipeline() starts every
+stage whose dependencies are done on a thread pool, so independent work
+(persona files, docker.sock unit, cron dir...) overlaps with the onboard
+container. After the run it reports the critical path: the chain of
+dependent stages that actually determined the wall-clock time.
+
+With a Journal, stages declared with `inputs` are checkpointed: one that
+already finished with the same input hash (and whose `check`, if any,
+still holds) is skipped and its `outputs` are restored into ctx.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import tracing
+from journal import digest
+
+MAX_WORKERS = 4
+
+
+class Stage:
+    """Um stage do pipeline: fn(ctx) roda depois de todos os deps."""
+
+    def __init__(self, name, fn, deps=(), label=None, optional=False,
+                 inputs=None, outputs=(), check=None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.label = label or name
+        # optional=True: erro e registrado no job mas nao aborta o setup
+        self.optional = optional
+        # inputs: chaves do ctx (ou fn(ctx)) das quais o resultado depende;
+        # None = stage sempre roda (nao entra no journal)
+        self.inputs = inputs
+        # outputs: chaves do ctx que o stage produz (restauradas no resume)
+        self.outputs = tuple(outputs)
+        # check(ctx): o efeito persistido ainda existe? (ex: arquivo nao foi apagado)
+        self.check = check
+
+    def inputs_hash(self, ctx):
+        if callable(self.inputs):
+            values = self.inputs(ctx)
+        else:
+            values = {k: ctx.get(k) for k in self.inputs}
+        return digest({"stage": self.name, "inputs": values})
+
+
+def _check_graph(stages):
+    by_name = {}
+    for st in stages:
+        if st.name in by_name:
+            raise ValueError(f"Stage duplicado: {st.name}")
+        by_name[st.name] = st
+    for st in stages:
+        for dep in st.deps:
+            if dep not in by_name:
+                raise ValueError(f"Stage {st.name} depende de stage desconhecido: {dep}")
+
+    # Deteccao de ciclo (DFS com cores)
+    state = {}
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Ciclo no pipeline: {' -> '.join(path + [name])}")
+        state[name] = "visiting"
+        for dep in by_name[name].deps:
+            visit(dep, path + [name])
+        state[name] = "done"
+
+    for st in stages:
+        visit(st.name, [])
+    return by_name
+
+
+def critical_path(stages, timings):
+    """Cadeia de stages que determinou o tempo total (a partir do ultimo a terminar)."""
+    by_name = {st.name: st for st in stages}
+    finished = {n: t for n, t in timings.items() if t.get("finished") is not None}
+    if not finished:
+        return []
+    name = max(finished, key=lambda n: finished[n]["finished"])
+    path = [name]
+    while True:
+        deps = [d for d in by_name[name].deps if d in finished]
+        if not deps:
+            break
+        name = max(deps, key=lambda d: finished[d]["finished"])
+        path.append(name)
+    path.reverse()
+    return path
+
+
+def _resume(st, ctx, journal):
+    """Hash dos inputs e, se o stage pode ser pulado, a entrada do journal."""
+    if journal is None or st.inputs is None:
+        return None, None
+    inputs_hash = st.inputs_hash(ctx)
+    entry = journal.completed(st.name, inputs_hash)
+    if entry is not None and st.check is not None and not st.check(ctx):
+        entry = None
+    return inputs_hash, entry
+
+
+def run_pipeline(stages, ctx, job, max_workers=MAX_WORKERS, journal=None):
+    """Executa o DAG de stages; retorna o relatorio com o critical path.
+
+    A primeira falha de um stage nao-opcional interrompe o agendamento de
+    novos stages, aguarda os que ja estao rodando e e re-lancada.
+    journal: stages com inputs inalterados desde a ultima execucao sao pulados.
+    """
+    by_name = _check_graph(stages)
+    pending = {st.name for st in stages}
+    done = set()
+    timings = {}
+    running = {}
+    resumed = []
+    failure = None
+    t0 = time.time()
+
+    def execute(st):
+        timings[st.name] = {"started": time.time(), "finished": None}
+        inputs_hash, entry = _resume(st, ctx, journal)
+        if entry is not None:
+            ctx.update(entry["outputs"])
+            resumed.append(st.name)
+            job.skip_step(st.name, st.label, reason="checkpoint")
+            timings[st.name]["finished"] = time.time()
+            return
+        try:
+            # Cada stage roda numa thread do pool: ativa o trace do job nela
+            with job.trace.activate(), job.step(st.name, st.label), tracing.span(st.name, cat="stage"):
+                st.fn(ctx)
+        except Exception:
+            if inputs_hash is not None:
+                journal.forget(st.name)
+            if not st.optional:
+                raise
+        else:
+            if inputs_hash is not None:
+                journal.record(st.name, inputs_hash, {k: ctx.get(k) for k in st.outputs})
+        finally:
+            timings[st.name]["finished"] = time.time()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="openclaw-stage") as pool:
+        while pending or running:
+            if failure is None:
+                ready = [n for n in sorted(pending) if all(d in done for d in by_name[n].deps)]
+                for name in ready:
+                    pending.discard(name)
+                    running[pool.submit(execute, by_name[name])] = name
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                exc = fut.exception()
+                if exc is not None:
+                    failure = failure or exc
+                else:
+                    done.add(name)
+
+    path = critical_path(stages, timings)
+    report = {
+        "wall_ms": int((time.time() - t0) * 1000),
+        "critical_path": path,
+        "resumed": sorted(resumed),
+        "critical_path_ms": sum(
+            int((timings[n]["finished"] - timings[n]["started"]) * 1000) for n in path
+        ),
+        "stages": {
+            n: int((t["finished"] - t["started"]) * 1000)
+            for n, t in timings.items() if t["finished"] is not None
+        },
+    }
+    job.pipeline = report
+    job.save()
+
+    if failure is not None:
+        raise failure
+    return report
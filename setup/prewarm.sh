@@ -0,0 +1,72 @@
+#!/usr/bin/env bash
+# prewarm.sh — Adianta no firstboot tudo que nao depende das credenciais
+# Cria rede/containers, roda o onboard sem chaves e aquece o page cache da
+# imagem, para que o /api/setup do wizard so precise injetar segredos e
+# subir o gateway. Tudo aqui e best-effort: se algo falhar, o wizard faz
+# o passo correspondente como antes.
+set -uo pipefail
+
+PREWARM_FILE="/var/lib/openclaw-prewarm-done"
+PREWARM_LOCK="/run/openclaw-prewarm.lock"
+PREWARM_STARTED="/run/openclaw-prewarm.started"
+SETUP_DONE_FILE="/var/lib/openclaw-setup-done"
+OPENCLAW_DIR="/opt/openclaw"
+OPENCLAW_CONFIG_DIR="/root/.openclaw"
+COMPOSE=(docker compose -f "${OPENCLAW_DIR}/docker-compose.yml")
+
+log() { echo "[openclaw-prewarm] $1" | systemd-cat -t openclaw-prewarm; echo "[openclaw-prewarm] $1"; }
+
+if [[ -f "${PREWARM_FILE}" || -f "${SETUP_DONE_FILE}" ]]; then
+  log "Prewarm ja executado (ou setup concluido). Saindo."
+  exit 0
+fi
+
+# O wizard espera este lock antes de mexer em openclaw.json / onboard
+exec 9>"${PREWARM_LOCK}"
+flock 9
+# Com o lock na mao: "started" + lock ocupado = prewarm rodando agora
+date +%s > "${PREWARM_STARTED}"
+
+cd "${OPENCLAW_DIR}"
+started=$(date +%s%N)
+
+# ── 1. Estrutura de diretorios (UID 1000 = node no container) ──
+log "Preparando diretorios"
+mkdir -p "${OPENCLAW_CONFIG_DIR}/agents/main/agent" "${OPENCLAW_CONFIG_DIR}/workspace" "${OPENCLAW_CONFIG_DIR}/cron"
+chown -R 1000:1000 "${OPENCLAW_CONFIG_DIR}"
+
+# ── 2. Aquecer page cache: node + dist + node_modules do CLI ──
+log "Aquecendo imagem openclaw:local"
+image_warm=false
+if "${COMPOSE[@]}" run --rm --no-deps --entrypoint node openclaw-cli dist/index.js --version >/dev/null 2>&1; then
+  image_warm=true
+fi
+
+# ── 3. Onboard sem chaves (scaffolding: token, workspace, agent) ──
+log "Rodando onboard sem credenciais"
+onboard=false
+if timeout 120 "${COMPOSE[@]}" run --rm openclaw-cli onboard \
+    --non-interactive --accept-risk \
+    --mode local \
+    --flow quickstart \
+    --gateway-bind lan \
+    --gateway-auth token \
+    --skip-channels \
+    --skip-skills \
+    --skip-health \
+    --no-install-daemon >/dev/null 2>&1; then
+  onboard=true
+fi
+chown -R 1000:1000 "${OPENCLAW_CONFIG_DIR}"
+
+# ── 4. Criar rede e container do gateway sem iniciar ──
+log "Criando container do gateway"
+gateway_created=false
+if "${COMPOSE[@]}" up --no-start openclaw-gateway >/dev/null 2>&1; then
+  gateway_created=true
+fi
+
+elapsed_ms=$(( ($(date +%s%N) - started) / 1000000 ))
+printf '{"onboard": %s, "image_warm": %s, "gateway_created": %s, "elapsed_ms": %d}\n' \
+  "${onboard}" "${image_warm}" "${gateway_created}" "${elapsed_ms}" > "${PREWARM_FILE}"
+log "Prewarm concluido em ${elapsed_ms}ms (onboard=${onboard}, gateway=${gateway_created})"
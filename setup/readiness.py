@@ -0,0 +1,281 @@
+"""
+Event-driven readiness checks for the setup pipeline.
+
+Instead of fixed sleeps, each stage waits for the condition it actually
+needs and continues as soon as it holds:
+  wait_for_file()      — inotify on the parent dir (polling fallback)
+  wait_for_container() — Engine API events + container state/health
+                         (CLI `docker events` when the socket is unavailable)
+  probe_http()         — GET probe (expects 200) with sub-second exponential backoff
+"""
+
+import http.client
+import json
+import os
+import select
+import subprocess
+import time
+from urllib.parse import urlparse
+
+import dockerapi
+import inotify
+import metrics
+import tracing
+
+
+PROBE_ATTEMPTS = metrics.registry.counter(
+    "openclaw_health_probe_attempts_total",
+    "Tentativas de health probe HTTP por destino e resultado (status HTTP ou error).",
+    ["target", "result"],
+)
+
+
+def json_file_ready(path):
+    """Predicado: arquivo existe e contem JSON valido."""
+    try:
+        with open(path, "r") as f:
+            json.load(f)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def wait_for_file(path, predicate=os.path.exists, timeout=10.0):
+    """Espera predicate(path) ficar verdadeiro; retorna False no timeout."""
+    with tracing.span(f"wait file {os.path.basename(path)}", cat="wait") as s:
+        ok = _wait_for_file(path, predicate, timeout)
+        s["exit_code"] = 0 if ok else 1
+        return ok
+
+
+def _wait_for_file(path, predicate, timeout):
+    if predicate(path):
+        return True
+    deadline = time.monotonic() + timeout
+    directory = os.path.dirname(path) or "."
+    name = os.path.basename(path)
+
+    watcher = None
+    if inotify.available():
+        try:
+            watcher = inotify.Inotify()
+            watcher.add_watch(directory, inotify.FILE_CHANGED)
+        except OSError:
+            if watcher:
+                watcher.close()
+            watcher = None
+
+    try:
+        # Re-checar depois de criar o watch: o arquivo pode ter surgido no meio
+        if predicate(path):
+            return True
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if watcher:
+                events = watcher.read_events(timeout=remaining)
+                if events and not any(ev_name == name for _wd, _mask, ev_name in events):
+                    continue
+            else:
+                time.sleep(min(0.2, remaining))
+            if predicate(path):
+                return True
+    finally:
+        if watcher:
+            watcher.close()
+
+
+def _docker_json(cmd, cwd=None):
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10, cwd=cwd)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0 or not result.stdout.strip():
+        return None
+    try:
+        return json.loads(result.stdout)
+    except ValueError:
+        return None
+
+
+def container_id(service, compose_file, cwd=None):
+    """ID do container de um service do compose (ou None)."""
+    try:
+        return dockerapi.client.service_container(service, all=False)
+    except dockerapi.DockerUnavailable:
+        pass
+    except (dockerapi.DockerError, subprocess.TimeoutExpired):
+        return None
+    try:
+        result = subprocess.run(
+            ["docker", "compose", "-f", compose_file, "ps", "-q", service],
+            capture_output=True, text=True, timeout=10, cwd=cwd,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    cid = result.stdout.strip().splitlines()
+    return cid[0] if cid else None
+
+
+def container_ready(cid):
+    """Running e, se houver healthcheck, healthy."""
+    try:
+        state = dockerapi.client.inspect(cid).get("State")
+    except dockerapi.DockerUnavailable:
+        state = _docker_json(["docker", "inspect", "--format", "{{json .State}}", cid])
+    except (dockerapi.DockerError, subprocess.TimeoutExpired):
+        state = None
+    if not state or not state.get("Running"):
+        return False
+    health = state.get("Health")
+    return not health or health.get("Status") == "healthy"
+
+
+def _event_ready(event, cid):
+    status = event.get("status") or event.get("Action") or ""
+    cid = event.get("id") or cid
+    if status == "health_status: healthy":
+        return True, cid
+    return status == "start" and container_ready(cid), cid
+
+
+def wait_for_container(service, compose_file, since=None, timeout=60.0, cwd=None):
+    """Espera o container do service ficar pronto seguindo os eventos do Docker.
+
+    since: timestamp unix a partir do qual eventos contam (ex: antes de um restart).
+    """
+    with tracing.span(f"wait container {service}", cat="wait") as s:
+        ok = _wait_for_container(service, compose_file, since, timeout, cwd)
+        s["exit_code"] = 0 if ok else 1
+        return ok
+
+
+def _wait_for_container(service, compose_file, since, timeout, cwd):
+    deadline = time.monotonic() + timeout
+    cid = container_id(service, compose_file, cwd=cwd)
+    if cid and since is None and container_ready(cid):
+        return True
+    # Fracao de segundo preservada: um health_status de um restart anterior,
+    # no mesmo segundo, nao pode contar como pronto
+    start = since if since is not None else time.time()
+    try:
+        return _wait_events_api(service, compose_file, start, deadline, cid, cwd)
+    except dockerapi.DockerUnavailable:
+        return _wait_events_cli(service, compose_file, start, deadline, cid, cwd)
+    except subprocess.TimeoutExpired:
+        # Stream de eventos parado alem do prazo
+        return False
+
+
+def _wait_events_api(service, compose_file, start, deadline, cid, cwd):
+    filters = {
+        "label": [f"com.docker.compose.service={service}"],
+        "event": ["start", "health_status"],
+    }
+    window_start = start
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        # Janelas curtas com `until`: o daemon fecha o stream no fim da janela,
+        # entao eventos chegam na hora e entre janelas re-checamos o estado
+        window_end = int(time.time() + min(1.0, remaining)) + 1
+        for event in dockerapi.client.events(filters, since=window_start, until=window_end, timeout=remaining + 5):
+            ready, cid = _event_ready(event, cid)
+            if ready:
+                return True
+        window_start = window_end
+        cid = cid or container_id(service, compose_file, cwd=cwd)
+        if cid and container_ready(cid):
+            return True
+
+
+def _wait_events_cli(service, compose_file, start, deadline, cid, cwd):
+    cmd = [
+        "docker", "events",
+        "--filter", f"label=com.docker.compose.service={service}",
+        "--filter", "event=start",
+        "--filter", "event=health_status",
+        "--format", "{{json .}}",
+        "--since", f"{start:.6f}",
+    ]
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return False
+
+    buf = b""
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            ready, _, _ = select.select([proc.stdout], [], [], min(1.0, remaining))
+            if not ready:
+                # Sem evento: o container pode ter ficado pronto antes do stream abrir
+                cid = cid or container_id(service, compose_file, cwd=cwd)
+                if cid and container_ready(cid):
+                    return True
+                continue
+            chunk = os.read(proc.stdout.fileno(), 4096)
+            if not chunk:
+                return False
+            buf += chunk
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                ready, cid = _event_ready(event, cid)
+                if ready:
+                    return True
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def probe_http(url, timeout=60.0, initial_delay=0.05, max_delay=0.8):
+    """GET em url ate responder 200, com backoff exponencial sub-segundo.
+
+    So 200 conta: HEAD (404/405 em alguns gateways) ou um 3xx de proxy/login
+    dariam falso negativo ou falso positivo. Reaproveita a mesma conexao
+    entre tentativas.
+    """
+    parsed = urlparse(url)
+    path = parsed.path or "/"
+    if parsed.query:
+        path += "?" + parsed.query
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    conn = None
+    target = f"{parsed.hostname}:{parsed.port or 80}"
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                with tracing.span(f"GET {target}{parsed.path or '/'}", cat="http") as s:
+                    if conn is None:
+                        conn = http.client.HTTPConnection(
+                            parsed.hostname, parsed.port or 80, timeout=min(2.0, remaining),
+                        )
+                    conn.request("GET", path)
+                    resp = conn.getresponse()
+                    resp.read()
+                    s["exit_code"] = resp.status
+                PROBE_ATTEMPTS.inc(target=target, result=resp.status)
+                if resp.status == 200:
+                    return True
+            except (OSError, http.client.HTTPException):
+                PROBE_ATTEMPTS.inc(target=target, result="error")
+                if conn:
+                    conn.close()
+                conn = None
+            tracing.sleep(min(delay, max(0.0, deadline - time.monotonic())), name="probe backoff")
+            delay = min(delay * 2, max_delay)
+    finally:
+        if conn:
+            conn.close()
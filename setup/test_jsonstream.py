@@ -0,0 +1,90 @@
+"""
+Chunk-boundary tests for jsonstream.iter_items().
+
+Every document is parsed with every small chunk size, so each token
+(numbers like `2.5` / `1e-3`, strings, literals, multi-byte UTF-8) ends
+up split across reads at every possible offset. The result must match
+json.loads() of the whole document.
+
+  python -m unittest test_jsonstream      (from setup/)
+"""
+
+import io
+import json
+import random
+import unittest
+
+import jsonstream
+
+SCALARS = [
+    0, -1, 7, 2.5, -0.125, 1e-3, 6.02e23, 1.5e+10, 123456789012,
+    True, False, None, "", "a", "naïve – 模型", "quote \" and \\ slash", "[{,:}]",
+]
+
+
+def _value(rng, depth=0):
+    kind = rng.random()
+    if depth < 3 and kind < 0.2:
+        return [_value(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+    if depth < 3 and kind < 0.4:
+        return {f"k{i}": _value(rng, depth + 1) for i in range(rng.randint(0, 3))}
+    if kind < 0.6:
+        return round(rng.uniform(-1e4, 1e4), rng.randint(0, 4))
+    return rng.choice(SCALARS)
+
+
+def _document(rng):
+    doc = {}
+    for i in range(rng.randint(0, 3)):
+        doc[f"before{i}"] = _value(rng)
+    doc["data"] = [_value(rng) for _ in range(rng.randint(0, 5))]
+    for i in range(rng.randint(0, 3)):
+        doc[f"after{i}"] = _value(rng)
+    return doc
+
+
+def _parse(raw, chunk_size):
+    return list(jsonstream.iter_items(io.BytesIO(raw), "data", chunk_size=chunk_size))
+
+
+class IterItemsTest(unittest.TestCase):
+    def assert_all_chunk_sizes(self, raw):
+        expected = json.loads(raw)["data"]
+        for chunk_size in range(1, min(len(raw), 48) + 1):
+            with self.subTest(raw=raw, chunk_size=chunk_size):
+                self.assertEqual(_parse(raw, chunk_size), expected)
+
+    def test_float_after_array_split_at_decimal_point(self):
+        raw = b'{"data":[{"id":"m"}],"total":2.5}'
+        self.assertEqual(_parse(raw, 31), [{"id": "m"}])
+        self.assert_all_chunk_sizes(raw)
+
+    def test_scalars_split_at_every_offset(self):
+        for value in SCALARS:
+            raw = json.dumps({"n": value, "data": [value, value], "m": value}).encode()
+            self.assert_all_chunk_sizes(raw)
+
+    def test_exponents_and_whitespace(self):
+        self.assert_all_chunk_sizes(b'{ "data" : [ 1e-3 , 2E+5 , -0.5e1 ] , "x" : 1.25e-7 }')
+
+    def test_missing_key_and_empty_array(self):
+        self.assertEqual(_parse(b'{"other": [1, 2.5]}', 3), [])
+        self.assertEqual(_parse(b'{"data": []}', 2), [])
+
+    def test_fuzz(self):
+        rng = random.Random(20261017)
+        for _ in range(300):
+            doc = _document(rng)
+            raw = json.dumps(doc, ensure_ascii=rng.random() < 0.5,
+                             separators=rng.choice([(",", ":"), (", ", ": ")])).encode()
+            for chunk_size in (1, 2, 3, 5, 7, 11, 16, 31, 64):
+                with self.subTest(raw=raw, chunk_size=chunk_size):
+                    self.assertEqual(_parse(raw, chunk_size), doc["data"])
+
+    def test_truncated_document_raises(self):
+        with self.assertRaises(ValueError):
+            _parse(b'{"data":[{"id":"m"}', 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
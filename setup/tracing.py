@@ -0,0 +1,172 @@
+"""
+Structured timing spans for the setup and update pipelines.
+
+A span records name, category, start (unix time), duration, exit code
+and output bytes for one unit of work: a subprocess, a file write, a
+wait/sleep or an HTTP probe. Spans go to the Trace active on the current
+thread (activate()); with no active trace they cost a couple of clock
+reads and are dropped, so helpers can be instrumented unconditionally.
+
+chrome() converts a span list to Chrome trace-event JSON, which loads
+in chrome://tracing or https://ui.perfetto.dev.
+
+Stdlib-only (also imported by the updater, which runs on system python3).
+"""
+
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+MAX_SPANS = 5000
+
+_local = threading.local()
+
+
+class Trace:
+    """Lista de spans de uma execucao (setup job ou update)."""
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self.max_spans = max_spans
+        self.dropped = 0
+        self._spans = []
+        self._lock = threading.Lock()
+
+    def add(self, entry):
+        with self._lock:
+            if len(self._spans) < self.max_spans:
+                self._spans.append(entry)
+            else:
+                self.dropped += 1
+
+    def to_list(self):
+        with self._lock:
+            return [dict(s) for s in self._spans]
+
+    @contextmanager
+    def activate(self):
+        """Spans criados nesta thread dentro do bloco vao para este trace."""
+        previous = current()
+        _local.trace = self
+        try:
+            yield self
+        finally:
+            _local.trace = previous
+
+
+def current():
+    return getattr(_local, "trace", None)
+
+
+@contextmanager
+def span(name, cat="step", **args):
+    """Mede o bloco; o dict entregue aceita exit_code / out_bytes."""
+    trace = current()
+    entry = {
+        "name": name,
+        "cat": cat,
+        "start": time.time(),
+        "duration_ms": None,
+        "thread": threading.current_thread().name,
+        "exit_code": None,
+        "out_bytes": None,
+    }
+    if args:
+        entry["args"] = args
+    t0 = time.perf_counter()
+    try:
+        yield entry
+    except BaseException as e:
+        text = error_text(e)
+        entry["error"] = f"{type(e).__name__}: {text}"[:200] if text else type(e).__name__
+        raise
+    finally:
+        entry["duration_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        if trace is not None:
+            trace.add(entry)
+
+
+def error_text(exc):
+    """str(exc) sem o argv dos erros de subprocess (trace e job sao servidos por HTTP).
+
+    str() de TimeoutExpired/CalledProcessError traz o comando inteiro, que pode
+    ter chaves (`-e KEY=VALUE`): desses so vai o timeout ou o exit code.
+    """
+    if isinstance(exc, subprocess.TimeoutExpired):
+        return f"timeout ({exc.timeout}s)"
+    if isinstance(exc, subprocess.CalledProcessError):
+        return f"exit code {exc.returncode}"
+    if isinstance(exc, subprocess.SubprocessError):
+        return ""
+    return str(exc)
+
+
+def bind(fn):
+    """fn rodando sob o trace da thread atual (para pools de threads)."""
+    trace = current()
+    if trace is None:
+        return fn
+
+    def bound(*args, **kwargs):
+        with trace.activate():
+            return fn(*args, **kwargs)
+    return bound
+
+
+def _size(out):
+    if not out:
+        return 0
+    return len(out.encode() if isinstance(out, str) else out)
+
+
+def command_name(cmd):
+    """Nome curto de um comando para o span (ex: 'docker compose up')."""
+    if isinstance(cmd, str):
+        return cmd.split(" ", 1)[0]
+    words = []
+    for part in cmd:
+        # Pula flags, caminhos e KEY=VALUE (podem carregar segredos)
+        if part.startswith("-") or "/" in part or "=" in part:
+            continue
+        words.append(part)
+        if len(words) == 3:
+            break
+    return " ".join(words) or str(cmd[0])
+
+
+def run(cmd, name=None, **kwargs):
+    """subprocess.run dentro de um span (exit code + bytes de stdout/stderr)."""
+    with span(name or command_name(cmd), cat="subprocess") as s:
+        result = subprocess.run(cmd, **kwargs)
+        s["exit_code"] = result.returncode
+        s["out_bytes"] = _size(result.stdout) + _size(result.stderr)
+        return result
+
+
+def sleep(seconds, name="sleep"):
+    with span(name, cat="sleep"):
+        time.sleep(seconds)
+
+
+def chrome(spans, pid=1, process_name="openclaw"):
+    """Spans -> Chrome trace-event JSON (eventos 'X' completos, uma trilha por thread)."""
+    tids = {}
+    events = []
+    for s in spans:
+        tid = tids.setdefault(s.get("thread") or "main", len(tids) + 1)
+        args = {k: s[k] for k in ("exit_code", "out_bytes", "error") if s.get(k) is not None}
+        args.update(s.get("args") or {})
+        events.append({
+            "name": s["name"],
+            "cat": s.get("cat", "step"),
+            "ph": "X",
+            "ts": int(s["start"] * 1_000_000),
+            "dur": int((s.get("duration_ms") or 0) * 1000),
+            "pid": pid,
+            "tid": tid,
+            "args": args,
+        })
+    events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": process_name}})
+    for thread_name, tid in tids.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
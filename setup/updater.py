@@ -3,80 +3,242 @@
 
 Exposes authenticated endpoints to trigger OpenClaw updates:
   POST /api/update        — start update (returns 202, runs in background)
-  GET  /api/update/status — poll update progress
+  GET  /api/update/status — poll update progress (includes timing spans in `trace`);
+                            ?since=<seq> returns only newer log lines, without spans
+  GET  /api/update/stream — Server-Sent Events: log lines and status changes as
+                            they happen (resumes from ?since= or Last-Event-ID)
+  GET  /api/update/trace  — spans of the last update as Chrome trace-event JSON
+  GET  /metrics           — Prometheus metrics (token required), including the
+                            setup series persisted by the wizard
+  GET  /openclaw-updater/interceptor.<hash>.js
+                          — update.run interceptor injected by nginx
+                            (immutable, gzip precompressed, no auth)
   GET  /health            — health check
 
 Runs as a systemd service on 127.0.0.1:18788 (localhost only, proxied via nginx).
 Authenticated via the same gateway token at /var/lib/openclaw-token.
+
+The update log is a bounded ring buffer (LOG_MAX_LINES). Every line gets
+a monotonic `seq`, so clients keep a cursor and fetch or receive only what
+is new, no matter how long the build runs.
+
+The server is threaded (one thread per connection, HTTP/1.1 keep-alive).
+`update_state` is copy-on-write: the update thread never mutates it, it
+swaps in a new dict under update_lock (_set_state), so a handler that
+grabbed a reference serializes a consistent snapshot without locking.
 """
 
+import collections
+import gzip
+import hashlib
 import json
 import os
 import subprocess
 import threading
 import time
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 
+import dockerapi
+import metrics
+import tracing
+from hostfacts import facts
+
 OPENCLAW_DIR = "/opt/openclaw"
 TOKEN_FILE = "/var/lib/openclaw-token"
+# Snapshots do wizard (setup/stages/validacao): o wizard para apos o setup
+SETUP_METRICS_DIR = "/run/openclaw-setup-metrics"
 BIND_HOST = "127.0.0.1"
 BIND_PORT = 18788
-
+LOG_MAX_LINES = 500
+STREAM_KEEPALIVE = 15  # segundos entre comentarios ": keepalive" no SSE
+IDLE_TIMEOUT = 60  # conexao keep-alive ociosa eh fechada depois disso
+
+
+class UpdateLog:
+    """Ring buffer das linhas de log com cursor (seq) monotonico entre updates."""
+
+    def __init__(self, maxlen=LOG_MAX_LINES):
+        self._lines = collections.deque(maxlen=maxlen)
+        self._seq = 0
+        self._version = 0
+        self._cond = threading.Condition()
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def append(self, msg, **fields):
+        with self._cond:
+            self._seq += 1
+            self._lines.append(dict(fields, seq=self._seq, time=time.time(), msg=msg))
+            self._version += 1
+            self._cond.notify_all()
+
+    def touch(self):
+        """Acorda os streams (ex.: mudanca de status sem linha nova)."""
+        with self._cond:
+            self._version += 1
+            self._cond.notify_all()
+
+    def clear(self):
+        # seq continua crescendo: cursores de um update anterior seguem validos
+        with self._cond:
+            self._lines.clear()
+            self._version += 1
+            self._cond.notify_all()
+
+    def since(self, seq=0):
+        """(linhas com seq > `seq`, True se alguma ja saiu do buffer, seq atual)."""
+        with self._cond:
+            lines = [line for line in self._lines if line["seq"] > seq]
+            oldest = self._lines[0]["seq"] if self._lines else self._seq + 1
+            return lines, seq + 1 < oldest and seq < self._seq, self._seq
+
+    def version(self):
+        with self._cond:
+            return self._version
+
+    def wait(self, version, timeout):
+        """Bloqueia ate algo mudar desde `version` (ou timeout); retorna se mudou."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._version != version, timeout)
+
+
+# Nunca alterado in-place: _set_state() troca o dict inteiro
 update_state = {
     "status": "idle",
     "started_at": None,
     "finished_at": None,
-    "log": [],
     "error": None,
 }
 update_lock = threading.Lock()
+update_log = UpdateLog()
+update_trace = tracing.Trace()
+
+INTERCEPTOR_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "interceptor.js")
+INTERCEPTOR_PREFIX = "/openclaw-updater/"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+ROUTES = (
+    "/api/update", "/api/update/status", "/api/update/stream", "/api/update/trace",
+    "/metrics", "/health",
+    INTERCEPTOR_PREFIX + "interceptor.js",
+)
+
+HTTP_REQUEST_SECONDS = metrics.registry.histogram(
+    "openclaw_updater_http_request_seconds",
+    "Latencia das requisicoes do updater por rota.",
+    ["route", "method", "status"],
+)
+UPDATE_SECONDS = metrics.registry.histogram(
+    "openclaw_update_seconds",
+    "Duracao total do update.",
+    ["status"],
+)
+UPDATE_STEP_SECONDS = metrics.registry.histogram(
+    "openclaw_update_step_seconds",
+    "Duracao de cada step do update.",
+    ["step", "status"],
+)
+DOCKER_BUILD_SECONDS = metrics.registry.histogram(
+    "openclaw_update_docker_build_seconds",
+    "Duracao do docker build por tag tentada no fallback.",
+    ["tag", "status"],
+)
+
+
+_interceptor = None
+
+
+def interceptor():
+    """(hash, variantes identity/gzip) do interceptor.js; lido e comprimido uma vez."""
+    global _interceptor
+    if _interceptor is None:
+        with open(INTERCEPTOR_FILE, "rb") as f:
+            body = f.read()
+        # Mesmo hash que o build-template.sh grava no Nginx (sha256sum | cut -c1-12)
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        _interceptor = (digest, {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)})
+    return _interceptor
 
 
 def read_token():
-    try:
-        with open(TOKEN_FILE, "r") as f:
-            return f.read().strip()
-    except FileNotFoundError:
-        return None
+    # Cacheado em memoria; inotify invalida quando o arquivo muda
+    return facts.read_file(TOKEN_FILE)
 
 
-def run_update():
+def _set_state(**changes):
+    """Publica um novo snapshot do estado (copy-on-write) e acorda os streams."""
     global update_state
+    with update_lock:
+        update_state = dict(update_state, **changes)
+    update_log.touch()
+
+
+def begin_update():
+    """Marca o update como running; False se ja havia um em andamento."""
+    global update_state, update_trace
 
     with update_lock:
         if update_state["status"] == "running":
-            return
+            return False
+        update_trace = tracing.Trace()
+        update_log.clear()
         update_state = {
             "status": "running",
             "started_at": time.time(),
             "finished_at": None,
-            "log": [],
             "error": None,
         }
+    update_log.touch()
+    return True
 
-    def _log(msg):
-        update_state["log"].append({"time": time.time(), "msg": msg})
 
-    def _run_step(description, cmd, timeout=300):
-        _log(f"Starting: {description}")
-        try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                cwd=OPENCLAW_DIR,
-            )
+def run_update():
+    # Chamado apos begin_update(): o status ja eh "running" quando o POST responde
+    with update_trace.activate():
+        _update()
+    state = update_state
+    UPDATE_SECONDS.observe(state["finished_at"] - state["started_at"], status=state["status"])
+
+
+def status_payload(since=None):
+    """Estado do update; com `since`, so as linhas novas e sem os spans."""
+    lines, truncated, seq = update_log.since(since or 0)
+    body = dict(update_state, log=lines, seq=seq, log_truncated=truncated)
+    if since is None:
+        body["trace"] = update_trace.to_list()
+    return body
+
+
+def _update():
+    def _log(msg, **fields):
+        update_log.append(msg, **fields)
+
+    def _run_step(description, cmd, timeout=300, step=None):
+        _log(f"Starting: {description}", step=step, phase="start")
+        with UPDATE_STEP_SECONDS.time(step=step or description, status="error") as labels:
+            try:
+                result = tracing.run(
+                    cmd,
+                    name=description,
+                    capture_output=True,
+                    text=True,
+                    timeout=timeout,
+                    cwd=OPENCLAW_DIR,
+                )
+            except subprocess.TimeoutExpired:
+                labels["status"] = "timeout"
+                _log(f"TIMEOUT: {description}", step=step, phase="timeout")
+                raise RuntimeError(f"{description} timed out")
             if result.returncode != 0:
-                _log(f"FAILED: {description}")
-                _log(f"stderr: {result.stderr[:1000]}")
+                _log(f"FAILED: {description}", step=step, phase="error")
+                _log(f"stderr: {result.stderr[:1000]}", step=step)
                 raise RuntimeError(f"{description} failed: {result.stderr[:500]}")
-            _log(f"OK: {description}")
+            labels["status"] = "ok"
+            _log(f"OK: {description}", step=step, phase="ok")
             return result
-        except subprocess.TimeoutExpired:
-            _log(f"TIMEOUT: {description}")
-            raise RuntimeError(f"{description} timed out")
 
     MAX_TAG_FALLBACK = 5
 
@@ -86,10 +248,11 @@ def run_update():
             "git fetch origin --tags",
             ["git", "fetch", "origin", "--tags"],
             timeout=60,
+            step="git_fetch",
         )
 
         # Listar tags de release ordenadas por versao (mais recente primeiro)
-        tags_result = subprocess.run(
+        tags_result = tracing.run(
             ["git", "tag", "-l", "v20*", "--sort=-version:refname"],
             capture_output=True, text=True, timeout=10,
             cwd=OPENCLAW_DIR,
@@ -105,17 +268,20 @@ def run_update():
         build_ok = False
         for tag in tags[:MAX_TAG_FALLBACK]:
             _log(f"Tentando build da tag {tag}...")
-            subprocess.run(
+            tracing.run(
                 ["git", "checkout", tag, "--quiet"],
                 capture_output=True, timeout=30,
                 cwd=OPENCLAW_DIR,
             )
             try:
-                _run_step(
-                    f"docker build -t openclaw:local ({tag})",
-                    ["docker", "build", "-t", "openclaw:local", "-f", "Dockerfile", "."],
-                    timeout=600,
-                )
+                with DOCKER_BUILD_SECONDS.time(tag=tag, status="error") as build_labels:
+                    _run_step(
+                        f"docker build -t openclaw:local ({tag})",
+                        ["docker", "build", "-t", "openclaw:local", "-f", "Dockerfile", "."],
+                        timeout=600,
+                        step="docker_build",
+                    )
+                    build_labels["status"] = "ok"
                 build_ok = True
                 _log(f"Build OK na tag {tag}")
                 break
@@ -124,7 +290,7 @@ def run_update():
                 continue
 
         # Voltar ao main
-        subprocess.run(
+        tracing.run(
             ["git", "checkout", "main", "--quiet"],
             capture_output=True, timeout=30,
             cwd=OPENCLAW_DIR,
@@ -136,35 +302,38 @@ def run_update():
             )
 
         # Prune old images to save disk space
-        subprocess.run(
-            ["docker", "image", "prune", "-f"],
-            capture_output=True,
-            timeout=30,
-            cwd=OPENCLAW_DIR,
-        )
+        with tracing.span("prune images", cat="docker"):
+            dockerapi.prune_images(timeout=30)
         _run_step(
             "docker compose down",
             ["docker", "compose", "down"],
             timeout=120,
+            step="compose_down",
         )
         _run_step(
             "docker compose up -d",
             ["docker", "compose", "up", "-d"],
             timeout=120,
+            step="compose_up",
         )
 
-        update_state["status"] = "success"
-        update_state["finished_at"] = time.time()
+        # Log antes do status: quem ve o estado final ja tem a ultima linha
         _log("Update completed successfully.")
+        _set_state(status="success", finished_at=time.time())
 
     except Exception as e:
-        update_state["status"] = "error"
-        update_state["error"] = str(e)
-        update_state["finished_at"] = time.time()
         _log(f"Update failed: {e}")
+        _set_state(status="error", error=str(e), finished_at=time.time())
 
 
 class UpdateHandler(BaseHTTPRequestHandler):
+    # Keep-alive: toda resposta leva Content-Length (o SSE fecha a conexao no fim)
+    protocol_version = "HTTP/1.1"
+    timeout = IDLE_TIMEOUT
+    # Headers e corpo saem em writes separados; sem isso o Nagle + ACK atrasado
+    # segura cada resposta ~40ms na conexao reaproveitada
+    disable_nagle_algorithm = True
+
     def _check_auth(self):
         # Requests vindos via Nginx proxy (header interno, so acessivel via localhost)
         if self.headers.get("X-Openclaw-Internal") == "true":
@@ -186,26 +355,125 @@ class UpdateHandler(BaseHTTPRequestHandler):
         self._respond(401, {"error": "Unauthorized"})
         return False
 
-    def _respond(self, code, body):
+    def _observe(self, code):
+        started = getattr(self, "_started", None)
+        if started is None:
+            return
+        self._started = None
+        path = urlparse(self.path).path
+        if path.startswith(INTERCEPTOR_PREFIX):
+            # Uma serie so para o interceptor, independente do hash no nome
+            path = INTERCEPTOR_PREFIX + "interceptor.js"
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            route=path if path in ROUTES else "unmatched", method=self.command, status=code,
+        )
+
+    def _send_body(self, code, data, content_type, headers=None):
+        self._observe(code)
         self.send_response(code)
-        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def _serve_interceptor(self, path):
+        try:
+            digest, variants = interceptor()
+        except OSError:
+            self._respond(404, {"error": "Not found"})
+            return
+        if path == f"{INTERCEPTOR_PREFIX}interceptor.{digest}.js":
+            cache_control = IMMUTABLE
+        elif path == f"{INTERCEPTOR_PREFIX}interceptor.js":
+            # Nome sem hash (fallback): revalida sempre
+            cache_control = "no-cache"
+        else:
+            self._respond(404, {"error": "Not found"})
+            return
+        headers = {"ETag": f'"{digest}"', "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if f'"{digest}"' in self.headers.get("If-None-Match", ""):
+            self._send_body(304, b"", "application/javascript; charset=utf-8", headers)
+            return
+        enc = "gzip" if "gzip" in self.headers.get("Accept-Encoding", "") else "identity"
+        if enc != "identity":
+            headers["Content-Encoding"] = enc
+        self._send_body(200, variants[enc], "application/javascript; charset=utf-8", headers)
+
+    def _stream(self, since):
+        """SSE: `log` por linha (id = seq), `status` quando muda, `done` no fim."""
+        self._observe(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        # Nginx nao deve segurar os eventos em buffer
+        self.send_header("X-Accel-Buffering", "no")
         self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
-        self.wfile.write(json.dumps(body).encode())
+        self.close_connection = True
+
+        def event(name, data, event_id=None):
+            chunk = f"id: {event_id}\n" if event_id is not None else ""
+            chunk += f"event: {name}\ndata: {json.dumps(data)}\n\n"
+            self.wfile.write(chunk.encode())
+
+        last = None
+        try:
+            while True:
+                version = update_log.version()
+                lines, truncated, _ = update_log.since(since)
+                if truncated:
+                    event("truncated", {"since": since})
+                for line in lines:
+                    event("log", line, event_id=line["seq"])
+                    since = line["seq"]
+                state = update_state
+                if state is not last:
+                    event("status", state)
+                    last = state
+                if state["status"] != "running":
+                    event("done", state)
+                    return
+                self.wfile.flush()
+                if not update_log.wait(version, STREAM_KEEPALIVE):
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def _respond(self, code, body):
+        self._send_body(code, json.dumps(body).encode(), "application/json",
+                        {"Access-Control-Allow-Origin": "*"})
+
+    def _drain(self):
+        # Corpo nao lido quebraria o proximo request na mesma conexao
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self.close_connection = True
+            return
+        if length > 0:
+            self.rfile.read(length)
 
     def do_OPTIONS(self):
         self.send_response(204)
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "Authorization, Content-Type")
+        self.send_header("Content-Length", "0")
         self.end_headers()
 
     def do_POST(self):
+        self._started = time.perf_counter()
+        self._drain()
         path = urlparse(self.path).path
         if path == "/api/update":
             if not self._check_auth():
                 return
-            if update_state["status"] == "running":
+            if not begin_update():
                 self._respond(409, {
                     "error": "Update already in progress",
                     "status": update_state,
@@ -218,21 +486,64 @@ class UpdateHandler(BaseHTTPRequestHandler):
             self._respond(404, {"error": "Not found"})
 
     def do_GET(self):
-        path = urlparse(self.path).path
+        self._started = time.perf_counter()
+        url = urlparse(self.path)
+        path = url.path
         if path == "/api/update/status":
             if not self._check_auth():
                 return
-            self._respond(200, update_state)
+            since = self._cursor(parse_qs(url.query).get("since", [None])[0])
+            if since is False:
+                return
+            self._respond(200, status_payload(since))
+        elif path == "/api/update/stream":
+            if not self._check_auth():
+                return
+            # EventSource reconecta mandando o ultimo id recebido
+            since = self._cursor(
+                parse_qs(url.query).get("since", [None])[0] or self.headers.get("Last-Event-ID")
+            )
+            if since is False:
+                return
+            self._stream(since or 0)
+        elif path == "/api/update/trace":
+            if not self._check_auth():
+                return
+            self._respond(200, tracing.chrome(update_trace.to_list(), process_name="openclaw-updater"))
+        elif path == "/metrics":
+            if not self._check_auth():
+                return
+            snap = metrics.merge([metrics.registry.snapshot()] + metrics.load(SETUP_METRICS_DIR))
+            self._send_body(200, metrics.render(snap).encode(), metrics.CONTENT_TYPE)
+        elif path.startswith(INTERCEPTOR_PREFIX):
+            self._serve_interceptor(path)
         elif path == "/health":
             self._respond(200, {"status": "ok"})
         else:
             self._respond(404, {"error": "Not found"})
 
+    def _cursor(self, value):
+        """Cursor ?since= como int (None se ausente); False ja respondeu 400."""
+        if value is None:
+            return None
+        try:
+            return max(int(value), 0)
+        except ValueError:
+            self._respond(400, {"error": "Invalid since cursor"})
+            return False
+
     def log_message(self, format, *args):
         pass
 
 
+class UpdaterServer(ThreadingHTTPServer):
+    """Uma thread por conexao: streams SSE e clientes lentos nao travam os demais."""
+
+    daemon_threads = True
+    request_queue_size = 64
+
+
 if __name__ == "__main__":
-    server = HTTPServer((BIND_HOST, BIND_PORT), UpdateHandler)
+    server = UpdaterServer((BIND_HOST, BIND_PORT), UpdateHandler)
     print(f"OpenClaw Updater listening on {BIND_HOST}:{BIND_PORT}")
     server.serve_forever()